@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Porównanie wyników run.py z zapisanym baseline.
+
+Rekordy łączymy po (size, stage, pairing, order). Regresja to:
+- czas lub szczyt pamięci większy o więcej niż time_tol (względnie)
+  i o więcej niż min_time sekund / min_mb MB (szum dla małych instancji),
+- niższy score.
+
+Uruchomienie: python3 compare.py --results results.json --baseline baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+Key = Tuple[int, str, Optional[str], Optional[str]]
+
+# Parametry przebiegu, które muszą się zgadzać, żeby wyniki były porównywalne.
+PARAMS = ("seed", "k", "k_group", "local_iters", "backend")
+
+
+def _key(rec: dict) -> Key:
+    return rec["size"], rec["stage"], rec["pairing"], rec["order"]
+
+
+def _ratio(new: Optional[float], old: Optional[float]) -> Optional[float]:
+    if new is None or old is None or old <= 0:
+        return None
+    return new / old
+
+
+def meta_mismatch(current: dict, baseline: dict) -> List[str]:
+    """Parametry przebiegu różniące się od baseline (wyniki nieporównywalne)."""
+    cur = current.get("meta", {})
+    old = baseline.get("meta", {})
+    return [f"{p}: {old.get(p)} -> {cur.get(p)}" for p in PARAMS if cur.get(p) != old.get(p)]
+
+
+def compare(
+    current: dict,
+    baseline: dict,
+    time_tol: float = 0.25,
+    min_time: float = 0.05,
+    min_mb: float = 1.0,
+) -> Tuple[List[dict], int]:
+    """Wiersze porównania (wspólne klucze) i liczba regresji."""
+    old: Dict[Key, dict] = {_key(r): r for r in baseline["results"]}
+    rows = []
+    regressions = 0
+    for rec in current["results"]:
+        base = old.get(_key(rec))
+        if base is None:
+            continue
+        problems = []
+        if rec["time"] > base["time"] * (1 + time_tol) and rec["time"] - base["time"] > min_time:
+            problems.append("time")
+        if (
+            rec["peak_mb"] is not None
+            and base["peak_mb"] is not None
+            and rec["peak_mb"] > base["peak_mb"] * (1 + time_tol)
+            and rec["peak_mb"] - base["peak_mb"] > min_mb
+        ):
+            problems.append("memory")
+        if rec["score"] is not None and base["score"] is not None and rec["score"] < base["score"]:
+            problems.append("score")
+        regressions += bool(problems)
+        rows.append(
+            {
+                "key": _key(rec),
+                "time": rec["time"],
+                "time_ratio": _ratio(rec["time"], base["time"]),
+                "mem_ratio": _ratio(rec["peak_mb"], base["peak_mb"]),
+                "score_diff": None if rec["score"] is None or base["score"] is None else rec["score"] - base["score"],
+                "problems": problems,
+            }
+        )
+    return rows, regressions
+
+
+def format_report(rows: List[dict]) -> str:
+    def fmt(x: Optional[float]) -> str:
+        return "-" if x is None else f"{x:.2f}x"
+
+    lines = [f"{'size':>8} {'stage':<14} {'pairing':<10} {'order':<8} {'time':>9} {'czas':>7} {'pamięć':>7} {'score':>8}"]
+    for r in rows:
+        size, stage, pairing, order = r["key"]
+        diff = "-" if r["score_diff"] is None else f"{r['score_diff']:+d}"
+        flag = "  <-- " + ", ".join(r["problems"]) if r["problems"] else ""
+        lines.append(
+            f"{size:>8} {stage:<14} {pairing or '-':<10} {order or '-':<8} {r['time']:>8.3f}s "
+            f"{fmt(r['time_ratio']):>7} {fmt(r['mem_ratio']):>7} {diff:>8}{flag}"
+        )
+    bad = sum(1 for r in rows if r["problems"])
+    lines.append(f"Regresje: {bad} / {len(rows)}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Porównanie wyników benchmarku z baseline")
+    ap.add_argument("--results", required=True)
+    ap.add_argument("--baseline", required=True)
+    ap.add_argument("--time_tol", type=float, default=0.25)
+    args = ap.parse_args()
+
+    with open(args.results, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    for diff in meta_mismatch(current, baseline):
+        print(f"Uwaga - inne parametry niż w baseline: {diff}")
+    rows, regressions = compare(current, baseline, time_tol=args.time_tol)
+    print(format_report(rows))
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Syntetyczne instancje w formacie Hash Code o kształcie d_pet_pictures.txt.
+
+Profil zmierzony na d_pet_pictures.txt (90 000 zdjęć, 220 tagów):
+- 1/3 zdjęć H, 2/3 V,
+- liczba tagów zdjęcia: histogramy poniżej (osobno H i V),
+- częstość tagów: 5 poziomów popularności (liczba tagów, względna częstość).
+Tagi zdjęcia losujemy bez powtórzeń z wagami poziomu; ziarno daje
+powtarzalny plik.
+
+Uruchomienie: python3 generate.py --photos 100000 --seed 1 --out ../data/synthetic_100k.txt
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+from typing import Dict, List, Tuple
+
+H_SHARE = 1 / 3
+
+# liczba tagów -> liczba zdjęć w d_pet_pictures.txt
+H_TAG_COUNTS: Dict[int, int] = {
+    1: 1, 2: 86, 3: 1791, 4: 1877, 5: 1957, 6: 1878, 7: 2012, 8: 2012, 9: 2118, 10: 2124,
+    11: 2077, 12: 2229, 13: 2191, 14: 2129, 15: 2021, 16: 1741, 17: 1163, 18: 481, 19: 112,
+}
+V_TAG_COUNTS: Dict[int, int] = {
+    2: 155, 3: 3712, 4: 3783, 5: 3888, 6: 3859, 7: 3976, 8: 4054, 9: 4118, 10: 4174,
+    11: 4220, 12: 4324, 13: 4454, 14: 4316, 15: 4125, 16: 3373, 17: 2303, 18: 965, 19: 201,
+}
+
+# (liczba tagów w poziomie, wystąpienia jednego tagu) w d_pet_pictures.txt
+TAG_TIERS: Tuple[Tuple[int, int], ...] = ((37, 17800), (49, 3900), (49, 1000), (37, 200), (48, 100))
+
+
+def tag_weights(n_tags: int) -> List[float]:
+    """Wagi n_tags tagów: poziomy TAG_TIERS przeskalowane proporcjonalnie do n_tags."""
+    total = sum(c for c, _ in TAG_TIERS)
+    weights: List[float] = []
+    for count, freq in TAG_TIERS:
+        weights.extend([float(freq)] * max(1, round(count * n_tags / total)))
+    return weights[:n_tags] + [float(TAG_TIERS[-1][1])] * max(0, n_tags - len(weights))
+
+
+def generate(photos: int, seed: int = 1, n_tags: int = 220) -> List[Tuple[str, List[str]]]:
+    """Lista (orientacja, tagi) długości photos."""
+    rng = random.Random(seed)
+    weights = tag_weights(n_tags)
+    cum = []
+    acc = 0.0
+    for w in weights:
+        acc += w
+        cum.append(acc)
+    names = [f"t{i}" for i in range(n_tags)]
+    shapes = {
+        "H": (list(H_TAG_COUNTS), list(H_TAG_COUNTS.values())),
+        "V": (list(V_TAG_COUNTS), list(V_TAG_COUNTS.values())),
+    }
+
+    out = []
+    for _ in range(photos):
+        orient = "H" if rng.random() < H_SHARE else "V"
+        sizes, size_w = shapes[orient]
+        want = min(n_tags, rng.choices(sizes, size_w)[0])
+        tags: Dict[int, None] = {}
+        while len(tags) < want:
+            for t in rng.choices(range(n_tags), cum_weights=cum, k=want - len(tags)):
+                tags[t] = None
+        out.append((orient, [names[t] for t in tags]))
+    return out
+
+
+def write_instance(path: str, photos: int, seed: int = 1, n_tags: int = 220) -> str:
+    """Zapisuje instancję (atomowo) i zwraca ścieżkę."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f"{photos}\n")
+        for orient, tags in generate(photos, seed=seed, n_tags=n_tags):
+            f.write(f"{orient} {len(tags)} {' '.join(tags)}\n")
+    os.replace(tmp, path)
+    return path
+
+
+def instance_path(directory: str, photos: int, seed: int, n_tags: int = 220) -> str:
+    """Ścieżka instancji w katalogu cache; plik jest generowany tylko raz."""
+    path = os.path.join(directory, f"synthetic_{photos}_s{seed}_t{n_tags}.txt")
+    if not os.path.exists(path):
+        write_instance(path, photos, seed=seed, n_tags=n_tags)
+    return path
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generator instancji w kształcie d_pet_pictures.txt")
+    ap.add_argument("--photos", type=int, required=True, help="Liczba zdjęć (np. 1000 ... 1000000)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--tags", type=int, default=220, help="Liczba różnych tagów")
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+
+    write_instance(args.out, args.photos, seed=args.seed, n_tags=args.tags)
+    print(f"Zapisano: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
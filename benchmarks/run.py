@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Benchmark etapów solvera na instancjach syntetycznych (generate.py).
+
+Dla każdego rozmiaru mierzymy czas, szczyt pamięci (tracemalloc, osobny
+przebieg, żeby nie zawyżać czasu) i wynik etapów:
+- load: wczytanie pliku .txt (bez cache),
+- build_slides: parowanie V + slajdy, dla każdej metody parowania,
+- order: build_slideshow_order, dla każdej pary (parowanie, metoda),
+- local_improve: hill-climbing na tej kolejności,
+- total_score: score pokazu przez usefull_functions.total_score.
+Wyniki trafiają do JSON; z --baseline od razu porównujemy (compare.py).
+
+Uruchomienie: python3 run.py --sizes 1000,10000,100000 --out results.json --baseline baseline.json
+baseline.json obejmuje rozmiary 1k, 10k i 100k (pełny przebieg ~20 min na jednym rdzeniu);
+1M da się zmierzyć (--sizes 1000000), ale nie ma go w baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, "..", "solutions"))
+
+from compare import compare, format_report, meta_mismatch
+from generate import instance_path
+from io_help import load_photos, make_slides
+from local_search import local_improve
+from ordering import build_slideshow_order
+from usefull_functions import total_score
+
+
+def measure(fn: Callable[[], object], memory: bool = True) -> Tuple[object, float, Optional[float]]:
+    """(wynik, czas w s, szczyt pamięci w MB); pamięć mierzona w drugim przebiegu fn."""
+    gc.collect()
+    t0 = time.perf_counter()
+    result = fn()
+    wall = time.perf_counter() - t0
+
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result, wall, peak
+
+
+def run_size(
+    path: str,
+    size: int,
+    pairings: List[str],
+    orders: List[str],
+    seed: int = 1,
+    k: int = 100,
+    k_group: int = 10,
+    local_iters: int = 100000,
+    backend: str = "sets",
+    memory: bool = True,
+    log: Callable[[str], None] = print,
+) -> List[dict]:
+    records: List[dict] = []
+
+    def record(stage: str, wall: float, peak: Optional[float], score=None, pairing=None, order=None) -> None:
+        rec = {
+            "size": size,
+            "stage": stage,
+            "pairing": pairing,
+            "order": order,
+            "time": round(wall, 4),
+            "peak_mb": None if peak is None else round(peak, 2),
+            "score": score,
+        }
+        records.append(rec)
+        log(f"  {stage:<14} {pairing or '-':<10} {order or '-':<8} {wall:9.3f}s  score={score}")
+
+    (h, v, names), wall, peak = measure(lambda: load_photos(path, use_cache=False), memory)
+    record("load", wall, peak)
+
+    for pairing in pairings:
+        def build():
+            random.seed(seed)
+            return make_slides(pairing, h, v, names, backend=backend)
+
+        slides, wall, peak = measure(build, memory)
+        record("build_slides", wall, peak, pairing=pairing)
+
+        for method in orders:
+            def order_fn():
+                random.seed(seed)
+                return build_slideshow_order(
+                    slides, method=method, k=k, k_group=k_group, candidates="tags", backend=backend
+                )
+
+            order, wall, peak = measure(order_fn, memory)
+            record("order", wall, peak, slides.order_score(order), pairing, method)
+
+            if local_iters > 0:
+                improved, wall, peak = measure(
+                    lambda: local_improve(slides, list(order), iters=local_iters, seed=seed), memory
+                )
+                record("local_improve", wall, peak, slides.order_score(improved), pairing, method)
+                order = improved
+
+            show = [slides[i] for i in order]
+            score, wall, peak = measure(lambda: total_score(show), memory)
+            record("total_score", wall, peak, score, pairing, method)
+
+    return records
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Benchmark etapów solvera")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="Liczby zdjęć, po przecinku (1000 ... 1000000)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--pairings", default="random,similar,different")
+    ap.add_argument("--orders", default="random,nn,grouped,mixed")
+    ap.add_argument("--k", type=int, default=100)
+    ap.add_argument("--k_group", type=int, default=10)
+    ap.add_argument("--local_iters", type=int, default=100000)
+    ap.add_argument("--backend", choices=["sets", "bitset"], default="sets")
+    ap.add_argument("--instances", default=os.path.join(HERE, "instances"), help="Katalog wygenerowanych instancji")
+    ap.add_argument("--no_memory", action="store_true", help="Bez pomiaru pamięci (bez drugiego przebiegu)")
+    ap.add_argument("--out", default=os.path.join(HERE, "results.json"))
+    ap.add_argument("--baseline", default=None, help="JSON z poprzedniego przebiegu do porównania")
+    ap.add_argument("--time_tol", type=float, default=0.25, help="Dopuszczalny względny wzrost czasu/pamięci")
+    args = ap.parse_args()
+
+    params = {
+        "seed": args.seed,
+        "k": args.k,
+        "k_group": args.k_group,
+        "local_iters": args.local_iters,
+        "backend": args.backend,
+    }
+    records: List[dict] = []
+    for size in (int(s) for s in args.sizes.split(",")):
+        path = instance_path(args.instances, size, args.seed)
+        print(f"[{size} zdjęć] {path}")
+        records.extend(
+            run_size(
+                path,
+                size,
+                args.pairings.split(","),
+                args.orders.split(","),
+                memory=not args.no_memory,
+                **params,
+            )
+        )
+
+    result = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "written_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            **params,
+        },
+        "results": records,
+    }
+    tmp = f"{args.out}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=1)
+    os.replace(tmp, args.out)
+    print(f"Zapisano: {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        for diff in meta_mismatch(result, baseline):
+            print(f"Uwaga - inne parametry niż w baseline: {diff}")
+        rows, regressions = compare(result, baseline, time_tol=args.time_tol)
+        print(format_report(rows))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import argparse, os, sys
+from pathlib import Path
+'''Uruchomienie: python3 proof_score.py \
+  --out ../out.txt [../out2.txt ...] \
+  --data ../data/d_pet_pictures.txt \
+  --report ../reports/proof_score.txt
+
+Jeden przebieg po submission (linia po linii, bez trzymania linii w pamięci):
+te same kontrole co proof_validity.py i dokładny wynik (suma interest score).
+Tagi zdjęć bierzemy z pliku wejściowego .txt (z binarnym cache, jak solver)
+albo z katalogu z horizontal_photos.json i vertical_photos.json.
+Kod wyjścia 1, gdy któryś plik jest niepoprawny.'''
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "solutions"))
+
+from io_help import load_photo_arrays
+
+
+def score_submission(path: Path, orient: bytes, offsets, tag_ids) -> dict:
+    n = len(orient)
+    used = bytearray(n)
+    stats = dict(declared=-1, lines=0, singles=0, pairs=0, used=0,
+                 bad_len=0, dup=0, unknown=0, bad_H=0, bad_VV=0, score=0)
+    prev = None
+
+    with open(path, "r", encoding="utf-8") as f:
+        header = f.readline().strip()
+        stats["declared"] = int(header) if header.isdigit() else -1
+
+        for ln in f:
+            ln = ln.strip()
+            if not ln:
+                continue
+            stats["lines"] += 1
+
+            a, _, rest = ln.partition(" ")
+            b, _, extra = rest.strip().partition(" ")
+            if extra or not a.isdigit() or (b and not b.isdigit()):
+                stats["bad_len"] += 1
+                prev = None
+                continue
+
+            ids = (int(a), int(b)) if b else (int(a),)
+            known = True
+            for pid in ids:
+                if pid >= n or orient[pid] not in b"HV":
+                    stats["unknown"] += 1
+                    known = False
+                    continue
+                if used[pid]:
+                    stats["dup"] += 1
+                else:
+                    used[pid] = 1
+                    stats["used"] += 1
+
+            if len(ids) == 1:
+                stats["singles"] += 1
+                if known and orient[ids[0]] != 72:  # "H"
+                    stats["bad_H"] += 1
+            else:
+                stats["pairs"] += 1
+                if known and (orient[ids[0]] != 86 or orient[ids[1]] != 86):  # "V"
+                    stats["bad_VV"] += 1
+
+            if not known:
+                prev = None
+                continue
+
+            cur = set(tag_ids[offsets[ids[0]] : offsets[ids[0] + 1]])
+            if len(ids) == 2:
+                cur.update(tag_ids[offsets[ids[1]] : offsets[ids[1] + 1]])
+            if prev is not None:
+                common = len(prev & cur)
+                stats["score"] += min(common, len(prev) - common, len(cur) - common)
+            prev = cur
+
+    stats["ok"] = (stats["declared"] == stats["lines"] and stats["bad_len"] == 0 and stats["dup"] == 0
+                   and stats["unknown"] == 0 and stats["bad_H"] == 0 and stats["bad_VV"] == 0)
+    return stats
+
+
+def write_report(r, path: Path, s: dict) -> None:
+    r.write(f"PROOF: wynik i poprawność {path}\n")
+    r.write(f"Slajdy: nagłówek={s['declared']}, linie={s['lines']}\n")
+    r.write(f"Slajdy 1-ID (H): {s['singles']}\n")
+    r.write(f"Slajdy 2-ID (V+V): {s['pairs']}\n")
+    r.write(f"Użyte unikalne zdjęcia: {s['used']}\n")
+    r.write("\nBłędy:\n")
+    r.write(f"- złe długości linii: {s['bad_len']}\n")
+    r.write(f"- duplikaty ID: {s['dup']}\n")
+    r.write(f"- nieznane ID: {s['unknown']}\n")
+    r.write(f"- 1-ID ale nie H: {s['bad_H']}\n")
+    r.write(f"- 2-ID ale nie V+V: {s['bad_VV']}\n")
+    r.write(f"\nWYNIK (score): {s['score']}\n")
+    r.write("POPRAWNOŚĆ: " + ("OK" if s["ok"] else "NIE OK") + "\n\n")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True, nargs="+", help="Jeden lub więcej plików submission")
+    ap.add_argument("--data", required=True, help="Plik .txt w formacie Hash Code albo katalog z plikami JSON")
+    ap.add_argument("--no_cache", action="store_true", help="Nie używaj binarnego cache dla wejścia .txt")
+    ap.add_argument("--report", default="reports/proof_score.txt")
+    args = ap.parse_args()
+
+    report_path = Path(args.report)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+
+    orient, offsets, tag_ids, _ = load_photo_arrays(args.data, use_cache=not args.no_cache)
+
+    all_ok = True
+    with open(report_path, "w", encoding="utf-8") as r:
+        for out in args.out:
+            s = score_submission(Path(out), orient, offsets, tag_ids)
+            write_report(r, Path(out), s)
+            all_ok &= s["ok"]
+            print(f"{out}: wynik={s['score']} {'OK' if s['ok'] else 'NIE OK'}")
+
+    print(f"Zapisano: {report_path}")
+    if not all_ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
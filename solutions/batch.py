@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Tryb wsadowy: wiele plików wejściowych (i wariantów parametrów) w jednym wywołaniu.
+
+Zadanie = (wejście, wariant). Każde wejście wczytujemy raz w procesie głównym
+(binarny cache jak w solver.py) i kopiujemy do pamięci współdzielonej; workery
+puli podpinają się do niej, a zbudowane zdjęcia trzymają dla kolejnych
+zadań na tym samym pliku. Zadania startują od największego wejścia (liczba
+tagów), z każdego wraca wynik i czasy etapów (metrics.Metrics), a na końcu
+powstaje tabela podsumowania (CSV).
+
+Uruchomienie:
+  python3 batch.py --inputs '../data/*.txt' --out_dir ../submissions --workers 4 \\
+      --variant 'nn=--order nn --k 50' --variant 'ls=--order mixed --local_iters 200000'
+Wariant to nazwa=flagi solver.py (bez nazwy: v1, v2, ...); bez --variant jeden
+wariant "default". Flagi solvera bez znaczenia w batch.py (wejście, wyjście,
+--resume / --starts / --checkpoint_every / --stream_chunk, cache slajdów, metryki,
+ślad, --eval) są w wariantach odrzucane, podobnie jak pliki wynikowe, które by się
+nadpisały albo nadpisały wejście.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import glob
+import os
+import shlex
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(__file__))
+
+from io_help import load_photo_arrays, photos_from_arrays, write_submission
+from metrics import Metrics, timed
+from multistart import attach_photo_arrays, share_photo_arrays
+from pipeline import solve_photos
+from solver import build_parser, solve_params
+
+# Kolumny czasów w podsumowaniu (etapy Metrics; read = wczytanie pliku w procesie głównym).
+STAGES = ("read", "load", "pairing", "knn_graph", "ordering", "local_search", "anneal", "write")
+
+# Flagi solver.py, których batch.py nie obsługuje (wejście / wyjście / metryki / --eval
+# ustala sam batch); w wariancie muszą mieć wartość domyślną.
+IGNORED_FLAGS = {
+    "data_dir": "--data_dir",
+    "out": "--out",
+    "resume": "--resume",
+    "starts": "--starts",
+    "workers": "--workers",
+    "checkpoint_every": "--checkpoint_every",
+    "stream_chunk": "--stream_chunk",
+    "eval": "--eval",
+    "no_cache": "--no_cache",
+    "cache_dir": "--cache_dir",
+    "cache_max_mb": "--cache_max_mb",
+    "metrics": "--metrics",
+    "trace": "--trace",
+    "trace_every": "--trace_every",
+    "plateau": "--plateau",
+    "plateau_gain": "--plateau_gain",
+}
+
+# Stan workera: zdjęcia ostatnio używanego wejścia.
+_WORKER: Dict[str, object] = {}
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """Ścieżki i wzorce glob -> lista wejść bez powtórzeń (kolejność zachowana)."""
+    out: List[str] = []
+    for pat in patterns:
+        matches = sorted(glob.glob(pat)) if glob.has_magic(pat) else [pat]
+        if not matches:
+            raise SystemExit(f"Brak plików dla wzorca: {pat}")
+        for path in matches:
+            if path not in out:
+                out.append(path)
+    return out
+
+
+def parse_variant(text: str, index: int) -> Tuple[str, argparse.Namespace]:
+    """'nazwa=--order nn --k 50' -> (nazwa, sparsowane flagi solvera)."""
+    name, args = f"v{index}", text
+    if not text.lstrip().startswith("-"):
+        name, _, args = text.partition("=")
+        name = name.strip()
+    ap = build_parser()
+    parsed = ap.parse_args(shlex.split(args))
+    defaults = ap.parse_args([])
+    bad = [flag for dest, flag in IGNORED_FLAGS.items() if getattr(parsed, dest) != getattr(defaults, dest)]
+    if bad:
+        ap.error(f"wariant {name}: {' / '.join(bad)} nie działają w batch.py")
+    return name, parsed
+
+
+def output_path(out_dir: str, path: str, variant: str, many: bool) -> str:
+    stem = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+    return os.path.join(out_dir, f"{stem}.{variant}.txt" if many else f"{stem}.txt")
+
+
+def check_outputs(jobs: List[dict], inputs: List[str]) -> None:
+    """ValueError, gdy dwa zadania piszą do tego samego pliku (wejścia o tej samej
+    nazwie w różnych katalogach) albo plik wynikowy jest jednym z wejść.
+    """
+    seen: Dict[str, str] = {}
+    sources = {os.path.realpath(path): path for path in inputs}
+    for job in jobs:
+        out = os.path.realpath(job["out"])
+        if out in sources:
+            raise ValueError(f"plik wynikowy {job['out']} nadpisałby wejście {sources[out]}")
+        if out in seen:
+            raise ValueError(f"{seen[out]} i {job['input']} dają ten sam plik wynikowy {job['out']}")
+        seen[out] = job["input"]
+
+
+def _photos(key: str, source, shared: bool):
+    """Zdjęcia wejścia key; przy zmianie pliku poprzednie są zwalniane."""
+    if _WORKER.get("key") != key:
+        _WORKER.clear()
+        data = attach_photo_arrays(*source) if shared else source
+        _WORKER.update(key=key, photos=photos_from_arrays(data))
+    return _WORKER["photos"]
+
+
+def _run_job(job: dict, source, shared: bool) -> dict:
+    metrics = Metrics()
+    t0 = time.perf_counter()
+    row = {"input": job["input"], "variant": job["variant"], "out": job["out"], "error": ""}
+    try:
+        with timed(metrics, "load"):
+            h, v, names = _photos(job["input"], source, shared)
+        slides, order, score = solve_photos(h, v, names, seed=job["seed"], metrics=metrics, **job["params"])
+        with timed(metrics, "write"):
+            write_submission(slides, order, job["out"])
+        if score is None:
+            score = slides.order_score(order)
+        row.update(slides=len(slides), score=score)
+    except Exception as exc:  # jedno zadanie nie przerywa całej partii
+        row.update(slides=None, score=None, error=f"{type(exc).__name__}: {exc}")
+    row["time"] = time.perf_counter() - t0
+    row["stages"] = {name: st["wall"] for name, st in metrics.stages.items()}
+    return row
+
+
+def run_batch(
+    inputs: List[str],
+    variants: List[Tuple[str, argparse.Namespace]],
+    out_dir: str,
+    workers: int = 1,
+    use_cache: bool = True,
+    log=print,
+) -> List[dict]:
+    """Rozwiązuje wszystkie pary (wejście, wariant); zwraca wiersze podsumowania
+    w kolejności wejść i wariantów. ValueError (check_outputs) przed wczytaniem
+    czegokolwiek, gdy pliki wynikowe kolidują ze sobą albo z wejściami.
+    """
+    many = len(variants) > 1
+    jobs = []
+    for path in inputs:
+        for name, args in variants:
+            params = solve_params(args)
+            params["knn_cache"] = path if use_cache else None
+            jobs.append(
+                {
+                    "input": path,
+                    "variant": name,
+                    "seed": args.seed,
+                    "params": params,
+                    "out": output_path(out_dir, path, name, many),
+                }
+            )
+    check_outputs(jobs, inputs)
+    os.makedirs(out_dir, exist_ok=True)
+
+    data = {}
+    read_time = {}
+    for path in inputs:
+        t0 = time.perf_counter()
+        data[path] = load_photo_arrays(path, use_cache=use_cache)
+        read_time[path] = time.perf_counter() - t0
+
+    # największe wejścia najpierw; warianty jednego pliku obok siebie (wspólne zdjęcia w workerze)
+    schedule = sorted(jobs, key=lambda j: -len(data[j["input"]][2]))
+
+    rows: Dict[Tuple[str, str], dict] = {}
+
+    def done(row: dict) -> None:
+        row["stages"]["read"] = read_time[row["input"]]
+        rows[row["input"], row["variant"]] = row
+        status = f"wynik={row['score']}" if not row["error"] else f"BŁĄD {row['error']}"
+        log(f"[{len(rows)}/{len(jobs)}] {row['input']} ({row['variant']}): {status}, czas={row['time']:.2f}s")
+
+    if workers <= 1:
+        try:
+            for job in schedule:
+                done(_run_job(job, data[job["input"]], False))
+        finally:
+            _WORKER.clear()
+    else:
+        shared = {}
+        try:
+            for path in inputs:
+                shared[path] = share_photo_arrays(data[path])
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = []
+                for job in schedule:
+                    shm, sizes = shared[job["input"]]
+                    futures.append(pool.submit(_run_job, job, (shm.name, sizes), True))
+                for fut in as_completed(futures):
+                    done(fut.result())
+        finally:
+            for shm, _ in shared.values():
+                shm.close()
+                shm.unlink()
+
+    return [rows[j["input"], j["variant"]] for j in jobs]
+
+
+def write_summary(rows: List[dict], path: str) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["input", "variant", "out", "slides", "score", "time", *STAGES, "error"])
+        for r in rows:
+            stages = r["stages"]
+            w.writerow(
+                [r["input"], r["variant"], r["out"], r["slides"], r["score"], round(r["time"], 4)]
+                + [round(stages[s], 4) if s in stages else "" for s in STAGES]
+                + [r["error"]]
+            )
+
+
+def format_summary(rows: List[dict]) -> str:
+    head = f"{'wejście':<28} {'wariant':<10} {'slajdy':>8} {'wynik':>9} {'czas':>8}  " + " ".join(
+        f"{s:>12}" for s in STAGES
+    )
+    lines = [head]
+    for r in rows:
+        name = os.path.basename(os.path.normpath(r["input"]))
+        score = "BŁĄD" if r["error"] else r["score"]
+        stages = " ".join(f"{r['stages'][s]:12.3f}" if s in r["stages"] else f"{'-':>12}" for s in STAGES)
+        lines.append(f"{name:<28} {r['variant']:<10} {r['slides'] or '-':>8} {score:>9} {r['time']:8.2f}  {stages}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Wiele wejść / wariantów solvera w jednej puli procesów")
+    ap.add_argument("--inputs", nargs="+", required=True, help="Pliki .txt / katalogi JSON albo wzorce glob")
+    ap.add_argument(
+        "--variant",
+        action="append",
+        default=None,
+        help="nazwa=flagi solver.py, np. 'nn=--order nn --k 50' (można powtarzać)",
+    )
+    ap.add_argument("--out_dir", default="submissions", help="Katalog plików submission")
+    ap.add_argument("--summary", default=None, help="CSV z podsumowaniem (domyślnie <out_dir>/summary.csv)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesy puli (1 = w tym procesie)")
+    ap.add_argument("--no_cache", action="store_true", help="Nie używaj binarnego cache dla wejść .txt")
+    args = ap.parse_args(argv)
+
+    inputs = expand_inputs(args.inputs)
+    variants = [parse_variant(text, i + 1) for i, text in enumerate(args.variant or ["default="])]
+    names = [name for name, _ in variants]
+    if len(set(names)) != len(names):
+        ap.error("nazwy wariantów muszą być różne")
+
+    workers = max(1, min(args.workers, len(inputs) * len(variants)))
+    try:
+        rows = run_batch(inputs, variants, args.out_dir, workers=workers, use_cache=not args.no_cache)
+    except ValueError as exc:
+        ap.error(str(exc))
+
+    summary = args.summary or os.path.join(args.out_dir, "summary.csv")
+    write_summary(rows, summary)
+    print(format_summary(rows))
+    print(f"Podsumowanie: {summary}")
+    if any(r["error"] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
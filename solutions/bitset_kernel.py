@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Backend scoringu na bitsetach (NumPy, słowa uint64 + popcount).
+
+Tagi slajdu kodujemy jako bitset stałej szerokości W = ceil(T / 64) słów.
+Jeden slajd oceniamy względem całej paczki kandydatów w jednym
+zwektoryzowanym przebiegu: AND -> popcount -> suma po słowach daje
+|A ∩ B|, a score to min(common, |A| - common, |B| - common).
+
+NumPy jest zależnością opcjonalną - potrzebna tylko dla backend="bitset";
+backend="auto" wybiera "bitset", gdy NumPy jest zainstalowany, a "sets" bez niego.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - backend "sets" działa bez NumPy
+    np = None
+
+from slide_store import SlideStore
+
+BACKENDS = ("auto", "sets", "bitset")
+
+# Limit pamięci macierzy bitsetów (n * W * 8 bajtów).
+MAX_BITSET_BYTES = 1 << 30
+
+_HAS_BITWISE_COUNT = np is not None and hasattr(np, "bitwise_count")
+_BYTE_POPCOUNT = None
+
+
+def popcount(words):
+    """Liczba ustawionych bitów w każdym słowie uint64 (NumPy >= 2: bitwise_count)."""
+    global _BYTE_POPCOUNT
+    if _HAS_BITWISE_COUNT:
+        return np.bitwise_count(words)
+    if _BYTE_POPCOUNT is None:
+        _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    b = words.view(np.uint8).reshape(words.shape + (8,))
+    return _BYTE_POPCOUNT[b].sum(axis=-1, dtype=np.uint64)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("backend='bitset' wymaga NumPy (pip install numpy)")
+
+
+def resolve_backend(backend: str) -> str:
+    """"auto" -> "bitset" z NumPy, "sets" bez; pozostałe nazwy bez zmian."""
+    if backend == "auto":
+        return "sets" if np is None else "bitset"
+    return backend
+
+
+def encode_bitsets(offsets, tag_ids, n_tags: int):
+    """Macierz (n, W) uint64 z bitsetami tagów dla wierszy CSR."""
+    _require_numpy()
+    n = len(offsets) - 1
+    words = max(1, (n_tags + 63) // 64)
+    if n * words * 8 > MAX_BITSET_BYTES:
+        raise MemoryError(
+            f"bitset {n} x {words} słów przekracza limit - użyj backend='sets'"
+        )
+    off = np.frombuffer(offsets, dtype=np.int32) if not isinstance(offsets, np.ndarray) else offsets
+    tid = np.frombuffer(tag_ids, dtype=np.int32) if not isinstance(tag_ids, np.ndarray) else tag_ids
+    rows = np.repeat(np.arange(n, dtype=np.int64), np.diff(off))
+    tid = tid.astype(np.int64)
+
+    bits = np.zeros((n, words), dtype=np.uint64)
+    np.bitwise_or.at(bits, (rows, tid >> 6), np.left_shift(np.uint64(1), (tid & 63).astype(np.uint64)))
+    return bits
+
+
+class BitsetScorer:
+    """Scoring jeden-do-wielu na bitsetach slajdów ze SlideStore."""
+
+    def __init__(self, store: SlideStore) -> None:
+        _require_numpy()
+        self.store = store
+        self.bits = encode_bitsets(store.offsets, store.tag_ids, len(store.tag_names))
+        self.counts = np.frombuffer(store.counts, dtype=np.int32).astype(np.int64)
+
+    def score(self, a: int, b: int) -> int:
+        common = int(popcount(self.bits[a] & self.bits[b]).sum())
+        return min(common, int(self.counts[a]) - common, int(self.counts[b]) - common)
+
+    def score_many(self, a: int, cands: Sequence[int]):
+        """Tablica score(a, c) dla wszystkich kandydatów c (jeden przebieg)."""
+        idx = np.asarray(cands, dtype=np.int64)
+        common = popcount(self.bits[idx] & self.bits[a]).sum(axis=1, dtype=np.int64)
+        return np.minimum(common, np.minimum(self.counts[a] - common, self.counts[idx] - common))
+
+    def scores(self, a: int, cands: Sequence[int]) -> list:
+        """Jak score_many, ale jako lista int (jak SlideStore.scores)."""
+        return self.score_many(a, cands).tolist()
+
+    def best_of(self, a: int, cands: Sequence[int]) -> int:
+        """Pozycja (w cands) pierwszego najlepszego kandydata."""
+        return int(np.argmax(self.score_many(a, cands)))
+
+
+def make_scorer(store: SlideStore, backend: str = "sets"):
+    """Zwraca obiekt z metodami score / best_of dla wybranego backendu."""
+    backend = resolve_backend(backend)
+    if backend == "sets":
+        return store
+    if backend == "bitset":
+        # magazyn może podać własną klasę scorera (metrics.CountingStore liczy oceny)
+        return getattr(store, "bitset_scorer", BitsetScorer)(store)
+    raise ValueError(f"Unknown scoring backend: {backend}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Okresowy zapis najlepszego porządku w trakcie długich przebiegów.
+
+Submission zapisujemy atomowo przez write_submission, a obok niego
+<out>.meta.json z wynikiem i postępem - proces przerwany w dowolnym
+momencie zostawia ostatni pełny, poprawny plik (do wznowienia przez --resume).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Optional, Sequence
+
+from io_help import write_submission
+from slide_store import SlideStore
+
+
+class Checkpointer:
+    """Zapis co najmniej co every sekund, tylko gdy wynik się poprawił.
+    slides można podpiąć później (gdy slajdy powstają dopiero w trakcie przebiegu).
+    """
+
+    def __init__(self, out_path: str, every: float = 60.0, slides: Optional[SlideStore] = None, **meta) -> None:
+        self.slides = slides
+        self.out_path = out_path
+        self.every = every
+        self.meta = meta
+        self.start = time.perf_counter()
+        self.last_save = self.start
+        self.saved_score: Optional[int] = None
+
+    def maybe_save(self, order: Sequence[int], score: int, iteration: int = 0) -> bool:
+        now = time.perf_counter()
+        if now - self.last_save < self.every:
+            return False
+        if self.saved_score is not None and score <= self.saved_score:
+            return False
+        self.save(order, score, iteration)
+        return True
+
+    def save(self, order: Sequence[int], score: Optional[int], iteration: int = 0, final: bool = False) -> None:
+        write_submission(self.slides, order, self.out_path)
+        meta = dict(self.meta)
+        meta.update(
+            score=score,
+            slides=len(order),
+            iteration=iteration,
+            elapsed=round(time.perf_counter() - self.start, 3),
+            final=final,
+            written_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        )
+        tmp = f"{self.out_path}.meta.json.tmp{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, f"{self.out_path}.meta.json")
+        self.last_save = time.perf_counter()
+        self.saved_score = score
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Ślad zbieżności poprawy lokalnej (do wykresów i obserwacji długich przebiegów).
+
+Metody poprawy (local_search.improve / local_improve, parallel_search,
+optimization.*) przyjmują trace=Tracer(...) i co trace.every iteracji
+wołają trace.record(...). Wynik pochodzi z utrzymywanej przyrostowo sumy
+krawędzi, więc próbka kosztuje O(1), a nie O(n) jak total_score.
+"""
+
+from __future__ import annotations
+
+import csv
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+class TracePoint(NamedTuple):
+    phase: str  # local_search / anneal / ...
+    iteration: int
+    elapsed: float  # sekundy od utworzenia Tracer
+    score: int
+    best: int
+    acceptance: float  # przyjęte / próby od poprzedniej próbki
+
+
+class Tracer:
+    """Odbiornik próbek: callback i/lub strumieniowy zapis CSV.
+
+    callback(point) zwracający True przerywa poprawę (np. gdy wynik stoi w miejscu).
+    """
+
+    FIELDS = TracePoint._fields
+
+    def __init__(
+        self,
+        callback: Optional[Callable[[TracePoint], Optional[bool]]] = None,
+        every: int = 10000,
+        csv_path: Optional[str] = None,
+    ) -> None:
+        self.callback = callback
+        self.every = max(1, every)
+        self.start = time.perf_counter()
+        self.last: Optional[TracePoint] = None
+        self._marks = (0, 0)
+        self._file = None
+        self._writer = None
+        if csv_path is not None:
+            self._file = open(csv_path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.FIELDS)
+
+    def reset_counts(self) -> None:
+        """Nowy etap: kolejne liczniki prób / przyjęć liczone od zera."""
+        self._marks = (0, 0)
+
+    def record(self, phase: str, iteration: int, score: int, best: int, accepted: int, tried: int) -> bool:
+        """accepted / tried: narastające liczniki etapu. Zwraca True, gdy trzeba przerwać."""
+        prev_acc, prev_tried = self._marks
+        window = tried - prev_tried
+        rate = (accepted - prev_acc) / window if window > 0 else 0.0
+        self._marks = (accepted, tried)
+
+        point = TracePoint(phase, iteration, round(time.perf_counter() - self.start, 4), score, best, round(rate, 6))
+        self.last = point
+        if self._writer is not None:
+            self._writer.writerow(point)
+            self._file.flush()
+        if self.callback is not None:
+            return bool(self.callback(point))
+        return False
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def __enter__(self) -> "Tracer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def plateau_stopper(patience: float, min_gain: int = 1) -> Callable[[TracePoint], bool]:
+    """Callback przerywający, gdy najlepszy wynik nie wzrósł o min_gain przez patience sekund."""
+    state = {"best": None, "since": 0.0}
+
+    def stop(point: TracePoint) -> bool:
+        if state["best"] is None or point.best >= state["best"] + min_gain:
+            state["best"] = point.best
+            state["since"] = point.elapsed
+            return False
+        return point.elapsed - state["since"] >= patience
+
+    return stop
@@ -3,8 +3,12 @@
 
 from __future__ import annotations
 
+import os
 import random
-from typing import List
+import shutil
+from array import array
+from functools import partial
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
 
 from usefull_functions import (
     load_photos_from_json,
@@ -14,34 +18,246 @@ from usefull_functions import (
 from vertical_photos_combining_methods import (
     random_pair_vertical_photos,
     similar_pair_vertical_photos,
-    different_pair_vertical_photos)
+    different_pair_vertical_photos,
+    target_pair_vertical_photos)
 
+from slide_store import SlideStore, intern_tags
+from photo_cache import PhotoArrays, cache_path, file_digest, read_photo_cache, write_photo_cache
 
-def build_slides(pairing: str, data_dir: str) -> List[dict]:
-    """Buduje listę slajdów zgodnie z wybraną metodą parowania."""
-    h = load_photos_from_json(f"{data_dir}/horizontal_photos.json")
-    v = load_photos_from_json(f"{data_dir}/vertical_photos.json")
 
+def _intern_photos(photos: List[dict], table: Dict[str, int], names: List[str]) -> List[dict]:
+    """Podmienia tagi tekstowe zdjęć na zbiory id (wspólna tablica dla H i V)."""
+    for p in photos:
+        p["tags"] = set(intern_tags(p["tags"], table, names))
+    return photos
+
+
+def check_photo_line(parts: List[str], path: str, lineno: int) -> None:
+    """Kontrola linii zdjęcia: orientacja H/V i zgodność zadeklarowanej liczby tagów."""
+    if len(parts) < 2 or parts[0] not in ("H", "V") or not parts[1].isdigit():
+        raise ValueError(f"{path}:{lineno}: oczekiwano 'H|V liczba_tagów tagi...', jest: {' '.join(parts)[:80]}")
+    if int(parts[1]) != len(parts) - 2:
+        raise ValueError(f"{path}:{lineno}: zadeklarowano {parts[1]} tagów, jest {len(parts) - 2}")
+
+
+def read_declared_count(f, path: str) -> int:
+    """Liczba zdjęć z pierwszej linii pliku .txt."""
+    head = f.readline().strip()
+    if not head.isdigit():
+        raise ValueError(f"{path}:1: oczekiwano liczby zdjęć, jest: {head[:80]!r}")
+    return int(head)
+
+
+def parse_txt(path: str) -> PhotoArrays:
+    """Strumieniowe parsowanie pliku w formacie Hash Code (linia po linii).
+
+    Zwraca (orient, offsets, tag_ids, names) - tagi od razu internowane.
+    ValueError (z numerem linii), gdy liczba zdjęć albo tagów nie zgadza się z deklarowaną.
+    """
+    table: Dict[str, int] = {}
+    names: List[str] = []
+    orient = bytearray()
+    offsets = array("i", [0])
+    tag_ids = array("i")
+
+    with open(path, "r", encoding="utf-8") as f:
+        declared = read_declared_count(f, path)
+        for lineno, line in enumerate(f, start=2):
+            parts = line.split()
+            if not parts:
+                continue
+            check_photo_line(parts, path, lineno)
+            if len(orient) == declared:
+                raise ValueError(f"{path}:{lineno}: więcej zdjęć niż zadeklarowane {declared}")
+            orient += parts[0].encode("ascii")
+            tag_ids.extend(intern_tags(parts[2:], table, names))
+            offsets.append(len(tag_ids))
+
+    if len(orient) != declared:
+        raise ValueError(f"{path}: nagłówek={declared}, zdjęcia={len(orient)}")
+    return bytes(orient), offsets, tag_ids, names
+
+
+def load_txt_arrays(path: str, use_cache: bool = True) -> PhotoArrays:
+    """Tablice CSR zdjęć z pliku .txt (z binarnym cache obok wejścia)."""
+    data = None
+    if use_cache:
+        digest = file_digest(path)
+        cpath = cache_path(path, digest)
+        data = read_photo_cache(cpath, digest)
+    if data is None:
+        data = parse_txt(path)
+        if use_cache:
+            try:
+                write_photo_cache(cpath, digest, data)
+            except OSError:
+                pass
+    return data
+
+
+def photos_from_arrays(data: PhotoArrays) -> Tuple[List[dict], List[dict], List[str]]:
+    """Słowniki zdjęć H i V (tagi jako zbiory id) z tablic CSR."""
+    orient, offsets, tag_ids, names = data
+    h: List[dict] = []
+    v: List[dict] = []
+    H = ord("H")
+    V = ord("V")
+    for pid in range(len(orient)):
+        o = orient[pid]
+        if o != H and o != V:
+            continue
+        p = {"id": pid, "tags": set(tag_ids[offsets[pid] : offsets[pid + 1]])}
+        (h if o == H else v).append(p)
+    return h, v, names
+
+
+def photos_to_arrays(h: List[dict], v: List[dict], names: List[str]) -> PhotoArrays:
+    """Odwrotność photos_from_arrays; brakujące id dostają orientację '-'."""
+    n = 1 + max((p["id"] for p in h + v), default=-1)
+    orient = bytearray(b"-" * n)
+    rows: List[Sequence[int]] = [()] * n
+    for o, photos in ((b"H", h), (b"V", v)):
+        for p in photos:
+            orient[p["id"]] = o[0]
+            rows[p["id"]] = sorted(p["tags"])
+
+    offsets = array("i", [0])
+    tag_ids = array("i")
+    for row in rows:
+        tag_ids.extend(row)
+        offsets.append(len(tag_ids))
+    return bytes(orient), offsets, tag_ids, names
+
+
+def load_photos_from_txt(path: str, use_cache: bool = True) -> Tuple[List[dict], List[dict], List[str]]:
+    """Wczytuje zdjęcia H i V bezpośrednio z pliku .txt (z binarnym cache obok wejścia)."""
+    return photos_from_arrays(load_txt_arrays(path, use_cache=use_cache))
+
+
+def load_photos(data_dir: str, use_cache: bool = True) -> Tuple[List[dict], List[dict], List[str]]:
+    """Zdjęcia H, V (tagi jako id) oraz nazwy tagów.
+
+    data_dir może być plikiem .txt w formacie Hash Code albo katalogiem
+    z horizontal_photos.json i vertical_photos.json.
+    """
+    if os.path.isfile(data_dir):
+        return load_photos_from_txt(data_dir, use_cache=use_cache)
+
+    table: Dict[str, int] = {}
+    names: List[str] = []
+    h = _intern_photos(load_photos_from_json(f"{data_dir}/horizontal_photos.json"), table, names)
+    v = _intern_photos(load_photos_from_json(f"{data_dir}/vertical_photos.json"), table, names)
+    return h, v, names
+
+
+def load_photo_arrays(data_dir: str, use_cache: bool = True) -> PhotoArrays:
+    """Jak load_photos, ale w postaci tablic CSR (np. do pamięci współdzielonej)."""
+    if os.path.isfile(data_dir):
+        return load_txt_arrays(data_dir, use_cache=use_cache)
+    return photos_to_arrays(*load_photos(data_dir, use_cache=use_cache))
+
+
+def build_slides(pairing: str, data_dir: str, use_cache: bool = True, backend: str = "auto") -> SlideStore:
+    """Buduje slajdy zgodnie z wybraną metodą parowania.
+    backend="bitset": okna parowania similar/different liczone wektorowo (NumPy);
+    "auto" (domyślnie) - bitset, gdy NumPy jest zainstalowany, inaczej "sets".
+    """
+    h, v, names = load_photos(data_dir, use_cache=use_cache)
+    return make_slides(pairing, h, v, names, backend=backend)
+
+
+def pairing_function(pairing: str, backend: str = "auto"):
+    """Funkcja parowania zdjęć V (lista zdjęć -> lista par) dla nazwy metody."""
     if pairing == "random":
-        pairing_func = random_pair_vertical_photos
-    elif pairing == "similar":
-        pairing_func = similar_pair_vertical_photos
-    elif pairing == "different":
-        pairing_func = different_pair_vertical_photos
-    else:
-        raise ValueError(f"Nieznana metoda parowania: {pairing}")
+        return random_pair_vertical_photos
+    if pairing == "similar":
+        return partial(similar_pair_vertical_photos, backend=backend)
+    if pairing == "different":
+        return partial(different_pair_vertical_photos, backend=backend)
+    if pairing == "target":
+        return target_pair_vertical_photos
+    raise ValueError(f"Nieznana metoda parowania: {pairing}")
 
+
+def make_slides(
+    pairing: str,
+    h: List[dict],
+    v: List[dict],
+    names: List[str],
+    backend: str = "auto",
+) -> SlideStore:
+    """Parowanie V + slajdy H, przemieszane; zdjęcia mają tagi jako id."""
     slides: List[dict] = []
     slides.extend(create_horizontal_slides(h))
-    slides.extend(create_vertical_slides(pairing_func, v))
+    slides.extend(create_vertical_slides(pairing_function(pairing, backend), v))
 
     random.shuffle(slides)
-    return slides
+    store = SlideStore.from_slides(slides, tag_names=names)
+    store.set_photo_tags(v)
+    return store
+
 
+def write_submission(slides: Union[SlideStore, List[dict]], order: Sequence[int], out_path: str) -> None:
+    """Zapis atomowy: plik tymczasowy obok out_path, potem os.replace."""
+    if isinstance(slides, SlideStore):
+        photos_of = slides.photos
+    else:
+        photos_of = lambda sid: slides[sid]["photos"]
 
-def write_submission(slides: List[dict], order: List[int], out_path: str) -> None:
-    with open(out_path, "w", encoding="utf-8") as f:
+    tmp = f"{out_path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
         f.write(str(len(order)) + "\n")
         for sid in order:
-            photos = slides[sid]["photos"]
-            f.write(" ".join(map(str, photos)) + "\n")
+            f.write(" ".join(map(str, photos_of(sid))) + "\n")
+    os.replace(tmp, out_path)
+
+
+def write_submission_stream(
+    slides: Iterable[Sequence[int]], out_path: str, buffer_size: int = 1 << 20
+) -> int:
+    """Zapis submission z iteratora slajdów (krotek id zdjęć) bez trzymania kolejności.
+
+    Liczba slajdów w nagłówku jest znana dopiero na końcu, więc treść idzie
+    najpierw do pliku tymczasowego (bufor buffer_size), a potem jest
+    przepisywana porcjami za nagłówek; na koniec os.replace. Zwraca liczbę slajdów.
+    """
+    body = f"{out_path}.body{os.getpid()}"
+    tmp = f"{out_path}.tmp{os.getpid()}"
+    count = 0
+    try:
+        with open(body, "w", encoding="utf-8", buffering=buffer_size) as f:
+            for photos in slides:
+                f.write(" ".join(map(str, photos)) + "\n")
+                count += 1
+        with open(tmp, "wb") as out, open(body, "rb") as src:
+            out.write(f"{count}\n".encode("ascii"))
+            shutil.copyfileobj(src, out, buffer_size)
+        os.replace(tmp, out_path)
+    finally:
+        for path in (body, tmp):
+            if os.path.exists(path):
+                os.remove(path)
+    return count
+
+
+def read_submission(path: str, data: PhotoArrays) -> SlideStore:
+    """Wczytuje istniejący submission jako slajdy w kolejności z pliku (order = 0..n-1).
+    Tagi bierzemy z tablic zdjęć wejścia (load_photo_arrays).
+    """
+    photo_a = array("i")
+    photo_b = array("i")
+    with open(path, "r", encoding="utf-8") as f:
+        declared = int(f.readline())
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if len(parts) > 2:
+                raise ValueError(f"{path}: linia z więcej niż dwoma zdjęciami: {line.strip()}")
+            photo_a.append(int(parts[0]))
+            photo_b.append(int(parts[1]) if len(parts) == 2 else -1)
+
+    if len(photo_a) != declared:
+        raise ValueError(f"{path}: nagłówek={declared}, slajdy={len(photo_a)}")
+    _, offsets, tag_ids, names = data
+    return SlideStore.from_photo_pairs(photo_a, photo_b, offsets, tag_ids, names)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Model wyspowy: kilka porządków poprawianych równolegle z wymianą najlepszego.
+
+Każda wyspa ma własny porządek (i pary zdjęć V - ruch "partner") i ziarno.
+Poprawa idzie epokami: w epoce każda wyspa dostaje iters // epochs iteracji
+improve w procesie puli, a po epoce wyspy gorsze od mediany przejmują
+porządek najlepszej wyspy i ją różnicują - losowe odwrócenia krótkich
+odcinków (ISLAND_KICKS) przed kolejną epoką. Między procesami krążą tylko
+zwarte tablice int (porządek, score krawędzi, pary zdjęć), magazyn slajdów
+jest raz w pamięci współdzielonej.
+"""
+
+from __future__ import annotations
+
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from local_search import OrderState, apply_two_opt, improve, two_opt_delta
+from metrics import Metrics
+from shared_arrays import Sizes, attach_store, int_array, share_store
+from slide_store import SlideStore
+
+# Różnicowanie wyspy po przejęciu cudzego porządku: tyle odwróceń odcinków
+# o długości do ISLAND_KICK_LEN (tylko bez straty - zwykłe losowe odwrócenia
+# psuły przejęty porządek bardziej, niż wyspa zdążyła naprawić w epoce).
+ISLAND_KICKS = 20
+ISLAND_KICK_LEN = 50
+
+# Magazyn slajdów podpięty w workerze.
+_WORKER: Dict[str, SlideStore] = {}
+
+# Wyspa: (porządek, score krawędzi, photo_a, photo_b) jako bajty tablic int32.
+Island = Tuple[bytes, bytes, bytes, bytes]
+
+
+def _init_worker(name: str, sizes: Sizes) -> None:
+    _WORKER["store"] = attach_store(name, sizes)
+
+
+def _set_pairs(store: SlideStore, pa: bytes, pb: bytes) -> None:
+    """Nanosi pary zdjęć wyspy na magazyn (tylko różniące się slajdy)."""
+    photo_a, photo_b = store.photo_a, store.photo_b
+    if pb == photo_b.tobytes() and pa == photo_a.tobytes():
+        return
+    for sid, (a, b) in enumerate(zip(int_array(pa), int_array(pb))):
+        if photo_a[sid] != a or photo_b[sid] != b:
+            store.set_pair(sid, a, b)
+    store.sync()
+
+
+def kick(state: OrderState, kicks: int, rng: random.Random) -> None:
+    """Do kicks losowych odwróceń odcinków order[i:j+1] (j - i < ISLAND_KICK_LEN)
+    nie obniżających wyniku (najwyżej 10 * kicks prób) - wyspa odchodzi od
+    przejętego porządku bez utraty jego wyniku.
+    """
+    n = len(state.order)
+    if n < 3:
+        return
+    done = 0
+    for _ in range(10 * kicks):
+        i = rng.randrange(n - 1)
+        j = min(n - 1, i + rng.randrange(1, ISLAND_KICK_LEN))
+        delta, left, right = two_opt_delta(state, i, j)
+        if delta < 0:
+            continue
+        apply_two_opt(state, i, j, left, right, delta)
+        done += 1
+        if done == kicks:
+            break
+
+
+def _improve_island(
+    island: Island,
+    iters: int,
+    seed: int,
+    kicks: int,
+    moves: Optional[Dict[str, float]],
+    with_moves: bool = False,
+) -> Tuple[Island, int, Optional[dict]]:
+    store = _WORKER["store"]
+    order, edges, pa, pb = island
+    _set_pairs(store, pa, pb)
+    state = OrderState(store, int_array(order).tolist(), int_array(edges).tolist())
+    if kicks:
+        kick(state, kicks, random.Random(seed))
+    metrics = Metrics() if with_moves else None
+    improve(state, iters=iters, seed=seed, moves=moves, metrics=metrics)
+    out = (
+        array("i", state.order).tobytes(),
+        array("i", state.edges).tobytes(),
+        store.photo_a.tobytes(),
+        store.photo_b.tobytes(),
+    )
+    return out, state.total, None if metrics is None else metrics.moves.get("local_search", {})
+
+
+def island_improve(
+    state: OrderState,
+    iters: int = 40000,
+    islands: int = 4,
+    epochs: int = 50,
+    seed: Optional[int] = None,
+    moves: Optional[Dict[str, float]] = None,
+    checkpoint=None,
+    metrics: Optional[Metrics] = None,
+    trace=None,
+    kicks: int = ISLAND_KICKS,
+) -> OrderState:
+    """improve na islands wyspach (procesach) startujących z state.
+    iters: iteracje każdej wyspy, dzielone na epochs epok; po każdej epoce wymiana
+    (epochs=1: niezależne przebiegi, zostaje najlepszy). state dostaje najlepszą
+    wyspę po każdej epoce (porządek, krawędzie i pary zdjęć w state.store).
+    metrics: ruchy wszystkich wysp w etapie "local_search", licznik "island_adoptions".
+    trace: convergence.Tracer - próbka po każdej epoce (score = najlepsza wyspa epoki).
+    """
+    n = len(state.order)
+    if n < 4 or iters <= 0:
+        return state
+    if islands <= 1:
+        return improve(state, iters=iters, seed=seed, moves=moves, checkpoint=checkpoint, metrics=metrics, trace=trace)
+
+    rng = random.Random(seed)
+    epochs = max(1, min(epochs, iters))
+    per_epoch = iters // epochs
+    with_moves = metrics is not None or trace is not None
+    accepted = tried = 0
+    if trace is not None:
+        trace.reset_counts()
+        trace.record("local_search", 0, state.total, state.total, 0, 0)
+
+    store = state.store
+    shm, sizes = share_store(store)
+    start: Island = (
+        array("i", state.order).tobytes(),
+        array("i", state.edges).tobytes(),
+        store.photo_a.tobytes(),
+        store.photo_b.tobytes(),
+    )
+    pool_islands: List[Island] = [start] * islands
+    island_kicks = [0] * islands
+    try:
+        with ProcessPoolExecutor(max_workers=islands, initializer=_init_worker, initargs=(shm.name, sizes)) as pool:
+            for epoch in range(epochs):
+                jobs = [
+                    pool.submit(
+                        _improve_island, pool_islands[w], per_epoch, rng.randrange(1 << 30), island_kicks[w], moves, with_moves
+                    )
+                    for w in range(islands)
+                ]
+                results = [job.result() for job in jobs]
+                pool_islands = [isl for isl, _, _ in results]
+                totals = [total for _, total, _ in results]
+                for _, _, isl_moves in results:
+                    if metrics is not None:
+                        metrics.merge_moves("local_search", isl_moves)
+                    if isl_moves is not None:
+                        accepted += sum(mv["accepted"] for mv in isl_moves.values())
+                        tried += sum(mv["attempted"] for mv in isl_moves.values())
+
+                best = max(range(islands), key=totals.__getitem__)
+                if totals[best] > state.total:
+                    order, edges, pa, pb = pool_islands[best]
+                    state.order[:] = int_array(order)
+                    state.edges[:] = int_array(edges)
+                    state.total = totals[best]
+                    _set_pairs(store, pa, pb)
+
+                # wymiana: wyspy gorsze od mediany przejmują najlepszą i ją różnicują
+                median = sorted(totals)[islands // 2]
+                island_kicks = [0] * islands
+                for w in range(islands):
+                    if totals[w] < median and epoch + 1 < epochs:
+                        pool_islands[w] = pool_islands[best]
+                        island_kicks[w] = kicks
+                        if metrics is not None:
+                            metrics.count("island_adoptions")
+
+                if checkpoint is not None:
+                    checkpoint.maybe_save(state.order, state.total, (epoch + 1) * per_epoch)
+                if trace is not None:
+                    if trace.record("local_search", (epoch + 1) * per_epoch, totals[best], state.total, accepted, tried):
+                        break
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return state
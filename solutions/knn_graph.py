@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Graf kandydatów: dla każdego slajdu M najlepszych partnerów (interest score).
+
+Zamiast porównywać wszystkie pary, kandydatów slajdu bierzemy z odwróconego
+indeksu tagów (store.postings): z krótkich list wszystkich, z długich
+losowo po probe // liczba_tagów. Z kandydatów zostaje M z najwyższym
+score > 0, malejąco; brakujące miejsca to -1.
+
+Graf to płaska tablica int32 (n * M) i zależy tylko od zbioru slajdów, więc
+trzymamy go na dysku pod skrótem slajdów (store_digest) i używamy ponownie
+między przebiegami / seedami. Na dysku slajdy są w kolejności kanonicznej
+(canonical_order), a przy wczytaniu graf jest przenumerowany na indeksy
+magazynu - przemieszanie slajdów dla innego seeda nie zmienia klucza. Korzystają z niego NN (candidates="knn")
+i ruchy swap / 2-opt / Or-opt w local_search.improve (knn=...).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import struct
+from array import array
+from heapq import nlargest
+from typing import List, Optional
+
+from bitset_kernel import make_scorer
+from slide_store import SlideStore
+
+MAGIC = b"HCKNN001"
+_HEADER = struct.Struct("<8s20sqqq")
+
+
+class KnnGraph:
+    """nbrs[sid * m : (sid + 1) * m] - sąsiedzi slajdu, od najlepszego; -1 = brak."""
+
+    __slots__ = ("m", "nbrs")
+
+    def __init__(self, m: int, nbrs: array) -> None:
+        self.m = m
+        self.nbrs = nbrs
+
+    def __len__(self) -> int:
+        return len(self.nbrs) // self.m if self.m else 0
+
+    def neighbours(self, sid: int) -> List[int]:
+        row = self.nbrs[sid * self.m : (sid + 1) * self.m]
+        return [c for c in row if c >= 0]
+
+
+def canonical_order(store: SlideStore) -> List[int]:
+    """Slajdy posortowane po (photo_a, photo_b) - kolejność niezależna od
+    przemieszania slajdów w make_slides, więc graf z dysku pasuje do każdego seeda.
+    """
+    pa, pb = store.photo_a, store.photo_b
+    return sorted(range(len(store)), key=lambda sid: (pa[sid], pb[sid]))
+
+
+def store_digest(store: SlideStore, canon: Optional[List[int]] = None) -> bytes:
+    """sha1 zbioru slajdów (zdjęcia + tagi w kolejności kanonicznej) - klucz grafu na dysku."""
+    if canon is None:
+        canon = canonical_order(store)
+    off, tid = store.offsets, store.tag_ids
+    h = hashlib.sha1()
+    h.update(array("i", (store.photo_a[sid] for sid in canon)).tobytes())
+    h.update(array("i", (store.photo_b[sid] for sid in canon)).tobytes())
+    for sid in canon:
+        h.update(struct.pack("<i", off[sid + 1] - off[sid]))
+        h.update(tid[off[sid] : off[sid + 1]].tobytes())
+    return h.digest()
+
+
+def _renumber(graph: KnnGraph, row_of: List[int], new_id: List[int]) -> KnnGraph:
+    """Graf w innej numeracji: wiersz i bierzemy z row_of[i], sąsiad c -> new_id[c]."""
+    m = graph.m
+    src = graph.nbrs
+    nbrs = array("i", [-1]) * len(src)
+    for i, r in enumerate(row_of):
+        base = i * m
+        for j, c in enumerate(src[r * m : (r + 1) * m]):
+            if c < 0:
+                break
+            nbrs[base + j] = new_id[c]
+    return KnnGraph(m, nbrs)
+
+
+def build_knn(
+    store: SlideStore,
+    m: int = 8,
+    probe: int = 64,
+    backend: str = "sets",
+    seed: int = 0,
+) -> KnnGraph:
+    """Graf M najlepszych partnerów z ~probe kandydatów per slajd (indeks odwrócony)."""
+    rnd = random.Random(seed).random
+    post = store.postings()
+    off = store.offsets
+    tid = store.tag_ids
+    scorer = make_scorer(store, backend)
+
+    n = len(store)
+    nbrs = array("i", [-1]) * (n * m)
+    for sid in range(n):
+        a, b = off[sid], off[sid + 1]
+        if a == b:
+            continue
+        per_tag = max(1, probe // (b - a))
+        cands = set()
+        for k in range(a, b):
+            lst = post[tid[k]]
+            size = len(lst)
+            if size <= per_tag:
+                cands.update(lst)
+            else:
+                for _ in range(per_tag):
+                    cands.add(lst[int(rnd() * size)])
+        cands.discard(sid)
+        if not cands:
+            continue
+
+        cands = list(cands)
+        top = nlargest(m, zip(scorer.scores(sid, cands), cands))
+        base = sid * m
+        for r, (sc, c) in enumerate(top):
+            if sc <= 0:
+                break
+            nbrs[base + r] = c
+    return KnnGraph(m, nbrs)
+
+
+def knn_cache_path(base: str, digest: bytes, m: int) -> str:
+    """Plik grafu obok wejścia (base = plik .txt) albo w katalogu danych."""
+    if os.path.isdir(base):
+        base = os.path.join(base, "slides")
+    return f"{base}.{digest.hex()[:16]}.knn{m}"
+
+
+def write_knn(path: str, digest: bytes, probe: int, graph: KnnGraph) -> None:
+    """Zapis atomowy: najpierw plik tymczasowy, potem os.replace."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, digest, len(graph), graph.m, probe))
+        graph.nbrs.tofile(f)
+    os.replace(tmp, path)
+
+
+def read_knn(path: str, digest: bytes, m: int, probe: int) -> Optional[KnnGraph]:
+    """Wczytuje graf; None gdy brak pliku albo inny zbiór slajdów / parametry."""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        head = f.read(_HEADER.size)
+        if len(head) != _HEADER.size:
+            return None
+        magic, dig, n, gm, gprobe = _HEADER.unpack(head)
+        if magic != MAGIC or dig != digest or gm != m or gprobe != probe:
+            return None
+        nbrs = array("i")
+        try:
+            nbrs.fromfile(f, n * m)
+        except EOFError:
+            return None
+    return KnnGraph(m, nbrs)
+
+
+def load_or_build_knn(
+    store: SlideStore,
+    m: int = 8,
+    probe: int = 64,
+    cache_base: Optional[str] = None,
+    backend: str = "sets",
+    seed: int = 0,
+) -> KnnGraph:
+    """Graf z dysku (cache_base: plik wejścia lub katalog danych) albo zbudowany i zapisany.
+    cache_base=None: bez cache.
+    """
+    if cache_base is None:
+        return build_knn(store, m, probe, backend, seed)
+    store.sync()
+    canon = canonical_order(store)  # kanoniczny indeks i -> slajd canon[i]
+    rank = [0] * len(canon)  # slajd -> indeks kanoniczny
+    for i, sid in enumerate(canon):
+        rank[sid] = i
+    digest = store_digest(store, canon)
+    path = knn_cache_path(cache_base, digest, m)
+    graph = read_knn(path, digest, m, probe)
+    if graph is not None:
+        return _renumber(graph, rank, canon)
+    graph = build_knn(store, m, probe, backend, seed)
+    try:
+        write_knn(path, digest, probe, _renumber(graph, canon, rank))
+    except OSError:
+        pass  # brak zapisu (np. katalog tylko do odczytu) - graf i tak jest
+    return graph
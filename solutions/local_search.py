@@ -4,91 +4,615 @@
 from __future__ import annotations
 
 import random
-from typing import List, Optional
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
-from usefull_functions import slide_score
+from slide_store import SlideStore, as_store
 
+# Domyślny miks ruchów (wagi względne): swap sąsiadów, swap losowy, krótki 2-opt, Or-opt,
+# wymiana zdjęcia między dwoma slajdami V+V.
+DEFAULT_MOVES: Dict[str, float] = {"adjacent": 0.60, "swap": 0.30, "two_opt": 0.10, "or_opt": 0.0, "partner": 0.0}
 
-def edge(slides: List[dict], order: List[int], k: int) -> int:
+# Ruch "partner" wymienia zdjęcia między slajdami odległymi o 1..PARTNER_REACH pozycji
+# (bliskie slajdy mają podobny kontekst; losowe pary dawały kilka razy mniejszy zysk).
+PARTNER_REACH = 3
+
+# sweep: pozycje po obu stronach slajdu sprawdzane jako partnerzy swap / 2-opt.
+SWEEP_WINDOW = 8
+
+
+def move_thresholds(moves: Optional[Dict[str, float]] = None) -> List[float]:
+    """Skumulowane progi losowania ruchów w kolejności DEFAULT_MOVES."""
+    if moves is None:
+        moves = DEFAULT_MOVES
+    unknown = set(moves) - set(DEFAULT_MOVES)
+    if unknown:
+        raise ValueError(f"Unknown move type(s): {', '.join(sorted(unknown))}")
+    weights = [max(0.0, float(moves.get(m, 0.0))) for m in DEFAULT_MOVES]
+    total = sum(weights)
+    if total <= 0:
+        raise ValueError("Move weights must not all be zero")
+    out = []
+    acc = 0.0
+    for w in weights:
+        acc += w
+        out.append(acc / total)
+    return out
+
+
+def parse_moves(text: str) -> Dict[str, float]:
+    """'adjacent=0.5,swap=0.3,or_opt=0.2' -> słownik wag (pominięte ruchy mają wagę 0)."""
+    moves = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        moves[name.strip()] = float(weight)
+    move_thresholds(moves)
+    return moves
+
+
+def edge(store: SlideStore, order: List[int], k: int) -> int:
     """Score dla krawędzi i -> i+1 w bieżącym porządku."""
-    return slide_score(slides[order[k]], slides[order[k + 1]])
+    return store.score(order[k], order[k + 1])
 
 
-def local_improve(
-    slides: List[dict],
-    order: List[int],
+class OrderState:
+    """Porządek + score każdej krawędzi + bieżąca suma.
+
+    edges[k] == score(order[k], order[k + 1]); po zaakceptowanym ruchu
+    poprawiamy tylko zmienione wpisy, więc koszt "przed" ruchem to odczyt
+    z tablicy, a total jest zawsze aktualnym wynikiem porządku.
+    """
+
+    __slots__ = ("store", "order", "edges", "total")
+
+    def __init__(self, store: SlideStore, order: List[int], edges: Optional[List[int]] = None) -> None:
+        self.store = store
+        self.order = order
+        if edges is None:
+            score = store.score
+            edges = [score(order[k], order[k + 1]) for k in range(len(order) - 1)]
+        self.edges = edges
+        self.total = sum(edges)
+
+
+def swap_delta(state: OrderState, i: int, j: int) -> Tuple[int, Dict[int, int]]:
+    """Zysk zamiany pozycji i < j oraz nowe score dotkniętych krawędzi."""
+    order = state.order
+    edges = state.edges
+    score = state.store.score
+    n = len(order)
+
+    affected = set()
+    for k in (i - 1, i, j - 1, j):
+        if 0 <= k < n - 1:
+            affected.add(k)
+
+    before = sum(edges[k] for k in affected)
+    order[i], order[j] = order[j], order[i]
+    new = {k: score(order[k], order[k + 1]) for k in affected}
+    order[i], order[j] = order[j], order[i]
+    return sum(new.values()) - before, new
+
+
+def apply_swap(
+    state: OrderState, i: int, j: int, new: Dict[int, int], delta: int, pos: Optional[List[int]] = None
+) -> None:
+    order = state.order
+    order[i], order[j] = order[j], order[i]
+    for k, sc in new.items():
+        state.edges[k] = sc
+    state.total += delta
+    if pos is not None:
+        pos[order[i]], pos[order[j]] = i, j
+
+
+def two_opt_delta(state: OrderState, i: int, j: int) -> Tuple[int, int, int]:
+    """Zysk odwrócenia order[i:j+1] oraz nowe score krawędzi na brzegach (lewa, prawa)."""
+    order = state.order
+    edges = state.edges
+    score = state.store.score
+    n = len(order)
+
+    delta = 0
+    left = right = 0
+    if i - 1 >= 0:
+        left = score(order[i - 1], order[j])
+        delta += left - edges[i - 1]
+    if j + 1 < n:
+        right = score(order[i], order[j + 1])
+        delta += right - edges[j]
+    return delta, left, right
+
+
+def apply_two_opt(
+    state: OrderState, i: int, j: int, left: int, right: int, delta: int, pos: Optional[List[int]] = None
+) -> None:
+    order = state.order
+    edges = state.edges
+    order[i : j + 1] = reversed(order[i : j + 1])
+    edges[i:j] = reversed(edges[i:j])
+    if i - 1 >= 0:
+        edges[i - 1] = left
+    if j + 1 < len(order):
+        edges[j] = right
+    state.total += delta
+    if pos is not None:
+        for k in range(i, j + 1):
+            pos[order[k]] = k
+
+
+def partner_swap_delta(
+    state: OrderState, i: int, j: int, x: int, y: int
+) -> Tuple[int, Tuple[List[int], List[int], frozenset, frozenset], Dict[int, int]]:
+    """Zysk wymiany zdjęcia x (0: photo_a, 1: photo_b) slajdu order[i] ze zdjęciem y
+    slajdu order[j] (oba slajdy V+V, i < j). Zwraca (zysk, nowe pary i ich tagi, nowe
+    score dotkniętych krawędzi); porządek się nie zmienia, zmieniają się dwie unie tagów.
+    """
+    order = state.order
+    edges = state.edges
+    store = state.store
+    sets = store.tag_sets()
+    n = len(order)
+    si, sj = order[i], order[j]
+
+    pi = [store.photo_a[si], store.photo_b[si]]
+    pj = [store.photo_a[sj], store.photo_b[sj]]
+    pi[x], pj[y] = pj[y], pi[x]
+    ti = store.pair_tags(pi[0], pi[1])
+    tj = store.pair_tags(pj[0], pj[1])
+
+    def tags_at(k: int) -> frozenset:
+        return ti if k == i else tj if k == j else sets[order[k]]
+
+    new = {}
+    for k in (i - 1, i, j - 1, j):
+        if 0 <= k < n - 1 and k not in new:
+            new[k] = store.sets_score(tags_at(k), tags_at(k + 1))
+    before = sum(edges[k] for k in new)
+    return sum(new.values()) - before, (pi, pj, ti, tj), new
+
+
+def apply_partner_swap(
+    state: OrderState,
+    i: int,
+    j: int,
+    pairs: Tuple[List[int], List[int], frozenset, frozenset],
+    new: Dict[int, int],
+    delta: int,
+) -> None:
+    pi, pj, ti, tj = pairs
+    store = state.store
+    store.set_pair(state.order[i], pi[0], pi[1], ti)
+    store.set_pair(state.order[j], pj[0], pj[1], tj)
+    for k, sc in new.items():
+        state.edges[k] = sc
+    state.total += delta
+
+
+def _or_opt(state: OrderState, pos: List[int], i: int, length: int, g: int) -> int:
+    """Przeniesienie segmentu order[i:i+length] w lukę za pozycją g
+    (między order[g] a order[g+1]; g=-1 to początek), w lepszej z dwóch orientacji.
+    Wykonuje ruch tylko gdy zysk > 0; zwraca zysk (0 gdy bez zmian).
+    """
+    order = state.order
+    edges = state.edges
+    score = state.store.score
+    n = len(order)
+    j = i + length  # pierwsza pozycja za segmentem
+    first, last = order[i], order[j - 1]
+    p = order[i - 1] if i > 0 else None
+    q = order[j] if j < n else None
+    x = order[g] if g >= 0 else None
+    y = order[g + 1] if g + 1 < n else None
+
+    removed = edges[g] if x is not None and y is not None else 0
+    join = 0
+    if p is not None:
+        removed += edges[i - 1]
+    if q is not None:
+        removed += edges[j - 1]
+    if p is not None and q is not None:
+        join = score(p, q)
+
+    fwd_first = score(x, first) if x is not None else 0
+    fwd_last = score(last, y) if y is not None else 0
+    rev_first = score(x, last) if x is not None else 0
+    rev_last = score(first, y) if y is not None else 0
+    rev = rev_first + rev_last > fwd_first + fwd_last
+    sc_first, sc_last = (rev_first, rev_last) if rev else (fwd_first, fwd_last)
+
+    gain = join + sc_first + sc_last - removed
+    if gain <= 0:
+        return 0
+
+    seg = order[i:j]
+    seg_edges = edges[i : j - 1]
+    if rev:
+        seg.reverse()
+        seg_edges.reverse()
+
+    if g < i:
+        # [x] M S [q] -> [x] S' M [q]; M = order[g+1:i]
+        a = g + 1
+        mid = order[a:i]
+        order[a:j] = seg + mid
+        new_edges = seg_edges + [sc_last] + edges[a : i - 1]
+        if x is not None:
+            new_edges.insert(0, sc_first)
+        if q is not None:
+            new_edges.append(join)
+        edges[max(g, 0) : j if q is not None else j - 1] = new_edges
+        changed = range(a, j)
+    else:
+        # [p] S M [y] -> [p] M S' [y]; M = order[j:g+1]
+        mid = order[j : g + 1]
+        order[i : g + 1] = mid + seg
+        new_edges = edges[j:g] + [sc_first] + seg_edges
+        if p is not None:
+            new_edges.insert(0, join)
+        if y is not None:
+            new_edges.append(sc_last)
+        edges[i - 1 if p is not None else i : g + 1 if y is not None else g] = new_edges
+        changed = range(i, g + 1)
+
+    for k in changed:
+        pos[order[k]] = k
+    state.total += gain
+    return gain
+
+
+def improve(
+    state: OrderState,
     iters: int = 40000,
-    seed: Optional[int] = None) -> List[int]:
-    """Prosty hill-climbing na kolejności slajdów.
-    - swap sąsiadów,
-    - swap losowy,
-    - krótki 2-opt.
-    Zysk liczymy tylko na dotkniętych krawędziach.
+    seed: Optional[int] = None,
+    fixed_ends: bool = False,
+    moves: Optional[Dict[str, float]] = None,
+    checkpoint=None,
+    metrics=None,
+    trace=None,
+    knn=None) -> OrderState:
+    """Hill-climbing na stanie porządku (ruchy jak w local_improve).
+    moves: wagi ruchów (klucze jak w DEFAULT_MOVES).
+    checkpoint: obiekt z maybe_save(order, score, iteration) (np. checkpoint.Checkpointer).
+    metrics: metrics.Metrics - próby / przyjęte ruchy / zysk per typ ruchu (etap "local_search").
+    trace: convergence.Tracer - próbka (iteracja, czas, wynik, odsetek przyjęć) co trace.every
+    iteracji; callback zwracający True kończy poprawę.
+    knn: knn_graph.KnnGraph - swap / 2-opt / Or-opt celują w sąsiadów z grafu kandydatów
+    (swap stawia sąsiada order[i - 1] na pozycji i, 2-opt odwraca odcinek tak, by slajd
+    sąsiadował ze swoim sąsiadem z grafu) zamiast w losowe pozycje.
+    Ruch "partner" zmienia pary zdjęć V w state.store (wymaga store.photo_sets);
+    CSR magazynu jest odświeżany na końcu (SlideStore.sync).
     """
     if seed is not None:
         random.seed(seed)
 
+    t_adj, t_swap, t_2opt, t_or, _ = move_thresholds(moves)
+    store = state.store
+    if t_or < 1.0 and store.photo_sets is None:
+        raise ValueError("The partner move needs photo tags (SlideStore.set_photo_tags)")
+    photo_b = store.photo_b
+    slide_score = store.score
+    order = state.order
+    edges = state.edges
+
     n = len(order)
-    if n < 4 or iters <= 0:
-        return order
+    lo = 1 if fixed_ends else 0
+    hi = n - 1 - lo
+    if n < 4 + 2 * lo or iters <= 0:
+        return state
+
+    # Or-opt i ruchy po grafie potrzebują pozycji slajdów (-1: poza tym porządkiem),
+    # Or-opt bez grafu - indeksu tag -> slajdy
+    pos: Optional[List[int]] = None
+    if t_or > t_2opt or knn is not None:
+        pos = [-1] * len(store)
+        for k, sid in enumerate(order):
+            pos[sid] = k
+    if t_or > t_2opt and knn is None:
+        # tagi z tag_sets i postings - ruch "partner" aktualizuje je od razu, CSR dopiero w sync()
+        post = store.postings()
+        sets = store.tag_sets()
+    if knn is not None:
+        nbrs = knn.nbrs
+        m = knn.m
+
+    # liczniki per typ ruchu (kolejność DEFAULT_MOVES)
+    tried = [0] * 5
+    taken = [0] * 5
+    gained = [0] * 5
+
+    trace_every = 0
+    if trace is not None:
+        trace.reset_counts()
+        trace.record("local_search", 0, state.total, state.total, 0, 0)
+        trace_every = trace.every
+
+    stopped = False
+    for it in range(iters):
+        if checkpoint is not None and it & 1023 == 0:
+            checkpoint.maybe_save(order, state.total, it)
+        if trace_every and it and it % trace_every == 0:
+            if trace.record("local_search", it, state.total, state.total, sum(taken), sum(tried)):
+                stopped = True
+                break
 
-    for _ in range(iters):
         r = random.random()
 
-        if r < 0.60:
-            i = random.randrange(0, n - 1)
+        if r < t_adj:
+            i = random.randrange(lo, hi)
             a, b = order[i], order[i + 1]
 
+            # krawędź a-b przechodzi w b-a: score symetryczny, bez zmian
             before = 0
             after = 0
             if i - 1 >= 0:
-                before += slide_score(slides[order[i - 1]], slides[a])
-                after += slide_score(slides[order[i - 1]], slides[b])
-
-            before += slide_score(slides[a], slides[b])
-            after += slide_score(slides[b], slides[a])
-
+                left = slide_score(order[i - 1], b)
+                before += edges[i - 1]
+                after += left
             if i + 2 < n:
-                before += slide_score(slides[b], slides[order[i + 2]])
-                after += slide_score(slides[a], slides[order[i + 2]])
+                right = slide_score(a, order[i + 2])
+                before += edges[i + 1]
+                after += right
 
+            tried[0] += 1
             if after > before:
-                order[i], order[i + 1] = order[i + 1], order[i]
+                taken[0] += 1
+                gained[0] += after - before
+                order[i], order[i + 1] = b, a
+                if pos is not None:
+                    pos[a], pos[b] = i + 1, i
+                if i - 1 >= 0:
+                    edges[i - 1] = left
+                if i + 2 < n:
+                    edges[i + 1] = right
+                state.total += after - before
 
-        elif r < 0.90:
-            i = random.randrange(0, n)
-            j = random.randrange(0, n)
+        elif r < t_swap:
+            if knn is None:
+                i = random.randrange(lo, hi + 1)
+                j = random.randrange(lo, hi + 1)
+            else:
+                i = random.randrange(max(lo, 1), hi + 1)
+                c = nbrs[order[i - 1] * m + random.randrange(m)]
+                if c < 0:
+                    continue
+                j = pos[c]
+                if j < lo or j > hi:
+                    continue
             if i == j:
                 continue
             if i > j:
                 i, j = j, i
 
-            affected = set()
-            for k in (i - 1, i, j - 1, j):
-                if 0 <= k < n - 1:
-                    affected.add(k)
+            tried[1] += 1
+            delta, new = swap_delta(state, i, j)
+            if delta > 0:
+                taken[1] += 1
+                gained[1] += delta
+                apply_swap(state, i, j, new, delta, pos)
+
+        elif r < t_2opt:
+            if knn is None:
+                i = random.randrange(lo, hi - 1)
+                j = random.randrange(i + 1, min(hi, i + 2000))
+            else:
+                p = random.randrange(n)
+                c = nbrs[order[p] * m + random.randrange(m)]
+                if c < 0:
+                    continue
+                q = pos[c]
+                if q > p + 1:
+                    i, j = p + 1, q
+                elif 0 <= q < p - 1:
+                    i, j = q, p - 1
+                else:
+                    continue
+                if i < lo or j > hi or j - i >= 2000:
+                    continue
 
-            before = sum(edge(slides, order, k) for k in affected)
-            order[i], order[j] = order[j], order[i]
-            after = sum(edge(slides, order, k) for k in affected)
+            tried[2] += 1
+            delta, left, right = two_opt_delta(state, i, j)
+            if delta > 0:
+                taken[2] += 1
+                gained[2] += delta
+                apply_two_opt(state, i, j, left, right, delta, pos)
 
-            if after <= before:
-                order[i], order[j] = order[j], order[i]
+        elif r < t_or:
+            length = random.randrange(1, 4)
+            if hi - length + 2 <= lo:
+                continue
+            i = random.randrange(lo, hi - length + 2)
+
+            # cel: slajd dzielący losowy tag z losowym slajdem segmentu (albo jego sąsiad z grafu)
+            s = order[i + random.randrange(length)]
+            if knn is None:
+                tags = tuple(sets[s])
+                if not tags:
+                    continue
+                lst = post[tags[random.randrange(len(tags))]]
+                c = lst[random.randrange(len(lst))]
+            else:
+                c = nbrs[s * m + random.randrange(m)]
+                if c < 0:
+                    continue
+            q = pos[c]
+            if q < 0 or i <= q < i + length:
+                continue
+            g = q - 1 if random.random() < 0.5 else q
+            if i - 1 <= g <= i + length - 1 or g < lo - 1 or g > hi:
+                continue
+
+            tried[3] += 1
+            gain = _or_opt(state, pos, i, length, g)
+            if gain > 0:
+                taken[3] += 1
+                gained[3] += gain
 
         else:
-            i = random.randrange(0, n - 2)
-            j = random.randrange(i + 1, min(n - 1, i + 2000))
+            i = random.randrange(lo, hi)
+            j = min(hi, i + random.randrange(1, PARTNER_REACH + 1))
+            if photo_b[order[i]] < 0 or photo_b[order[j]] < 0:
+                continue
 
-            before = 0
-            after = 0
-            if i - 1 >= 0:
-                before += slide_score(slides[order[i - 1]], slides[order[i]])
-                after += slide_score(slides[order[i - 1]], slides[order[j]])
-            if j + 1 < n:
-                before += slide_score(slides[order[j]], slides[order[j + 1]])
-                after += slide_score(slides[order[i]], slides[order[j + 1]])
+            tried[4] += 1
+            delta, pairs, new = partner_swap_delta(state, i, j, random.randrange(2), random.randrange(2))
+            if delta > 0:
+                taken[4] += 1
+                gained[4] += delta
+                apply_partner_swap(state, i, j, pairs, new, delta)
 
-            if after > before:
-                order[i : j + 1] = reversed(order[i : j + 1])
+    store.sync()
+    if trace is not None and not stopped:
+        trace.record("local_search", iters, state.total, state.total, sum(taken), sum(tried))
+    if metrics is not None:
+        metrics.add_moves("local_search", list(DEFAULT_MOVES), tried, taken, gained)
+    return state
+
+
+def sweep(
+    state: OrderState,
+    max_steps: int = 1000000,
+    fixed_ends: bool = False,
+    knn=None,
+    checkpoint=None,
+    metrics=None,
+    trace=None,
+) -> bool:
+    """First-improvement z don't-look bits: kolejka slajdów do sprawdzenia.
 
-    return order
+    Krok: zdejmujemy slajd s z kolejki i dla pozycji q z okna SWEEP_WINDOW wokół s
+    (oraz pozycji sąsiadów s z grafu knn) próbujemy swap(s, q), a potem 2-opt
+    stawiający s obok order[q]; pierwszy ruch z zyskiem > 0 jest wykonywany.
+    Slajd bez poprawy nie wraca do kolejki, dopóki ruch nie zmieni jego sąsiedztwa
+    (slajdy na brzegach ruchu są budzone). Pusta kolejka = lokalne optimum tego
+    sąsiedztwa. Zwraca True, gdy je osiągnięto (przed max_steps krokami).
+    metrics: ruchy w etapie "sweep", liczniki sweep_steps i sweep_local_optimum.
+    trace: próbka co trace.every kroków (faza "sweep"); True z callbacku kończy.
+    """
+    store = state.store
+    order = state.order
+    n = len(order)
+    lo = 1 if fixed_ends else 0
+    hi = n - 1 - lo
+    if n < 4 + 2 * lo:
+        return True
+
+    pos = [-1] * len(store)
+    for k, sid in enumerate(order):
+        pos[sid] = k
+    queue = deque(order[lo : hi + 1])
+    active = bytearray(len(store))
+    for sid in queue:
+        active[sid] = 1
+    if knn is not None:
+        nbrs = knn.nbrs
+        m = knn.m
+
+    def wake(positions) -> None:
+        for k in positions:
+            if lo <= k <= hi:
+                sid = order[k]
+                if not active[sid]:
+                    active[sid] = 1
+                    queue.append(sid)
+
+    # liczniki: swap, two_opt
+    tried = [0, 0]
+    taken = [0, 0]
+    gained = [0, 0]
+
+    trace_every = 0
+    if trace is not None:
+        trace.reset_counts()
+        trace.record("sweep", 0, state.total, state.total, 0, 0)
+        trace_every = trace.every
+
+    steps = 0
+    stopped = False
+    while queue and steps < max_steps:
+        if checkpoint is not None and steps & 1023 == 0:
+            checkpoint.maybe_save(order, state.total, steps)
+        if trace_every and steps and steps % trace_every == 0:
+            if trace.record("sweep", steps, state.total, state.total, sum(taken), sum(tried)):
+                stopped = True
+                break
+
+        s = queue.popleft()
+        active[s] = 0
+        steps += 1
+        p = pos[s]
+        cands = list(range(max(lo, p - SWEEP_WINDOW), min(hi, p + SWEEP_WINDOW) + 1))
+        if knn is not None:
+            for c in nbrs[s * m : (s + 1) * m]:
+                if c >= 0 and lo <= pos[c] <= hi:
+                    cands.append(pos[c])
+
+        for q in cands:
+            if q == p:
+                continue
+            i, j = (p, q) if p < q else (q, p)
+            tried[0] += 1
+            delta, new = swap_delta(state, i, j)
+            if delta > 0:
+                taken[0] += 1
+                gained[0] += delta
+                apply_swap(state, i, j, new, delta, pos)
+                wake((i - 1, i, i + 1, j - 1, j, j + 1))
+                break
+
+            if q > p + 1:
+                i, j = p + 1, q
+            elif q < p - 1:
+                i, j = q, p - 1
+            else:
+                continue
+            if j - i >= 2000:
+                continue
+            tried[1] += 1
+            delta, left, right = two_opt_delta(state, i, j)
+            if delta > 0:
+                taken[1] += 1
+                gained[1] += delta
+                apply_two_opt(state, i, j, left, right, delta, pos)
+                wake((i - 1, i, j, j + 1))
+                break
+
+    optimum = not queue and not stopped
+    if trace is not None and not stopped:
+        trace.record("sweep", steps, state.total, state.total, sum(taken), sum(tried))
+    if metrics is not None:
+        metrics.add_moves("sweep", ["swap", "two_opt"], tried, taken, gained)
+        metrics.count("sweep_steps", steps)
+        metrics.count("sweep_local_optimum", int(optimum))
+    return optimum
+
+
+def local_improve(
+    slides: Union[SlideStore, Sequence[dict]],
+    order: List[int],
+    iters: int = 40000,
+    seed: Optional[int] = None,
+    fixed_ends: bool = False,
+    moves: Optional[Dict[str, float]] = None,
+    trace=None,
+    knn=None) -> List[int]:
+    """Prosty hill-climbing na kolejności slajdów.
+    - swap sąsiadów,
+    - swap losowy,
+    - krótki 2-opt,
+    - Or-opt: przeniesienie 1-3 slajdów (ew. odwróconych) obok slajdu
+      z tym samym tagiem (domyślnie waga 0; patrz moves / DEFAULT_MOVES),
+    - partner: wymiana jednego zdjęcia między dwoma slajdami V+V
+      (domyślnie waga 0; slides musi być SlideStore z photo_sets).
+    Zysk liczymy tylko na dotkniętych krawędziach; score "przed" ruchem
+    czytamy z utrzymywanej tablicy krawędzi (OrderState).
+    fixed_ends=True: pierwsza i ostatnia pozycja zostają na miejscu
+    (fragment większego porządku, krawędzie na styku się nie zmieniają).
+    trace: convergence.Tracer (jak w improve).
+    knn: graf kandydatów (knn_graph) - ruchy celują w sąsiadów z grafu (jak w improve).
+    """
+    state = OrderState(as_store(slides), order)
+    improve(state, iters=iters, seed=seed, fixed_ends=fixed_ends, moves=moves, trace=trace, knn=knn)
+    return state.order
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Grupowanie slajdów przez MinHash + banded LSH.
+
+Sygnatura slajdu to bands * rows minimów po losowych permutacjach id tagów
+(min(perm[t] for t in tagi) - p-stwo równości dla dwóch slajdów to ich
+podobieństwo Jaccarda). Pasmo = krotka rows kolejnych minimów.
+
+Partycję budujemy pasmo po pasmie: slajdy jeszcze bez grupy trafiają do
+kubełków bieżącego pasma, a kubełek z >= min_group slajdami staje się grupą
+(zbyt duże kubełki dzielimy na kawałki po max_group, po posortowaniu
+sygnatur, żeby podobne slajdy zostały razem). Slajdy, które w żadnym
+paśmie nie trafiły do dość dużego kubełka, tworzą grupy resztkowe.
+"""
+
+from __future__ import annotations
+
+import random
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from bitset_kernel import np
+from slide_store import SlideStore
+
+# Domyślne pasma: rows=2 (AND - kubełek wymaga zgodności dwóch minimów) i 12 pasm (OR);
+# grupą zostaje kubełek z >= LSH_MIN_GROUP slajdami. Mniejsze kubełki dają podobniejsze
+# grupy (lepszy Grouped), ale więcej granic między grupami (gorszy Mixed) - pomiary
+# w README (sekcja o --group_key lsh).
+LSH_BANDS = 12
+LSH_ROWS = 2
+LSH_MIN_GROUP = 400
+
+
+def minhash_signatures(store: SlideStore, num_hashes: int, seed: Optional[int] = None) -> List[Tuple[int, ...]]:
+    """Sygnatury MinHash (krotki długości num_hashes); slajd bez tagów ma same -1.
+    Z NumPy minima po wierszach CSR liczy np.minimum.reduceat (te same sygnatury).
+    """
+    rng = random.Random(seed)
+    n_tags = max(len(store.tag_names), 1 + max(store.tag_ids, default=-1))
+    perms = []
+    for _ in range(num_hashes):
+        perm = list(range(n_tags))
+        rng.shuffle(perm)
+        perms.append(perm)
+    if np is not None:
+        return _signatures_numpy(store, perms)
+
+    off = store.offsets
+    tid = store.tag_ids
+    sigs = []
+    empty = (-1,) * num_hashes
+    for sid in range(len(store)):
+        tags = tid[off[sid] : off[sid + 1]]
+        if not tags:
+            sigs.append(empty)
+            continue
+        sigs.append(tuple(min(map(perm.__getitem__, tags)) for perm in perms))
+    return sigs
+
+
+def _signatures_numpy(store: SlideStore, perms: List[List[int]]) -> List[Tuple[int, ...]]:
+    n = len(store)
+    off = np.frombuffer(store.offsets, dtype=np.int32)
+    tid = np.frombuffer(store.tag_ids, dtype=np.int32)
+    sigs = np.full((n, len(perms)), -1, dtype=np.int32)
+    rows = np.flatnonzero(off[1:] > off[:-1])
+    if len(rows):
+        starts = off[rows]
+        for h, perm in enumerate(perms):
+            sigs[rows, h] = np.minimum.reduceat(np.asarray(perm, dtype=np.int32)[tid], starts)
+    return list(map(tuple, sigs.tolist()))
+
+
+def _chunks(group: List[int], sigs: List[Tuple[int, ...]], max_group: int) -> List[List[int]]:
+    if len(group) <= max_group:
+        return [group]
+    group = sorted(group, key=sigs.__getitem__)
+    return [group[i : i + max_group] for i in range(0, len(group), max_group)]
+
+
+def lsh_groups(
+    store: SlideStore,
+    bands: int = LSH_BANDS,
+    rows: int = LSH_ROWS,
+    max_group: int = 500,
+    seed: Optional[int] = None,
+    min_group: int = LSH_MIN_GROUP,
+) -> List[List[int]]:
+    """Partycja slajdów na grupy podobnych (lista list id), grupy <= max_group.
+    Kubełek pasma z mniej niż min_group slajdami nie tworzy grupy - jego slajdy
+    czekają na kolejne pasma (małe grupy psuły wynik Mixed na granicach grup).
+    """
+    max_group = max(2, max_group)
+    min_group = max(2, min(min_group, max_group))
+    sigs = minhash_signatures(store, bands * rows, seed=seed)
+
+    groups: List[List[int]] = []
+    left = list(range(len(store)))
+    for band in range(bands):
+        lo = band * rows
+        buckets: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+        for sid in left:
+            buckets[sigs[sid][lo : lo + rows]].append(sid)
+
+        left = []
+        for bucket in buckets.values():
+            if len(bucket) < min_group:
+                left.extend(bucket)
+            else:
+                groups.extend(_chunks(bucket, sigs, max_group))
+
+    if left:
+        groups.extend(_chunks(left, sigs, max_group))
+    return groups
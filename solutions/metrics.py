@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Pomiary przebiegu solvera: czasy etapów, liczniki i statystyki ruchów.
+
+Metrics zbiera:
+- stages: czas zegarowy i CPU etapów (load, pairing, ordering, local_search, ...),
+- counters: m.in. score_evals - liczba obliczeń interest score,
+- moves: per etap i typ ruchu liczba prób, przyjętych ruchów i łączny zysk.
+Wszystko jest opcjonalne: funkcje przyjmują metrics=None i wtedy nie
+liczą nic poza tanimi licznikami lokalnymi.
+
+score_evals liczy magazyn zwrócony przez count_score_evals (CountingStore,
+podklasa SlideStore z licznikiem w metodach scoringu, ze swoim BitsetScorer);
+pozostałe magazyny i przy wyłączonych metrykach pętle nie płacą za licznik.
+Liczymy tylko w bieżącym procesie - workery --local_workers / --starts / wysp
+odsyłają same statystyki ruchów.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from bitset_kernel import BitsetScorer
+from slide_store import SlideStore
+
+MoveStats = Dict[str, Dict[str, int]]
+
+
+class Metrics:
+    """Pojemnik na pomiary jednego przebiegu (zapis: to_dict / write_json)."""
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.moves: Dict[str, MoveStats] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Dolicza czas zegarowy / CPU i score_evals bloku do etapu name."""
+        evals = self.counters.get("score_evals", 0)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            st = self.stages.setdefault(name, {"wall": 0.0, "cpu": 0.0, "calls": 0, "score_evals": 0})
+            st["wall"] += time.perf_counter() - wall
+            st["cpu"] += time.process_time() - cpu
+            st["calls"] += 1
+            st["score_evals"] += self.counters.get("score_evals", 0) - evals
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_moves(
+        self,
+        stage: str,
+        names: Sequence[str],
+        attempted: Sequence[int],
+        accepted: Sequence[int],
+        gain: Sequence[int],
+    ) -> None:
+        """Dolicza liczniki ruchów (listy równoległe do names)."""
+        self.merge_moves(
+            stage,
+            {
+                name: {"attempted": a, "accepted": b, "gain": g}
+                for name, a, b, g in zip(names, attempted, accepted, gain)
+                if a
+            },
+        )
+
+    def merge_moves(self, stage: str, moves: MoveStats) -> None:
+        out = self.moves.setdefault(stage, {})
+        for name, stats in moves.items():
+            acc = out.setdefault(name, {"attempted": 0, "accepted": 0, "gain": 0})
+            for key, value in stats.items():
+                acc[key] += value
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": {k: {f: round(v, 4) if isinstance(v, float) else v for f, v in st.items()} for k, st in self.stages.items()},
+            "counters": dict(self.counters),
+            "moves": self.moves,
+        }
+
+    def write_json(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp, path)
+
+    def summary(self) -> str:
+        lines = []
+        for name, st in self.stages.items():
+            lines.append(
+                f"{name:<14} wall={st['wall']:8.3f}s cpu={st['cpu']:8.3f}s score_evals={st['score_evals']:,}"
+            )
+        for stage, moves in self.moves.items():
+            for name, mv in moves.items():
+                rate = mv["accepted"] / mv["attempted"] if mv["attempted"] else 0.0
+                lines.append(
+                    f"{stage + '/' + name:<22} prób={mv['attempted']:,} przyjęte={mv['accepted']:,} "
+                    f"({rate:.1%}) zysk={mv['gain']:+,}"
+                )
+        for name, value in self.counters.items():
+            if name != "score_evals":  # już w wierszach etapów
+                lines.append(f"{name:<22} {value:,}")
+        return "\n".join(lines)
+
+
+def timed(metrics: Optional[Metrics], name: str):
+    """metrics.stage(name) albo pusty kontekst, gdy metryki są wyłączone."""
+    return nullcontext() if metrics is None else metrics.stage(name)
+
+
+class CountingBitsetScorer(BitsetScorer):
+    """BitsetScorer magazynu CountingStore - dolicza oceny do jego licznika."""
+
+    def __init__(self, store: "CountingStore") -> None:
+        super().__init__(store)
+        self.counters = store.counters
+
+    def score(self, a: int, b: int) -> int:
+        self.counters["score_evals"] += 1
+        return super().score(a, b)
+
+    def score_many(self, a: int, cands: Sequence[int]):
+        self.counters["score_evals"] += len(cands)
+        return super().score_many(a, cands)
+
+
+class CountingStore(SlideStore):
+    """SlideStore liczący obliczenia interest score w counters["score_evals"]."""
+
+    __slots__ = ("counters",)
+
+    # bitset_kernel.make_scorer buduje scorer bitsetowy tej klasy
+    bitset_scorer = CountingBitsetScorer
+
+    def score(self, a: int, b: int) -> int:
+        self.counters["score_evals"] += 1
+        return SlideStore.score(self, a, b)
+
+    def best_of(self, a: int, cands: Sequence[int]) -> int:
+        self.counters["score_evals"] += len(cands)
+        return SlideStore.best_of(self, a, cands)
+
+    def scores(self, a: int, cands: Sequence[int]) -> List[int]:
+        self.counters["score_evals"] += len(cands)
+        return SlideStore.scores(self, a, cands)
+
+    def order_score(self, order: Sequence[int]) -> int:
+        self.counters["score_evals"] += max(0, len(order) - 1)
+        return SlideStore.order_score(self, order)
+
+    def sets_score(self, s: frozenset, t: frozenset) -> int:
+        self.counters["score_evals"] += 1
+        return SlideStore.sets_score(s, t)
+
+
+def count_score_evals(store: SlideStore, metrics: Optional[Metrics]) -> SlideStore:
+    """Magazyn liczący obliczenia score w metrics.counters["score_evals"] (dzieli tablice
+    ze store - dalej używamy tylko zwróconego obiektu); metrics=None albo store już
+    liczący: store bez zmian.
+    """
+    if metrics is None or isinstance(store, CountingStore):
+        return store
+    counted = CountingStore.__new__(CountingStore)
+    for name in SlideStore.__slots__:
+        setattr(counted, name, getattr(store, name))
+    counted.counters = metrics.counters
+    metrics.counters.setdefault("score_evals", 0)
+    return counted
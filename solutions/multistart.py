@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Multi-start: niezależne przebiegi (parowanie + kolejność + poprawa lokalna)
+w puli procesów; zostaje najlepsza kolejność.
+
+Tablice CSR zdjęć trafiają raz do pamięci współdzielonej; workery podpinają
+się do niej w initializerze (bez picklowania słowników). Z workerów wracają
+tylko zwarte tablice: id zdjęć slajdów i kolejność.
+"""
+
+from __future__ import annotations
+
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from io_help import photos_from_arrays
+from photo_cache import PhotoArrays
+from pipeline import solve_photos
+from shared_arrays import Sizes, int_array, pack_shared, unpack_shared
+from slide_store import SlideStore
+
+# Stan workera: zdjęcia budowane raz, przy podpięciu pamięci współdzielonej.
+_WORKER: Dict[str, object] = {}
+
+
+def share_photo_arrays(data: PhotoArrays) -> Tuple[shared_memory.SharedMemory, Sizes]:
+    """Kopiuje (offsets | tag_ids | orient | nazwy tagów) do jednego segmentu pamięci."""
+    orient, offsets, tag_ids, names = data
+    return pack_shared([offsets.tobytes(), tag_ids.tobytes(), orient, "\n".join(names).encode("utf-8")])
+
+
+def attach_photo_arrays(name: str, sizes: Sizes) -> PhotoArrays:
+    offsets, tag_ids, orient, blob = unpack_shared(name, sizes)
+    names = blob.decode("utf-8").split("\n") if blob else []
+    return orient, int_array(offsets), int_array(tag_ids), names
+
+
+def _init_worker(name: str, sizes: Sizes, params: dict) -> None:
+    h, v, names = photos_from_arrays(attach_photo_arrays(name, sizes))
+    _WORKER.update(h=h, v=v, names=names, params=params)
+
+
+def _run_start(start: int, seed: int) -> Tuple[int, int, int, float, bytes, bytes, bytes]:
+    t0 = time.perf_counter()
+    slides, order, score = solve_photos(_WORKER["h"], _WORKER["v"], _WORKER["names"], seed=seed, **_WORKER["params"])
+    if score is None:
+        score = slides.order_score(order)
+    wall = time.perf_counter() - t0
+    return (
+        start,
+        seed,
+        score,
+        wall,
+        slides.photo_a.tobytes(),
+        slides.photo_b.tobytes(),
+        array("i", order).tobytes(),
+    )
+
+
+def run_multistart(
+    data: PhotoArrays,
+    starts: int,
+    workers: int = 1,
+    seed: int = 42,
+    report: Optional[List[dict]] = None,
+    **params,
+) -> Tuple[SlideStore, List[int], int]:
+    """starts przebiegów z ziarnami seed, seed+1, ...; zwraca najlepszy (slides, order, score).
+
+    params: argumenty solve_photos (pairing, order_method, k, ...).
+    report: opcjonalna lista, do której trafia {start, seed, score, time} każdego startu.
+    """
+    seeds = [seed + i for i in range(starts)]
+
+    if workers <= 1:
+        h, v, names = photos_from_arrays(data)
+        _WORKER.update(h=h, v=v, names=names, params=params)
+        try:
+            results = [_run_start(i, s) for i, s in enumerate(seeds)]
+        finally:
+            _WORKER.clear()
+    else:
+        shm, sizes = share_photo_arrays(data)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(shm.name, sizes, params),
+            ) as pool:
+                results = list(pool.map(_run_start, range(starts), seeds))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    best = None
+    for res in results:
+        if report is not None:
+            report.append({"start": res[0], "seed": res[1], "score": res[2], "time": res[3]})
+        if best is None or res[2] > best[2]:
+            best = res
+
+    _, _, score, _, pa, pb, order_bytes = best
+    _, offsets, tag_ids, names = data
+    slides = SlideStore.from_photo_pairs(int_array(pa), int_array(pb), offsets, tag_ids, names)
+    return slides, int_array(order_bytes).tolist(), score
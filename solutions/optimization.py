@@ -1,33 +1,70 @@
 import random
-from usefull_functions import delta_swap, delta_2opt
+from usefull_functions import delta_swap, delta_2opt, total_score
+from local_search import OrderState, apply_swap, apply_two_opt, swap_delta, two_opt_delta
 import math 
-
-def hill_climbing(slides, iters=10000):
+import time
+
+# Akceptacja w anneal (--anneal_p_start / --anneal_p_end): na starcie średni
+# pogarszający ruch z próbki przechodzi z p-stwem ANNEAL_P_START, na końcu ruch o -1
+# z p-stwem ANNEAL_P_END. Przy tych wartościach przechodzą ruchy neutralne (delta 0),
+# na początku z rzadka ruchy o -1 (p ~ 1e-2), a większe straty praktycznie nigdy -
+# to spadek w limicie czasu z dryfem po plateau, nie klasyczne wyżarzanie. Większe
+# p_start (np. 1e-6) daje wyżarzanie przyjmujące na starcie ruchy o -2, -3.
+ANNEAL_P_START = 1e-10
+ANNEAL_P_END = 1e-12
+# Ruchy lokalne: swap / odwrócenie order[i..j] dla j - i <= ANNEAL_WINDOW.
+ANNEAL_WINDOW = 20
+# Limit dziennika ruchów od ostatniego rekordu (wielokrotność n).
+ANNEAL_JOURNAL = 4
+
+def _start_trace(trace, phase, slides):
+    """Wynik początkowy (jedno O(n)) - dalej liczony przyrostowo z delt."""
+    if trace is None:
+        return 0
+    score = total_score(slides)
+    trace.reset_counts()
+    trace.record(phase, 0, score, score, 0, 0)
+    return score
+
+
+def hill_climbing(slides, iters=10000, trace=None):
     slides = slides.copy()
-    best_score = 0
+    best_score = _start_trace(trace, "hill_climbing", slides)
+    accepted = 0
 
-    for _ in range(iters):
+    for it in range(1, iters + 1):
         i, j = random.sample(range(len(slides)), 2)
         delta = delta_swap(slides, i, j)
 
         if delta > 0:
             slides[i], slides[j] = slides[j], slides[i]
             best_score += delta
+            accepted += 1
+
+        if trace is not None and (it % trace.every == 0 or it == iters):
+            if trace.record("hill_climbing", it, best_score, best_score, accepted, it):
+                break
 
     return slides
 
 
-def two_opt(slides, iters=5000):
+def two_opt(slides, iters=5000, trace=None):
     slides = slides.copy()
+    score = _start_trace(trace, "two_opt", slides)
+    accepted = 0
 
-    for _ in range(iters):
+    for it in range(1, iters + 1):
         i, j = sorted(random.sample(range(len(slides)), 2))
-        if j - i < 2:
-            continue
+        if j - i >= 2:
+            delta = delta_2opt(slides, i, j)
+            if delta > 0:
+                slides[i:j+1] = reversed(slides[i:j+1])
+                score += delta
+                accepted += 1
 
-        delta = delta_2opt(slides, i, j)
-        if delta > 0:
-            slides[i:j+1] = reversed(slides[i:j+1])
+        if trace is not None and (it % trace.every == 0 or it == iters):
+            if trace.record("two_opt", it, score, score, accepted, it):
+                break
 
     return slides
 
@@ -36,19 +73,177 @@ def simulated_annealing(
     slides,
     iters=20000,
     T0=1.0,
-    alpha=0.999
+    alpha=0.999,
+    trace=None,
 ):
     slides = slides.copy()
     T = T0
+    score = best = _start_trace(trace, "simulated_annealing", slides)
+    accepted = 0
 
-    for _ in range(iters):
+    for it in range(1, iters + 1):
         i, j = random.sample(range(len(slides)), 2)
         delta = delta_swap(slides, i, j)
 
         if delta > 0 or random.random() < math.exp(delta / T):
             slides[i], slides[j] = slides[j], slides[i]
+            score += delta
+            best = max(best, score)
+            accepted += 1
 
         T *= alpha
 
+        if trace is not None and (it % trace.every == 0 or it == iters):
+            if trace.record("simulated_annealing", it, score, best, accepted, it):
+                break
+
     return slides
 
+
+
+def _sample_deltas(state, samples, two_opt_share, window):
+    """Delty losowych ruchów (bez wykonywania) - do kalibracji temperatury."""
+    n = len(state.order)
+    deltas = []
+    for _ in range(samples):
+        i = random.randrange(0, n - 1)
+        j = min(n - 1, i + random.randrange(1, window + 1))
+        if random.random() < two_opt_share:
+            deltas.append(two_opt_delta(state, i, j)[0])
+        else:
+            deltas.append(swap_delta(state, i, j)[0])
+    return deltas
+
+
+def _undo(state, journal):
+    """Cofa ruchy z dziennika (od końca); swap i odwrócenie odcinka są samoodwrotne."""
+    for two, i, j in reversed(journal):
+        if two:
+            delta, left, right = two_opt_delta(state, i, j)
+            apply_two_opt(state, i, j, left, right, delta)
+        else:
+            delta, new = swap_delta(state, i, j)
+            apply_swap(state, i, j, new, delta)
+    journal.clear()
+
+
+def anneal(
+    state,
+    time_limit,
+    seed=None,
+    two_opt_share=0.5,
+    window=ANNEAL_WINDOW,
+    p_start=ANNEAL_P_START,
+    p_end=ANNEAL_P_END,
+    samples=500,
+    checkpoint=None,
+    metrics=None,
+    trace=None,
+):
+    """Przeszukiwanie w limicie czasu z akceptacją Metropolisa na porządku indeksów
+    (OrderState z local_search).
+
+    Ruchy lokalne: swap order[i] z order[j] albo odwrócenie order[i..j]
+    dla j - i <= window, z deltami z local_search.
+    T0 dobieramy tak, by średni pogarszający ruch z próbki był przyjmowany
+    z p-stwem p_start; na końcu ruch o -1 przechodzi z p-stwem p_end (oba w (0, 1),
+    inaczej ValueError). Domyślne p to spadek z ruchami neutralnymi (patrz
+    ANNEAL_P_START); większe p_start daje klasyczne wyżarzanie.
+    Chłodzenie geometryczne po czasie zegarowym (time_limit w sekundach),
+    a nie po liczbie iteracji. Zwraca stan z najlepszym znalezionym porządkiem:
+    ruchy od ostatniego rekordu są w dzienniku i na końcu są cofane (leniwa
+    kopia - nowy rekord nic nie kosztuje). Gdy dziennik przekroczy
+    ANNEAL_JOURNAL * n wpisów, najlepszy porządek jest raz odtwarzany na kopii.
+    checkpoint: jak w local_search.improve (zapis, gdy bieżący stan jest najlepszy).
+    metrics: metrics.Metrics - statystyki ruchów w etapie "anneal" (zysk = suma przyjętych delt).
+    trace: convergence.Tracer - próbki co >= trace.every iteracji (sprawdzane co 256).
+    """
+    if not (0.0 < p_start < 1.0 and 0.0 < p_end < 1.0):
+        raise ValueError("Acceptance probabilities must be in (0, 1)")
+    if seed is not None:
+        random.seed(seed)
+
+    order = state.order
+    n = len(order)
+    if n < 4 or time_limit <= 0:
+        return state
+
+    worse = [-d for d in _sample_deltas(state, samples, two_opt_share, window) if d < 0]
+    t_end = -1.0 / math.log(p_end)
+    t0 = max(t_end, (sum(worse) / len(worse) if worse else 1.0) / -math.log(p_start))
+
+    start = time.perf_counter()
+    best_total = state.total
+    journal = []  # ruchy (czy 2-opt, i, j) od ostatniego rekordu
+    journal_max = ANNEAL_JOURNAL * n
+    snap = None  # najlepszy stan odtworzony przy przepełnieniu dziennika
+    T = t0
+    rnd = random.random
+    tried = [0, 0]  # swap, two_opt
+    taken = [0, 0]
+    gained = [0, 0]
+
+    next_trace = 0
+    if trace is not None:
+        trace.reset_counts()
+        trace.record("anneal", 0, state.total, best_total, 0, 0)
+        next_trace = trace.every
+
+    it = 0
+    while True:
+        if it & 255 == 0:
+            now = time.perf_counter()
+            frac = (now - start) / time_limit
+            if frac >= 1.0:
+                break
+            T = t0 * (t_end / t0) ** frac
+            if checkpoint is not None and state.total == best_total:
+                checkpoint.maybe_save(order, state.total, it)
+            if trace is not None and it >= next_trace:
+                next_trace += trace.every
+                if trace.record("anneal", it, state.total, best_total, sum(taken), sum(tried)):
+                    break
+        it += 1
+
+        i = random.randrange(0, n - 1)
+        j = i + random.randrange(1, window + 1)
+        if j >= n:
+            continue
+        if rnd() < two_opt_share:
+            tried[1] += 1
+            delta, left, right = two_opt_delta(state, i, j)
+            if delta >= 0 or rnd() < math.exp(delta / T):
+                taken[1] += 1
+                gained[1] += delta
+                apply_two_opt(state, i, j, left, right, delta)
+                if snap is None:
+                    journal.append((True, i, j))
+        else:
+            tried[0] += 1
+            delta, new = swap_delta(state, i, j)
+            if delta >= 0 or rnd() < math.exp(delta / T):
+                taken[0] += 1
+                gained[0] += delta
+                apply_swap(state, i, j, new, delta)
+                if snap is None:
+                    journal.append((False, i, j))
+
+        if state.total > best_total:
+            best_total = state.total
+            journal.clear()
+            snap = None
+        elif len(journal) > journal_max:
+            snap = OrderState(state.store, order[:], state.edges[:])
+            _undo(snap, journal)
+
+    if state.total < best_total:
+        if snap is not None:
+            state.order[:], state.edges[:], state.total = snap.order, snap.edges, snap.total
+        else:
+            _undo(state, journal)
+    if trace is not None:
+        trace.record("anneal", it, state.total, best_total, sum(taken), sum(tried))
+    if metrics is not None:
+        metrics.add_moves("anneal", ["swap", "two_opt"], tried, taken, gained)
+        metrics.count("anneal_iterations", it)
+    return state
@@ -4,113 +4,179 @@ from __future__ import annotations
 
 import random
 from collections import defaultdict
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Union
 
-from usefull_functions import slide_score
+from bitset_kernel import make_scorer
+from knn_graph import KnnGraph
+from lsh import lsh_groups
+from slide_store import SlideStore, as_store
+from tag_index import TagIndex
 
-def _group_key(slide: dict, mode: str = "min") -> str:
-    """Wybór tagu-reprezentanta grupy.
+Slides = Union[SlideStore, Sequence[dict]]
+
+def _group_key(store: SlideStore, sid: int, mode: str = "min") -> int:
+    """Wybór tagu-reprezentanta grupy (id tagu).
     - mode="min": deterministycznie najmniejszy tag
     - mode="first": pierwszy z iteracji po zbiorze
-    Jeśli slajd nie ma tagów, zwracamy pusty string.
+    Jeśli slajd nie ma tagów, zwracamy -1.
     """
-    tags = slide.get("tags", set())
-    if not tags:
-        return ""
+    if store.counts[sid] == 0:
+        return -1
     if mode == "first":
-        return next(iter(tags))
-    return min(tags)
+        return next(iter(store.tag_set(sid)))
+    return store.tag_ids[store.offsets[sid]]
+
+
+def slide_groups(store: SlideStore, group_key: str = "min", group_max: int = 500) -> List[List[int]]:
+    """Podział slajdów na grupy dla Grouped/Mixed.
+    - "min" / "first": wspólny tag-reprezentant (_group_key),
+    - "lsh": MinHash + banded LSH (lsh.lsh_groups), grupy najwyżej po group_max
+      slajdów, żeby NN z k w grupie był tani.
+    """
+    if group_key == "lsh":
+        return lsh_groups(store, max_group=group_max, seed=random.randrange(1 << 30))
+    if group_key not in ("min", "first"):
+        raise ValueError(f"Unknown group key: {group_key}")
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for sid in range(len(store)):
+        groups[_group_key(store, sid, group_key)].append(sid)
+    return list(groups.values())
 
 
-def order_random(slides: List[dict]) -> List[int]:
+def order_random(slides: Slides) -> List[int]:
     order = list(range(len(slides)))
     random.shuffle(order)
     return order
 
-def order_nn(slides: List[dict], k: int = 100) -> List[int]:
+def order_nn(
+    slides: Slides,
+    k: int = 100,
+    candidates: str = "random",
+    backend: str = "sets",
+    knn: Optional[KnnGraph] = None,
+    start: Optional[int] = None,
+) -> List[int]:
     """
-    - start: losowy slajd,
+    - start: losowy slajd (albo podany start),
     - krok: losujemy k kandydatów z pozostałych i wybieramy najlepszy transition.
+    candidates="tags": kandydaci tylko spośród slajdów dzielących tag z bieżącym,
+    candidates="random" (domyślnie): kandydaci losowani ze wszystkich pozostałych.
+    candidates="knn": najlepszy wolny sąsiad z grafu knn (knn_graph), k tylko w fallbacku.
+    backend="bitset": paczka kandydatów oceniana jednym przebiegiem popcount.
     """
-    n = len(slides)
-    if n == 0:
-        return []
+    store = as_store(slides)
+    scorer = make_scorer(store, backend)
+    return _order_group_nn(store, list(range(len(store))), k, candidates=candidates, scorer=scorer, knn=knn, start=start)
 
-    remaining = list(range(n))
-    random.shuffle(remaining)
+def order_grouped(slides: Slides, group_key: str = "min", group_max: int = 500) -> List[int]:
+    """Grouped: grupujemy slajdy (slide_groups), potem sklejamy grupy."""
+    group_list = slide_groups(as_store(slides), group_key, group_max)
+    random.shuffle(group_list)
 
-    cur = remaining.pop()
-    order = [cur]
+    order: List[int] = []
+    for g in group_list:
+        random.shuffle(g)
+        order.extend(g)
 
-    while remaining:
-        m = min(max(1, k), len(remaining))
-        pos_sample = random.sample(range(len(remaining)), m)
+    return order
 
-        best_pos: Optional[int] = None
-        best_sc = -1
-        cur_slide = slides[cur]
+def _pop_start(remaining: List[int], start: Optional[int]) -> int:
+    """Zdejmuje z remaining slajd startowy: start albo ostatni (losowy po shuffle)."""
+    if start is None:
+        return remaining.pop()
+    remaining.remove(start)
+    return start
 
-        for pos in pos_sample:
-            sid = remaining[pos]
-            sc = slide_score(cur_slide, slides[sid])
-            if sc > best_sc:
-                best_sc = sc
-                best_pos = pos
 
-        assert best_pos is not None
-        nxt = remaining[best_pos]
-        remaining[best_pos] = remaining[-1]
-        remaining.pop()
+def _order_group_nn_tags(store: SlideStore, scorer, group: List[int], k: int, start: Optional[int] = None) -> List[int]:
+    """NN(k) z kandydatami z odwróconego indeksu tagów (fallback: losowi)."""
+    remaining = group[:]
+    random.shuffle(remaining)
+    cur = _pop_start(remaining, start)
+    ordered = [cur]
+    index = TagIndex(store, remaining)
 
-        order.append(nxt)
-        cur = nxt
+    while len(index):
+        cands = index.sample_candidates(cur, k)
+        best = cands[scorer.best_of(cur, cands)]
 
-    return order
+        index.remove(best)
+        ordered.append(best)
+        cur = best
 
-def order_grouped(slides: List[dict], group_key: str = "min") -> List[int]:
-    """Grouped: grupujemy slajdy po tagu-reprezentancie, potem sklejamy grupy."""
-    groups: Dict[str, List[int]] = defaultdict(list)
-    for sid, s in enumerate(slides):
-        groups[_group_key(s, group_key)].append(sid)
+    return ordered
 
-    group_list = list(groups.values())
-    random.shuffle(group_list)
 
-    order: List[int] = []
-    for g in group_list:
-        random.shuffle(g)
-        order.extend(g)
+def _order_group_nn_knn(
+    store: SlideStore, scorer, group: List[int], k: int, knn: KnnGraph, start: Optional[int] = None
+) -> List[int]:
+    """NN po grafie kandydatów: następny slajd to najlepszy jeszcze wolny sąsiad
+    z grafu; gdy wszyscy są już ułożeni - k kandydatów z indeksu tagów.
+    """
+    remaining = group[:]
+    random.shuffle(remaining)
+    cur = _pop_start(remaining, start)
+    ordered = [cur]
+    index = TagIndex(store, remaining)
+    nbrs = knn.nbrs
+    m = knn.m
+
+    while len(index):
+        best = -1
+        for c in nbrs[cur * m : (cur + 1) * m]:
+            if c < 0:
+                break
+            if c in index:
+                best = c
+                break
+        if best < 0:
+            cands = index.sample_candidates(cur, k)
+            best = cands[scorer.best_of(cur, cands)]
+
+        index.remove(best)
+        ordered.append(best)
+        cur = best
+
+    return ordered
 
-    return order
 
-def _order_group_nn(slides: List[dict], group: List[int], k: int) -> List[int]:
-    """NN(k) ograniczone do jednej grupy."""
+def _order_group_nn(
+    store: SlideStore,
+    group: List[int],
+    k: int,
+    candidates: str = "random",
+    scorer=None,
+    knn: Optional[KnnGraph] = None,
+    start: Optional[int] = None,
+) -> List[int]:
+    """NN(k) ograniczone do jednej grupy.
+    scorer: obiekt z best_of (SlideStore albo BitsetScorer); domyślnie store.
+    knn: graf kandydatów, wymagany dla candidates="knn".
+    start: slajd z group, od którego zaczynamy (None = losowy).
+    """
+    if scorer is None:
+        scorer = store
     if not group:
         return []
     if len(group) == 1:
         return group[:]
+    if candidates == "tags":
+        return _order_group_nn_tags(store, scorer, group, k, start)
+    if candidates == "knn":
+        if knn is None:
+            raise ValueError("candidates='knn' needs a candidate graph (knn_graph.build_knn)")
+        return _order_group_nn_knn(store, scorer, group, k, knn, start)
 
     remaining = group[:]
     random.shuffle(remaining)
-    cur = remaining.pop()
+    cur = _pop_start(remaining, start)
     ordered = [cur]
 
     while remaining:
         m = min(max(1, k), len(remaining))
         pos_sample = random.sample(range(len(remaining)), m)
 
-        best_pos: Optional[int] = None
-        best_sc = -1
-        cur_slide = slides[cur]
-
-        for pos in pos_sample:
-            sid = remaining[pos]
-            sc = slide_score(cur_slide, slides[sid])
-            if sc > best_sc:
-                best_sc = sc
-                best_pos = pos
-
-        assert best_pos is not None
+        best_pos = pos_sample[scorer.best_of(cur, [remaining[pos] for pos in pos_sample])]
         nxt = remaining[best_pos]
         remaining[best_pos] = remaining[-1]
         remaining.pop()
@@ -121,7 +187,7 @@ def _order_group_nn(slides: List[dict], group: List[int], k: int) -> List[int]:
     return ordered
 
 
-def _order_groups_nn(slides: List[dict], groups: List[List[int]], k_group: int) -> List[List[int]]:
+def _order_groups_nn(scorer, groups: List[List[int]], k_group: int) -> List[List[int]]:
     """NN na poziomie grup: dopasowujemy kolejność grup po przejściu last->first."""
     if not groups:
         return []
@@ -137,18 +203,8 @@ def _order_groups_nn(slides: List[dict], groups: List[List[int]], k_group: int)
         m = min(max(1, k_group), len(remaining))
         pos_sample = random.sample(range(len(remaining)), m)
 
-        best_pos: Optional[int] = None
-        best_sc = -1
-        last_slide = slides[ordered[-1][-1]]
-
-        for pos in pos_sample:
-            g = remaining[pos]
-            sc = slide_score(last_slide, slides[g[0]])
-            if sc > best_sc:
-                best_sc = sc
-                best_pos = pos
-
-        assert best_pos is not None
+        last = ordered[-1][-1]
+        best_pos = pos_sample[scorer.best_of(last, [remaining[pos][0] for pos in pos_sample])]
         nxt = remaining[best_pos]
         remaining[best_pos] = remaining[-1]
         remaining.pop()
@@ -158,20 +214,28 @@ def _order_groups_nn(slides: List[dict], groups: List[List[int]], k_group: int)
     return ordered
 
 
+def chain_groups(slides: Slides, groups: List[List[int]], k_group: int = 10, backend: str = "sets") -> List[List[int]]:
+    """Kolejność gotowych grup (listy id slajdów) wg NN(k_group) na przejściu last->first."""
+    scorer = make_scorer(as_store(slides), backend)
+    return _order_groups_nn(scorer, groups, k_group=k_group)
+
+
 def order_mixed(
-    slides: List[dict],
+    slides: Slides,
     k: int = 100,
     k_group: int = 10,
     group_key: str = "min",
+    candidates: str = "random",
+    backend: str = "sets",
+    group_max: int = 500,
+    knn: Optional[KnnGraph] = None,
 ) -> List[int]:
-    groups: Dict[str, List[int]] = defaultdict(list)
-    for sid, s in enumerate(slides):
-        groups[_group_key(s, group_key)].append(sid)
-
-    group_list = list(groups.values())
+    store = as_store(slides)
+    scorer = make_scorer(store, backend)
+    group_list = slide_groups(store, group_key, group_max)
 
-    processed = [_order_group_nn(slides, g, k=k) for g in group_list]
-    ordered_groups = _order_groups_nn(slides, processed, k_group=k_group)
+    processed = [_order_group_nn(store, g, k=k, candidates=candidates, scorer=scorer, knn=knn) for g in group_list]
+    ordered_groups = _order_groups_nn(scorer, processed, k_group=k_group)
 
     order: List[int] = []
     for g in ordered_groups:
@@ -180,20 +244,37 @@ def order_mixed(
     return order
 
 def build_slideshow_order(
-    slides: List[dict],
+    slides: Slides,
     method: str = "mixed",
     k: int = 100,
     k_group: int = 10,
     group_key: str = "min",
+    candidates: str = "random",
+    backend: str = "sets",
+    group_max: int = 500,
+    knn: Optional[KnnGraph] = None,
 ) -> List[int]:
-    """Zwraca listę indeksów slajdów w kolejności zgodnej z wybraną metodą."""
+    """Zwraca listę indeksów slajdów w kolejności zgodnej z wybraną metodą.
+    knn: graf kandydatów (knn_graph) dla candidates="knn".
+    """
+    if candidates not in ("tags", "random", "knn"):
+        raise ValueError(f"Unknown candidate mode: {candidates}")
     if method == "random":
         return order_random(slides)
     if method == "nn":
-        return order_nn(slides, k=k)
+        return order_nn(slides, k=k, candidates=candidates, backend=backend, knn=knn)
     if method == "grouped":
-        return order_grouped(slides, group_key=group_key)
+        return order_grouped(slides, group_key=group_key, group_max=group_max)
     if method == "mixed":
-        return order_mixed(slides, k=k, k_group=k_group, group_key=group_key)
+        return order_mixed(
+            slides,
+            k=k,
+            k_group=k_group,
+            group_key=group_key,
+            candidates=candidates,
+            backend=backend,
+            group_max=group_max,
+            knn=knn,
+        )
 
     raise ValueError(f"Unknown ordering method: {method}")
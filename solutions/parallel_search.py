@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Równoległa poprawa lokalna na rozłącznych segmentach porządku.
+
+W każdej rundzie porządek dzielimy na ciągłe segmenty; skrajne slajdy
+segmentu są przypięte (local_improve z fixed_ends=True), więc krawędzie
+na stykach segmentów się nie zmieniają i segmenty można poprawiać
+niezależnie w osobnych procesach. Granice przesuwamy między rundami,
+żeby każda krawędź mogła kiedyś znaleźć się we wnętrzu segmentu.
+"""
+
+from __future__ import annotations
+
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from local_search import OrderState, improve
+from metrics import Metrics
+from shared_arrays import Sizes, attach_store, int_array, share_store
+from slide_store import SlideStore, as_store
+
+# Magazyn slajdów podpięty w workerze.
+_WORKER: Dict[str, SlideStore] = {}
+
+
+def _init_worker(name: str, sizes: Sizes) -> None:
+    _WORKER["store"] = attach_store(name, sizes)
+
+
+def _segment_pairs(store: SlideStore, seg: Sequence[int]) -> Tuple[bytes, bytes]:
+    return (
+        array("i", (store.photo_a[sid] for sid in seg)).tobytes(),
+        array("i", (store.photo_b[sid] for sid in seg)).tobytes(),
+    )
+
+
+def _load_pairs(store: SlideStore, seg: Sequence[int], pa: bytes, pb: bytes) -> None:
+    """Przenosi pary zdjęć slajdów segmentu (ruch "partner" zmienia je w innych procesach)."""
+    for sid, a, b in zip(seg, int_array(pa), int_array(pb)):
+        if store.photo_a[sid] != a or store.photo_b[sid] != b:
+            store.set_pair(sid, a, b)
+
+
+def _improve_segment(
+    seg: bytes,
+    seg_edges: bytes,
+    pa: bytes,
+    pb: bytes,
+    iters: int,
+    seed: int,
+    moves: Optional[Dict[str, float]],
+    with_moves: bool = False,
+) -> Tuple[bytes, bytes, bytes, bytes, Optional[dict]]:
+    store = _WORKER["store"]
+    order = int_array(seg).tolist()
+    _load_pairs(store, order, pa, pb)
+    state = OrderState(store, order, int_array(seg_edges).tolist())
+    metrics = Metrics() if with_moves else None
+    improve(state, iters=iters, seed=seed, fixed_ends=True, moves=moves, metrics=metrics)
+    return (
+        array("i", state.order).tobytes(),
+        array("i", state.edges).tobytes(),
+        *_segment_pairs(store, state.order),
+        None if metrics is None else metrics.moves.get("local_search", {}),
+    )
+
+
+def split_segments(n: int, parts: int, shift: int) -> List[Tuple[int, int]]:
+    """Granice [start, end) segmentów; pierwszy segment zaczyna się na pozycji shift."""
+    size = max(1, n // parts)
+    bounds = [0]
+    pos = shift % size
+    while pos < n:
+        if pos > 0:
+            bounds.append(pos)
+        pos += size
+    bounds.append(n)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parallel_improve(
+    state: OrderState,
+    iters: int = 40000,
+    workers: int = 2,
+    rounds: int = 4,
+    seed: Optional[int] = None,
+    moves: Optional[Dict[str, float]] = None,
+    checkpoint=None,
+    metrics: Optional[Metrics] = None,
+    trace=None,
+) -> OrderState:
+    """improve rozłożone na workers procesów.
+    iters: łączna liczba iteracji, dzielona na rundy i segmenty proporcjonalnie do długości.
+    Workery odsyłają porządek i score krawędzi segmentu, więc state.total jest aktualny,
+    oraz pary zdjęć slajdów segmentu (ruch "partner"), nanoszone na state.store.
+    metrics: statystyki ruchów z workerów są sumowane w etapie "local_search".
+    trace: convergence.Tracer - jedna próbka po każdej rundzie (iteracja = suma iteracji rund).
+    """
+    order = state.order
+    edges = state.edges
+    n = len(order)
+    if n < 4 or iters <= 0:
+        return state
+    if workers <= 1:
+        return improve(
+            state, iters=iters, seed=seed, moves=moves, checkpoint=checkpoint, metrics=metrics, trace=trace
+        )
+
+    rng = random.Random(seed)
+    rounds = max(1, rounds)
+    per_round = iters // rounds
+    with_moves = metrics is not None or trace is not None
+    accepted = tried = 0
+    if trace is not None:
+        trace.reset_counts()
+        trace.record("local_search", 0, state.total, state.total, 0, 0)
+
+    shm, sizes = share_store(state.store)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shm.name, sizes)) as pool:
+            for rnd in range(rounds):
+                segs = split_segments(n, workers, rng.randrange(max(1, n // workers)))
+                jobs = [
+                    pool.submit(
+                        _improve_segment,
+                        array("i", order[a:b]).tobytes(),
+                        array("i", edges[a : b - 1]).tobytes(),
+                        *_segment_pairs(state.store, order[a:b]),
+                        per_round * (b - a) // n,
+                        rng.randrange(1 << 30),
+                        moves,
+                        with_moves,
+                    )
+                    for a, b in segs
+                ]
+                for (a, b), job in zip(segs, jobs):
+                    seg, seg_edges, pa, pb, seg_moves = job.result()
+                    order[a:b] = int_array(seg)
+                    edges[a : b - 1] = int_array(seg_edges)
+                    _load_pairs(state.store, order[a:b], pa, pb)
+                    if metrics is not None:
+                        metrics.merge_moves("local_search", seg_moves)
+                    if seg_moves is not None:
+                        accepted += sum(mv["accepted"] for mv in seg_moves.values())
+                        tried += sum(mv["attempted"] for mv in seg_moves.values())
+                state.total = sum(edges)
+                if checkpoint is not None:
+                    checkpoint.maybe_save(order, state.total, rnd + 1)
+                if trace is not None:
+                    if trace.record("local_search", (rnd + 1) * per_round, state.total, state.total, accepted, tried):
+                        break
+    finally:
+        shm.close()
+        shm.unlink()
+    state.store.sync()
+
+    return state
+
+
+def parallel_local_improve(
+    slides: Union[SlideStore, Sequence[dict]],
+    order: List[int],
+    iters: int = 40000,
+    workers: int = 2,
+    rounds: int = 4,
+    seed: Optional[int] = None,
+    moves: Optional[Dict[str, float]] = None,
+) -> List[int]:
+    """local_improve rozłożone na workers procesów (segmenty porządku)."""
+    state = OrderState(as_store(slides), list(order))
+    return parallel_improve(state, iters=iters, workers=workers, rounds=rounds, seed=seed, moves=moves).order
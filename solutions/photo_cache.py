@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Binarny cache sparsowanego pliku wejściowego (format Hash Code).
+
+Plik cache leży obok wejścia (<input>.<hash>.photos) i zawiera:
+- nagłówek: MAGIC, skrót sha1 wejścia, rozmiary tablic,
+- orient: 'H'/'V' per zdjęcie (bajty),
+- offsets / tag_ids: CSR z id tagów per zdjęcie (int32),
+- nazwy tagów (utf-8, rozdzielone '\\n').
+Kluczem jest skrót zawartości wejścia, więc zmiana pliku unieważnia cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+from array import array
+from typing import List, Optional, Tuple
+
+MAGIC = b"HCPHOTO1"
+_HEADER = struct.Struct("<8s20sqqq")
+
+PhotoArrays = Tuple[bytes, array, array, List[str]]
+
+
+def file_digest(path: str, chunk: int = 1 << 20) -> bytes:
+    """sha1 zawartości pliku (czytane porcjami)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(chunk)
+            if not buf:
+                break
+            h.update(buf)
+    return h.digest()
+
+
+def cache_path(input_path: str, digest: bytes) -> str:
+    return f"{input_path}.{digest.hex()[:16]}.photos"
+
+
+def write_photo_cache(path: str, digest: bytes, data: PhotoArrays) -> None:
+    """Zapis atomowy: najpierw plik tymczasowy, potem os.replace."""
+    orient, offsets, tag_ids, names = data
+    names_blob = "\n".join(names).encode("utf-8")
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, digest, len(orient), len(tag_ids), len(names_blob)))
+        f.write(orient)
+        offsets.tofile(f)
+        tag_ids.tofile(f)
+        f.write(names_blob)
+    os.replace(tmp, path)
+
+
+def read_photo_cache(path: str, digest: bytes) -> Optional[PhotoArrays]:
+    """Wczytuje cache; None gdy brak pliku, skrót się nie zgadza albo plik jest
+    ucięty / uszkodzony (wywołujący parsuje wejście i zapisuje cache od nowa).
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        head = f.read(_HEADER.size)
+        if len(head) != _HEADER.size:
+            return None
+        magic, dig, n, n_tags, n_blob = _HEADER.unpack(head)
+        if magic != MAGIC or dig != digest:
+            return None
+        try:
+            orient = f.read(n)
+            offsets = array("i")
+            offsets.fromfile(f, n + 1)
+            tag_ids = array("i")
+            tag_ids.fromfile(f, n_tags)
+            blob = f.read(n_blob)
+            names = blob.decode("utf-8").split("\n") if blob else []
+        except (EOFError, ValueError, OSError):
+            return None
+    if len(orient) != n or len(blob) != n_blob or offsets[-1] != n_tags:
+        return None
+    return orient, offsets, tag_ids, names
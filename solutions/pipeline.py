@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""Jeden przebieg: parowanie -> kolejność -> poprawa lokalna (na gotowych zdjęciach)."""
+
+from __future__ import annotations
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+from checkpoint import Checkpointer
+from convergence import Tracer
+from io_help import make_slides
+from island_search import island_improve
+from knn_graph import KnnGraph, load_or_build_knn
+from local_search import OrderState, improve, sweep
+from metrics import Metrics, count_score_evals, timed
+from optimization import ANNEAL_P_END, ANNEAL_P_START, anneal
+from ordering import build_slideshow_order
+from parallel_search import parallel_improve
+from slide_store import SlideStore
+
+# M grafu kandydatów dla --candidates knn bez jawnego --knn
+DEFAULT_KNN = 8
+
+
+def solve_photos(
+    h: List[dict],
+    v: List[dict],
+    names: List[str],
+    seed: int = 42,
+    pairing: str = "different",
+    backend: str = "sets",
+    metrics: Optional[Metrics] = None,
+    **params,
+) -> Tuple[SlideStore, List[int], Optional[int]]:
+    """Zwraca (slides, order, score): pair_photos, potem solve_slides (params)."""
+    slides = pair_photos(h, v, names, seed=seed, pairing=pairing, backend=backend, metrics=metrics)
+    return solve_slides(slides, seed=seed, backend=backend, metrics=metrics, **params)
+
+
+def pair_photos(
+    h: List[dict],
+    v: List[dict],
+    names: List[str],
+    seed: int = 42,
+    pairing: str = "different",
+    backend: str = "auto",
+    metrics: Optional[Metrics] = None,
+) -> SlideStore:
+    """Ustawia random.seed(seed) i buduje slajdy (make_slides); dalsze etapy
+    losują z generatora w stanie po parowaniu (slide_cache zapisuje ten stan).
+    Z metrics zwracany magazyn liczy obliczenia score (metrics.count_score_evals).
+    """
+    random.seed(seed)
+    with timed(metrics, "pairing"):
+        return count_score_evals(make_slides(pairing, h, v, names, backend=backend), metrics)
+
+
+def solve_slides(
+    slides: SlideStore,
+    seed: int = 42,
+    order_method: str = "mixed",
+    k: int = 100,
+    k_group: int = 10,
+    group_key: str = "min",
+    group_max: int = 500,
+    local_iters: int = 0,
+    candidates: str = "random",
+    backend: str = "sets",
+    local_workers: int = 1,
+    local_rounds: int = 4,
+    moves: Optional[Dict[str, float]] = None,
+    time_limit: float = 0.0,
+    anneal_p_start: float = ANNEAL_P_START,
+    anneal_p_end: float = ANNEAL_P_END,
+    islands: int = 1,
+    island_epochs: int = 50,
+    use_sweep: bool = False,
+    checkpoint: Optional[Checkpointer] = None,
+    metrics: Optional[Metrics] = None,
+    trace: Optional[Tracer] = None,
+    knn: int = 0,
+    knn_cache: Optional[str] = None,
+) -> Tuple[SlideStore, List[int], Optional[int]]:
+    """Kolejność i poprawa na gotowych slajdach; zwraca (slides, order, score) -
+    score pochodzi z utrzymywanej sumy krawędzi poprawy lokalnej, a bez niej jest None.
+    time_limit > 0: po poprawie lokalnej wyżarzanie przez time_limit sekund
+    (p-stwa akceptacji anneal_p_start / anneal_p_end, jak p_start / p_end w optimization.anneal).
+    checkpoint: okresowy zapis najlepszego porządku (slajdy są do niego podpinane).
+    metrics: czasy etapów ordering / local_search / anneal i statystyki ruchów.
+    trace: ślad zbieżności poprawy lokalnej i wyżarzania (convergence.Tracer).
+    knn > 0 (albo candidates="knn"): graf knn najlepszych partnerów slajdu (knn_graph)
+    dla NN i poprawy lokalnej; knn_cache: plik wejścia / katalog danych, przy którym
+    graf jest trzymany na dysku (None = bez cache).
+    """
+    graph = candidate_graph(slides, knn, candidates, knn_cache, backend, metrics)
+
+    with timed(metrics, "ordering"):
+        order = build_slideshow_order(
+            slides,
+            method=order_method,
+            k=k,
+            k_group=k_group,
+            group_key=group_key,
+            group_max=group_max,
+            candidates=candidates,
+            backend=backend,
+            knn=graph,
+        )
+
+    if checkpoint is not None:
+        checkpoint.slides = slides
+
+    order, score = improve_order(
+        slides,
+        order,
+        seed=seed,
+        local_iters=local_iters,
+        local_workers=local_workers,
+        local_rounds=local_rounds,
+        moves=moves,
+        time_limit=time_limit,
+        anneal_p_start=anneal_p_start,
+        anneal_p_end=anneal_p_end,
+        islands=islands,
+        island_epochs=island_epochs,
+        use_sweep=use_sweep,
+        checkpoint=checkpoint,
+        metrics=metrics,
+        trace=trace,
+        graph=graph,
+    )
+    return slides, order, score
+
+
+def candidate_graph(
+    slides: SlideStore,
+    knn: int = 0,
+    candidates: str = "random",
+    cache_base: Optional[str] = None,
+    backend: str = "sets",
+    metrics: Optional[Metrics] = None,
+) -> Optional[KnnGraph]:
+    """Graf kandydatów, gdy jest potrzebny (knn > 0 lub candidates="knn"), inaczej None."""
+    if knn <= 0 and candidates != "knn":
+        return None
+    with timed(metrics, "knn_graph"):
+        return load_or_build_knn(slides, knn if knn > 0 else DEFAULT_KNN, cache_base=cache_base, backend=backend)
+
+
+def improve_order(
+    slides: SlideStore,
+    order: List[int],
+    seed: int = 42,
+    local_iters: int = 0,
+    local_workers: int = 1,
+    local_rounds: int = 4,
+    moves: Optional[Dict[str, float]] = None,
+    time_limit: float = 0.0,
+    anneal_p_start: float = ANNEAL_P_START,
+    anneal_p_end: float = ANNEAL_P_END,
+    islands: int = 1,
+    island_epochs: int = 50,
+    use_sweep: bool = False,
+    checkpoint=None,
+    metrics: Optional[Metrics] = None,
+    trace: Optional[Tracer] = None,
+    graph: Optional[KnnGraph] = None,
+) -> Tuple[List[int], Optional[int]]:
+    """Etap poprawy: hill-climbing (ew. segmentami równolegle), potem wyżarzanie.
+    Zwraca (order, score) - score None, gdy żaden etap nie był włączony.
+    islands > 1: model wyspowy (island_search) zamiast segmentów - każda wyspa robi
+    local_iters iteracji, wymiana najlepszego porządku co local_iters // island_epochs.
+    use_sweep: zamiast losowych ruchów przegląd z don't-look bits (local_search.sweep),
+    najwyżej local_iters kroków - kończy się wcześniej w lokalnym optimum.
+    graph: graf kandydatów dla ruchów hill-climbingu (tylko jeden proces; segmenty
+    równoległe mają własną numerację slajdów, wyspy go nie dostają).
+    """
+    if local_iters <= 0 and time_limit <= 0:
+        return order, None
+
+    with timed(metrics, "local_search"):
+        state = OrderState(slides, order)
+        if use_sweep and local_iters > 0:
+            sweep(state, max_steps=local_iters, knn=graph, checkpoint=checkpoint, metrics=metrics, trace=trace)
+        elif islands > 1 and local_iters > 0:
+            island_improve(
+                state,
+                iters=local_iters,
+                islands=islands,
+                epochs=island_epochs,
+                seed=seed,
+                moves=moves,
+                checkpoint=checkpoint,
+                metrics=metrics,
+                trace=trace,
+            )
+        elif local_workers > 1:
+            parallel_improve(
+                state,
+                iters=local_iters,
+                workers=local_workers,
+                rounds=local_rounds,
+                seed=seed,
+                moves=moves,
+                checkpoint=checkpoint,
+                metrics=metrics,
+                trace=trace,
+            )
+        elif local_iters > 0:
+            improve(
+                state,
+                iters=local_iters,
+                seed=seed,
+                moves=moves,
+                checkpoint=checkpoint,
+                metrics=metrics,
+                trace=trace,
+                knn=graph,
+            )
+
+    if time_limit > 0:
+        with timed(metrics, "anneal"):
+            anneal(
+                state,
+                time_limit,
+                seed=seed,
+                p_start=anneal_p_start,
+                p_end=anneal_p_end,
+                checkpoint=checkpoint,
+                metrics=metrics,
+                trace=trace,
+            )
+
+    return state.order, state.total
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Płaskie tablice w pamięci współdzielonej (multiprocessing.shared_memory).
+
+Kilka buforów bajtów pakujemy jeden za drugim do jednego segmentu; proces
+potomny dostaje tylko nazwę segmentu i rozmiary części.
+"""
+
+from __future__ import annotations
+
+from array import array
+from multiprocessing import shared_memory
+from typing import List, Sequence, Tuple
+
+from slide_store import SlideStore
+
+Sizes = Tuple[int, ...]
+
+
+def pack_shared(parts: Sequence[bytes]) -> Tuple[shared_memory.SharedMemory, Sizes]:
+    """Kopiuje części do nowego segmentu; wywołujący odpowiada za close() + unlink()."""
+    sizes = tuple(len(p) for p in parts)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, sum(sizes)))
+    pos = 0
+    for part, size in zip(parts, sizes):
+        shm.buf[pos : pos + size] = part
+        pos += size
+    return shm, sizes
+
+
+def unpack_shared(name: str, sizes: Sizes) -> List[bytes]:
+    """Kopie części segmentu (segment jest od razu zamykany)."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        buf = shm.buf
+        out = []
+        pos = 0
+        for size in sizes:
+            out.append(bytes(buf[pos : pos + size]))
+            pos += size
+        del buf
+    finally:
+        shm.close()
+    return out
+
+
+def int_array(data: bytes) -> array:
+    out = array("i")
+    out.frombytes(data)
+    return out
+
+
+def share_store(store: SlideStore) -> Tuple[shared_memory.SharedMemory, Sizes]:
+    """SlideStore bez nazw tagów (workerom wystarczają id), z tagami zdjęć V jako CSR."""
+    store.sync()
+    parts = [
+        store.photo_a.tobytes(),
+        store.photo_b.tobytes(),
+        store.offsets.tobytes(),
+        store.tag_ids.tobytes(),
+    ]
+    if store.photo_sets is not None:
+        ids = array("i", store.photo_sets)
+        offsets = array("i", [0])
+        tag_ids = array("i")
+        for pid in ids:
+            tag_ids.extend(store.photo_sets[pid])
+            offsets.append(len(tag_ids))
+        parts += [ids.tobytes(), offsets.tobytes(), tag_ids.tobytes()]
+    return pack_shared(parts)
+
+
+def attach_store(name: str, sizes: Sizes) -> SlideStore:
+    arrays = [int_array(p) for p in unpack_shared(name, sizes)]
+    photo_a, photo_b, offsets, tag_ids = arrays[:4]
+    store = SlideStore(photo_a, photo_b, offsets, tag_ids, [])
+    if len(arrays) > 4:
+        ids, p_off, p_tags = arrays[4:]
+        store.photo_sets = {pid: frozenset(p_tags[p_off[k] : p_off[k + 1]]) for k, pid in enumerate(ids)}
+    return store
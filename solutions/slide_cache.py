@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Dyskowy cache zbudowanych slajdów (po parowaniu V), z limitem rozmiaru (LRU).
+
+Klucz to skrót zawartości wejścia (pliku .txt albo obu plików JSON), metoda
+parowania, backend i seed - te same dane dają te same slajdy, więc przebiegi
+zmieniające tylko kolejność / poprawę lokalną pomijają wczytanie i parowanie.
+Plik <katalog>/<klucz>.slides zawiera:
+- nagłówek: MAGIC, rozmiary tablic,
+- photo_a / photo_b / offsets / tag_ids slajdów (int32),
+- tagi zdjęć V jako CSR (id zdjęć, offsets, tag_ids) - dla ruchu "partner",
+- stan generatora random po parowaniu (dalsze etapy losują tak samo jak bez cache),
+- nazwy tagów (utf-8, rozdzielone '\\n').
+Odczyt odświeża czas modyfikacji pliku; po zapisie najdawniej używane pliki
+są usuwane, aż katalog zmieści się w max_bytes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import struct
+from array import array
+from typing import List, Optional, Tuple
+
+from photo_cache import file_digest
+from slide_store import SlideStore
+
+MAGIC = b"HCSLIDE1"
+_HEADER = struct.Struct("<8sqqqqqd")
+SUFFIX = ".slides"
+
+# Domyślny limit katalogu cache (--cache_max_mb).
+DEFAULT_MAX_MB = 512
+
+# random.getstate(): (wersja, 625 liczb Mersenne Twister, gauss_next)
+RandomState = Tuple[int, Tuple[int, ...], Optional[float]]
+
+
+def input_digest(data_dir: str) -> bytes:
+    """sha1 wejścia: pliku .txt albo pary horizontal_photos.json / vertical_photos.json."""
+    if os.path.isfile(data_dir):
+        return file_digest(data_dir)
+    h = hashlib.sha1()
+    for name in ("horizontal_photos.json", "vertical_photos.json"):
+        h.update(file_digest(os.path.join(data_dir, name)))
+    return h.digest()
+
+
+def slide_key(digest: bytes, pairing: str, seed: int, backend: str = "sets") -> str:
+    h = hashlib.sha1(digest)
+    h.update(f"{pairing}|{backend}|{seed}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def write_slides(path: str, store: SlideStore, state: RandomState) -> None:
+    """Zapis atomowy: najpierw plik tymczasowy, potem os.replace."""
+    store.sync()
+    ids = array("i", store.photo_sets or ())
+    p_off = array("i", [0])
+    p_tags = array("i")
+    for pid in ids:
+        p_tags.extend(sorted(store.photo_sets[pid]))
+        p_off.append(len(p_tags))
+    version, mt, gauss = state
+    names_blob = "\n".join(store.tag_names).encode("utf-8")
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(
+            _HEADER.pack(
+                MAGIC,
+                len(store),
+                len(store.tag_ids),
+                len(ids),
+                len(p_tags),
+                len(names_blob),
+                math.nan if gauss is None else gauss,
+            )
+        )
+        for arr in (store.photo_a, store.photo_b, store.offsets, store.tag_ids, ids, p_off, p_tags):
+            arr.tofile(f)
+        array("q", (version,) + tuple(mt)).tofile(f)
+        f.write(names_blob)
+    os.replace(tmp, path)
+
+
+def read_slides(path: str) -> Optional[Tuple[SlideStore, RandomState]]:
+    """Wczytuje slajdy i stan random; None gdy brak pliku albo plik jest ucięty /
+    uszkodzony (rozmiary niezgodne z nagłówkiem) - wtedy slajdy budujemy od nowa.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        head = f.read(_HEADER.size)
+        if len(head) != _HEADER.size:
+            return None
+        magic, n, n_tags, n_photos, n_photo_tags, n_blob, gauss = _HEADER.unpack(head)
+        if magic != MAGIC:
+            return None
+        arrays: List[array] = []
+        try:
+            for size in (n, n, n + 1, n_tags, n_photos, n_photos + 1, n_photo_tags):
+                arr = array("i")
+                arr.fromfile(f, size)
+                arrays.append(arr)
+            mt = array("q")
+            mt.fromfile(f, 626)
+            blob = f.read(n_blob)
+            names = blob.decode("utf-8").split("\n") if blob else []
+        except (EOFError, ValueError, OSError):
+            return None
+    photo_a, photo_b, offsets, tag_ids, ids, p_off, p_tags = arrays
+    if len(blob) != n_blob or offsets[-1] != n_tags or p_off[-1] != n_photo_tags:
+        return None
+    store = SlideStore(photo_a, photo_b, offsets, tag_ids, names)
+    store.photo_sets = {pid: frozenset(p_tags[p_off[k] : p_off[k + 1]]) for k, pid in enumerate(ids)}
+    state = (mt[0], tuple(mt[1:]), None if math.isnan(gauss) else gauss)
+    return store, state
+
+
+class SlideCache:
+    """Katalog plików .slides z limitem max_bytes; kolejność LRU wg czasu modyfikacji."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_MB << 20) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[Tuple[SlideStore, RandomState]]:
+        path = self.path(key)
+        hit = read_slides(path)
+        if hit is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return hit
+
+    def put(self, key: str, store: SlideStore, state: RandomState) -> None:
+        """Zapis i eviction; błędy zapisu (np. brak miejsca) są pomijane - slajdy i tak są."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_slides(self.path(key), store, state)
+        except OSError:
+            return
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Usuwa najdawniej używane pliki ponad limit (poza keep); zwraca usunięte klucze."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(SUFFIX) and entry.is_file():
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.name[: -len(SUFFIX)]))
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                continue
+            total -= size
+            removed.append(key)
+        return removed
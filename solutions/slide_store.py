@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Kompaktowy magazyn slajdów (struct-of-arrays) z tagami zamienionymi na int.
+
+Tagi są internowane raz, przy wczytaniu danych, do gęstych identyfikatorów
+0..T-1. Slajdy trzymamy w płaskich tablicach:
+- offsets / tag_ids: CSR (posortowane id tagów slajdu i leżą w
+  tag_ids[offsets[i]:offsets[i + 1]]),
+- counts: liczba tagów slajdu,
+- photo_a / photo_b: id zdjęć (photo_b == -1 dla slajdu H).
+Opcjonalnie photo_sets (id zdjęcia V -> zbiór tagów) pozwala zmieniać pary
+zdjęć V w trakcie poprawy lokalnej (set_pair).
+Słowniki {"photos", "tags"} są już tylko adapterem zgodności.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+
+def intern_tags(tags: Iterable[str], table: Dict[str, int], names: List[str]) -> List[int]:
+    """Zamienia tagi tekstowe na id, dopisując nowe tagi do tablicy."""
+    out = []
+    for t in tags:
+        tid = table.get(t)
+        if tid is None:
+            tid = len(names)
+            table[t] = tid
+            names.append(t)
+        out.append(tid)
+    return out
+
+
+class SlideStore:
+    """Slajdy jako płaskie tablice + interning tagów."""
+
+    __slots__ = (
+        "photo_a", "photo_b", "offsets", "tag_ids", "counts", "tag_names", "photo_sets", "_sets", "_post", "_stale"
+    )
+
+    def __init__(
+        self,
+        photo_a: array,
+        photo_b: array,
+        offsets: array,
+        tag_ids: array,
+        tag_names: List[str],
+    ) -> None:
+        self.photo_a = photo_a
+        self.photo_b = photo_b
+        self.offsets = offsets
+        self.tag_ids = tag_ids
+        self.tag_names = tag_names
+        self.counts = array("i", (offsets[i + 1] - offsets[i] for i in range(len(photo_a))))
+        self.photo_sets: Optional[Dict[int, frozenset]] = None
+        self._sets: Optional[List[frozenset]] = None
+        self._post: Optional[List[List[int]]] = None
+        self._stale = False
+
+    # ------------------------------------------------------------------ budowa
+
+    @classmethod
+    def from_slides(cls, slides: Sequence[dict], tag_names: Optional[List[str]] = None) -> "SlideStore":
+        """Buduje magazyn z listy słowników {"photos", "tags"}.
+
+        Jeśli podano tag_names, tagi w słownikach są już id (int);
+        w przeciwnym razie tagi tekstowe są internowane.
+        """
+        table: Dict[str, int] = {}
+        names: List[str] = [] if tag_names is None else tag_names
+
+        photo_a = array("i")
+        photo_b = array("i")
+        offsets = array("i", [0])
+        tag_ids = array("i")
+
+        for s in slides:
+            photos = s["photos"]
+            photo_a.append(photos[0])
+            photo_b.append(photos[1] if len(photos) > 1 else -1)
+            if tag_names is None:
+                ids = intern_tags(s["tags"], table, names)
+            else:
+                ids = s["tags"]
+            tag_ids.extend(sorted(ids))
+            offsets.append(len(tag_ids))
+
+        return cls(photo_a, photo_b, offsets, tag_ids, names)
+
+    @classmethod
+    def from_photo_pairs(
+        cls,
+        photo_a: array,
+        photo_b: array,
+        photo_offsets: Sequence[int],
+        photo_tag_ids: Sequence[int],
+        tag_names: List[str],
+    ) -> "SlideStore":
+        """Odtwarza magazyn z id zdjęć slajdów i CSR tagów zdjęć (slajd V = suma tagów).
+        Tagi zdjęć V trafiają do photo_sets. Wiersze CSR są sortowane (również H -
+        w pliku wejściowym tagi są w kolejności internowania), bo TagIndex.remove
+        i _group_key("min") zakładają posortowane id tagów.
+        """
+        offsets = array("i", [0])
+        tag_ids = array("i")
+        photo_sets: Dict[int, frozenset] = {}
+        for a, b in zip(photo_a, photo_b):
+            tags = photo_tag_ids[photo_offsets[a] : photo_offsets[a + 1]]
+            if b >= 0:
+                sa = photo_sets[a] = frozenset(tags)
+                sb = photo_sets[b] = frozenset(photo_tag_ids[photo_offsets[b] : photo_offsets[b + 1]])
+                tags = sa | sb
+            tag_ids.extend(sorted(tags))
+            offsets.append(len(tag_ids))
+        store = cls(array("i", photo_a), array("i", photo_b), offsets, tag_ids, tag_names)
+        store.photo_sets = photo_sets
+        return store
+
+    # ------------------------------------------------------------ pary zdjęć V
+
+    def set_photo_tags(self, photos: Iterable[dict]) -> None:
+        """Podpina tagi (id) zdjęć V, np. z load_photos - wymagane przez set_pair."""
+        self.photo_sets = {p["id"]: frozenset(p["tags"]) for p in photos}
+
+    def pair_tags(self, a: int, b: int) -> frozenset:
+        """Tagi slajdu złożonego ze zdjęć V a i b."""
+        return self.photo_sets[a] | self.photo_sets[b]
+
+    def set_pair(self, sid: int, a: int, b: int, tags: Optional[frozenset] = None) -> None:
+        """Podmienia zdjęcia slajdu V. Zbiory tagów, counts i zbudowane postings są
+        aktualne od razu; CSR (offsets / tag_ids) odświeża dopiero sync().
+        """
+        if tags is None:
+            tags = self.pair_tags(a, b)
+        sets = self.tag_sets()
+        post = self._post
+        if post is not None:
+            old = sets[sid]
+            for t in old - tags:
+                post[t].remove(sid)
+            for t in tags - old:
+                if t >= len(post):
+                    post.extend([] for _ in range(t + 1 - len(post)))
+                post[t].append(sid)
+        sets[sid] = tags
+        self.counts[sid] = len(tags)
+        self.photo_a[sid] = a
+        self.photo_b[sid] = b
+        self._stale = True
+
+    def sync(self) -> None:
+        """Przebudowuje CSR z bieżących zbiorów tagów po zmianach par (set_pair)."""
+        if not self._stale:
+            return
+        offsets = array("i", [0])
+        tag_ids = array("i")
+        for tags in self._sets:
+            tag_ids.extend(sorted(tags))
+            offsets.append(len(tag_ids))
+        self.offsets = offsets
+        self.tag_ids = tag_ids
+        self._post = None
+        self._stale = False
+
+    # ---------------------------------------------------------------- dostęp
+
+    def __len__(self) -> int:
+        return len(self.photo_a)
+
+    def tags(self, sid: int) -> array:
+        """Posortowane id tagów slajdu (kopia wycinka CSR)."""
+        return self.tag_ids[self.offsets[sid] : self.offsets[sid + 1]]
+
+    def tag_set(self, sid: int) -> frozenset:
+        return self.tag_sets()[sid]
+
+    def tag_sets(self) -> List[frozenset]:
+        """Zbiory id tagów per slajd - budowane leniwie, na potrzeby scoringu."""
+        if self._sets is None:
+            off = self.offsets
+            tid = self.tag_ids
+            self._sets = [frozenset(tid[off[i] : off[i + 1]]) for i in range(len(self))]
+        return self._sets
+
+    def postings(self) -> List[List[int]]:
+        """Indeks odwrócony: id tagu -> slajdy z tym tagiem (budowany leniwie,
+        aktualizowany przez set_pair).
+        """
+        if self._post is None:
+            post: List[List[int]] = [[] for _ in range(1 + max(self.tag_ids, default=-1))]
+            if self._stale:
+                for sid, tags in enumerate(self._sets):
+                    for t in tags:
+                        if t >= len(post):
+                            post.extend([] for _ in range(t + 1 - len(post)))
+                        post[t].append(sid)
+            else:
+                off = self.offsets
+                tid = self.tag_ids
+                for sid in range(len(self)):
+                    for k in range(off[sid], off[sid + 1]):
+                        post[tid[k]].append(sid)
+            self._post = post
+        return self._post
+
+    def photos(self, sid: int) -> List[int]:
+        b = self.photo_b[sid]
+        if b < 0:
+            return [self.photo_a[sid]]
+        return [self.photo_a[sid], b]
+
+    def __getitem__(self, sid: int) -> dict:
+        """Adapter zgodności: slajd jako słownik (tagi jako id)."""
+        return {"photos": self.photos(sid), "tags": self.tag_set(sid)}
+
+    def to_dicts(self) -> List[dict]:
+        """Pełna konwersja do starego formatu (tagi tekstowe)."""
+        names = self.tag_names
+        return [
+            {"photos": self.photos(i), "tags": {names[t] for t in self.tags(i)}}
+            for i in range(len(self))
+        ]
+
+    # ---------------------------------------------------------------- scoring
+
+    def score(self, a: int, b: int) -> int:
+        """Interest score między slajdami a i b (jedno przecięcie zbiorów)."""
+        sets = self._sets if self._sets is not None else self.tag_sets()
+        common = len(sets[a] & sets[b])
+        return min(common, self.counts[a] - common, self.counts[b] - common)
+
+    def best_of(self, a: int, cands: Sequence[int]) -> int:
+        """Pozycja (w cands) pierwszego najlepszego kandydata dla slajdu a."""
+        sets = self._sets if self._sets is not None else self.tag_sets()
+        counts = self.counts
+        sa = sets[a]
+        na = counts[a]
+        best_pos = 0
+        best_sc = -1
+        for pos, c in enumerate(cands):
+            common = len(sa & sets[c])
+            sc = min(common, na - common, counts[c] - common)
+            if sc > best_sc:
+                best_sc = sc
+                best_pos = pos
+        return best_pos
+
+    def scores(self, a: int, cands: Sequence[int]) -> List[int]:
+        """Lista score(a, c) dla wszystkich kandydatów c."""
+        sets = self._sets if self._sets is not None else self.tag_sets()
+        counts = self.counts
+        sa = sets[a]
+        na = counts[a]
+        out = []
+        for c in cands:
+            common = len(sa & sets[c])
+            out.append(min(common, na - common, counts[c] - common))
+        return out
+
+    @staticmethod
+    def sets_score(s: frozenset, t: frozenset) -> int:
+        """Score między dwoma zbiorami tagów (np. slajdów V po wymianie zdjęć)."""
+        common = len(s & t)
+        return min(common, len(s) - common, len(t) - common)
+
+    def order_score(self, order: Sequence[int]) -> int:
+        """Suma score po wszystkich krawędziach porządku."""
+        sets = self.tag_sets()
+        counts = self.counts
+        total = 0
+        for k in range(len(order) - 1):
+            a, b = order[k], order[k + 1]
+            common = len(sets[a] & sets[b])
+            total += min(common, counts[a] - common, counts[b] - common)
+        return total
+
+
+def as_store(slides: Union[SlideStore, Sequence[dict]]) -> SlideStore:
+    """Ujednolica wejście: SlideStore przechodzi bez zmian, lista słowników jest konwertowana."""
+    if isinstance(slides, SlideStore):
+        return slides
+    return SlideStore.from_slides(slides)
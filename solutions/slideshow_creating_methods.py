@@ -1,5 +1,5 @@
 import random
-from usefull_functions import interest_score, group_slides_by_tag, nearest_neighbor_group, order_groups_nn
+from ordering import build_slideshow_order
 
 
 def random_slideshow(slides):
@@ -8,60 +8,30 @@ def random_slideshow(slides):
     return slideshow
 
 
-def nearest_neighbor_slideshow(slides, k=100):
-    slides_left = slides.copy()
-    random.shuffle(slides_left)
-
-    current = slides_left.pop()
-    slideshow = [current]
-
-    while slides_left:
-        best_score = -1
-        best_idx = None
-
-        candidates = random.sample(
-            slides_left, 
-            min(k, len(slides_left))
-        )
-
-        for candidate in candidates:
-            score = interest_score(current["tags"], candidate["tags"])
-            if score > best_score:
-                best_score = score
-                best_idx = slides_left.index(candidate)
-
-        current = slides_left.pop(best_idx)
-        slideshow.append(current)
-
-    return slideshow
-
+def nearest_neighbor_slideshow(slides, k=100, candidates="random"):
+    """NN(k) - silnik indeksowy (swap-with-last) z ordering.build_slideshow_order."""
+    if not slides:
+        return []
+    order = build_slideshow_order(slides, method="nn", k=k, candidates=candidates)
+    return [slides[i] for i in order]
 
 
 def grouped_slideshow(slides):
-    groups = group_slides_by_tag(slides)
-    random.shuffle(groups)
-
-    slideshow = []
-
-    for group in groups:
-        random.shuffle(group)
-        slideshow.extend(group)
-
-    return slideshow
-
-
-def mixed_slideshow(slides):
-    groups = group_slides_by_tag(slides)
-
-    processed_groups = [
-        nearest_neighbor_group(group)
-        for group in groups
-    ]
-
-    ordered_groups = order_groups_nn(processed_groups)
-
-    slideshow = []
-    for group in ordered_groups:
-        slideshow.extend(group)
-
-    return slideshow
+    """Grupy po pierwszym tagu z iteracji zbioru (group_key="first")."""
+    order = build_slideshow_order(slides, method="grouped", group_key="first")
+    return [slides[i] for i in order]
+
+
+def mixed_slideshow(slides, k=300, k_group=10, candidates="random"):
+    """Grupy po pierwszym tagu, NN(k) w grupach i NN(k_group) między grupami."""
+    if not slides:
+        return []
+    order = build_slideshow_order(
+        slides,
+        method="mixed",
+        k=k,
+        k_group=k_group,
+        group_key="first",
+        candidates=candidates,
+    )
+    return [slides[i] for i in order]
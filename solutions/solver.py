@@ -1,10 +1,11 @@
 #!/usr/bin/env python3
 """
-1) wczytanie danych z JSON (H i V osobno)
+1) wczytanie danych: plik .txt (Hash Code, z binarnym cache) albo JSON (H i V osobno)
 2) budowa slajdów (H pojedynczo, V w parach)
 3) ułożenie kolejności (random / nn / grouped / mixed)
-4) opcjonalna poprawa lokalna (parametr --local_iters)
+4) opcjonalna poprawa lokalna (parametr --local_iters) i wyżarzanie (--time_limit)
 5) zapis pliku submission
+(--starts N --workers W: N niezależnych przebiegów w puli procesów, zostaje najlepszy)
 """
 
 from __future__ import annotations
@@ -16,10 +17,17 @@ import random
 
 sys.path.append(os.path.dirname(__file__))
 
-from usefull_functions import total_score
-from io_help import build_slides, write_submission
-from ordering import build_slideshow_order
-from local_search import local_improve
+from bitset_kernel import resolve_backend
+from checkpoint import Checkpointer
+from convergence import Tracer, plateau_stopper
+from io_help import load_photo_arrays, load_photos, read_submission, write_submission, write_submission_stream
+from local_search import parse_moves
+from metrics import Metrics, count_score_evals, timed
+from multistart import run_multistart
+from optimization import ANNEAL_P_END, ANNEAL_P_START
+from pipeline import candidate_graph, improve_order, pair_photos, solve_slides
+from slide_cache import DEFAULT_MAX_MB, SlideCache, input_digest, slide_key
+from streaming import stream_slides
 
 def run_solver(
     data_dir: str = "../data",
@@ -30,46 +38,191 @@ def run_solver(
     k: int = 100,
     k_group: int = 10,
     group_key: str = "min",
+    group_max: int = 500,
     local_iters: int = 0,
     eval_score: bool = False,
+    use_cache: bool = True,
+    candidates: str = "random",
+    backend: str = "sets",
+    starts: int = 1,
+    workers: int = 1,
+    report: list | None = None,
+    local_workers: int = 1,
+    local_rounds: int = 4,
+    moves: dict | None = None,
+    time_limit: float = 0.0,
+    anneal_p_start: float = ANNEAL_P_START,
+    anneal_p_end: float = ANNEAL_P_END,
+    islands: int = 1,
+    island_epochs: int = 50,
+    use_sweep: bool = False,
+    resume: str | None = None,
+    checkpoint_every: float = 0.0,
+    metrics: Metrics | None = None,
+    trace: Tracer | None = None,
+    knn: int = 0,
+    cache_dir: str | None = None,
+    cache_max_mb: int = DEFAULT_MAX_MB,
 ):
-    random.seed(seed)
-
-    slides = build_slides(pairing, data_dir)
-
-    order = build_slideshow_order(
-        slides,
-        method=order_method,
+    """resume: istniejący submission - pomijamy parowanie i budowę kolejności,
+    poprawiamy wczytany porządek. checkpoint_every > 0 (z out): okresowy zapis
+    najlepszego porządku do out i out.meta.json (nie dotyczy --starts > 1).
+    metrics: metrics.Metrics wypełniany czasami etapów (load, pairing, ordering,
+    local_search, anneal, multistart, write, evaluation), liczbą obliczeń score
+    (magazyn slajdów z metrics.count_score_evals) i statystykami ruchów; None = bez pomiarów.
+    trace: convergence.Tracer - ślad zbieżności poprawy lokalnej i wyżarzania
+    (nie dotyczy --starts > 1).
+    knn: M grafu kandydatów (pipeline.candidate_graph); z use_cache graf leży obok danych.
+    cache_dir: katalog cache zbudowanych slajdów (slide_cache, limit cache_max_mb MB) -
+    przy trafieniu pomijamy wczytanie i parowanie (tylko pojedynczy start bez resume).
+    resume wyklucza starts > 1, workers > 1 i cache_dir (ValueError).
+    """
+    if resume is not None and (starts > 1 or workers > 1 or cache_dir is not None):
+        raise ValueError("resume cannot be combined with starts > 1, workers > 1 or cache_dir")
+    backend = resolve_backend(backend)
+    params = dict(
+        pairing=pairing,
+        order_method=order_method,
         k=k,
         k_group=k_group,
         group_key=group_key,
+        group_max=group_max,
+        local_iters=local_iters,
+        candidates=candidates,
+        backend=backend,
+        local_workers=local_workers,
+        local_rounds=local_rounds,
+        moves=moves,
+        time_limit=time_limit,
+        anneal_p_start=anneal_p_start,
+        anneal_p_end=anneal_p_end,
+        islands=islands,
+        island_epochs=island_epochs,
+        use_sweep=use_sweep,
+        knn=knn,
+        knn_cache=data_dir if use_cache else None,
     )
 
-    if local_iters > 0:
-        order = local_improve(
+    checkpoint = None
+    if out is not None and checkpoint_every > 0:
+        checkpoint = Checkpointer(out, every=checkpoint_every, seed=seed, resumed_from=resume)
+
+    score = None
+    if resume is not None:
+        random.seed(seed)
+        with timed(metrics, "load"):
+            slides = read_submission(resume, load_photo_arrays(data_dir, use_cache=use_cache))
+        slides = count_score_evals(slides, metrics)
+        order = list(range(len(slides)))
+        if checkpoint is not None:
+            checkpoint.slides = slides
+        graph = candidate_graph(slides, knn, candidates, params["knn_cache"], backend, metrics)
+        order, score = improve_order(
             slides,
             order,
-            iters=local_iters,
-            seed=seed
+            seed=seed,
+            local_iters=local_iters,
+            local_workers=local_workers,
+            local_rounds=local_rounds,
+            moves=moves,
+            time_limit=time_limit,
+            anneal_p_start=anneal_p_start,
+            anneal_p_end=anneal_p_end,
+            islands=islands,
+            island_epochs=island_epochs,
+            use_sweep=use_sweep,
+            checkpoint=checkpoint,
+            metrics=metrics,
+            trace=trace,
+            graph=graph,
+        )
+    elif starts > 1:
+        with timed(metrics, "load"):
+            data = load_photo_arrays(data_dir, use_cache=use_cache)
+        with timed(metrics, "multistart"):
+            slides, order, score = run_multistart(data, starts, workers=workers, seed=seed, report=report, **params)
+        slides = count_score_evals(slides, metrics)
+    else:
+        slides = None
+        if cache_dir is not None:
+            cache = SlideCache(cache_dir, cache_max_mb << 20)
+            with timed(metrics, "load"):
+                key = slide_key(input_digest(data_dir), pairing, seed, backend)
+                hit = cache.get(key)
+            if hit is not None:
+                slides, state = hit
+                slides = count_score_evals(slides, metrics)
+                random.setstate(state)
+                if metrics is not None:
+                    metrics.count("slide_cache_hits")
+        if slides is None:
+            with timed(metrics, "load"):
+                h, v, names = load_photos(data_dir, use_cache=use_cache)
+            slides = pair_photos(h, v, names, seed=seed, pairing=pairing, backend=backend, metrics=metrics)
+            del h, v
+            if cache_dir is not None:
+                cache.put(key, slides, random.getstate())
+        rest = {name: value for name, value in params.items() if name != "pairing"}
+        slides, order, score = solve_slides(
+            slides, seed=seed, checkpoint=checkpoint, metrics=metrics, trace=trace, **rest
         )
 
-    if out is not None:
-        write_submission(slides, order, out)
+    with timed(metrics, "write"):
+        if checkpoint is not None:
+            if score is None:
+                score = slides.order_score(order)
+            checkpoint.slides = slides
+            checkpoint.save(order, score, final=True)
+        elif out is not None:
+            write_submission(slides, order, out)
 
-    score = None
-    if eval_score:
-        slideshow = [slides[i] for i in order]
-        score = total_score(slideshow)
+    if not eval_score:
+        score = None
+    elif score is None:
+        with timed(metrics, "evaluation"):
+            score = slides.order_score(order)
 
     return slides, order, score
 
 
-def main() -> None:
+def run_stream(
+    data_dir: str,
+    out: str,
+    chunk_size: int,
+    seed: int = 42,
+    pairing: str = "different",
+    k: int = 100,
+    candidates: str = "random",
+    backend: str = "sets",
+    metrics: Metrics | None = None,
+) -> tuple:
+    """Tryb strumieniowy (streaming.stream_slides): porcje po chunk_size zdjęć, NN(k)
+    w porcji, slajdy od razu do write_submission_stream. Zwraca (liczba slajdów, score).
+    """
+    random.seed(seed)
+    totals: dict = {}
+    with timed(metrics, "stream"):
+        slides = stream_slides(
+            data_dir, chunk_size, pairing=pairing, k=k, candidates=candidates, backend=backend, totals=totals, metrics=metrics
+        )
+        count = write_submission_stream(slides, out)
+    if metrics is not None:
+        metrics.count("stream_chunks", totals["chunks"])
+    return count, totals["score"]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser flag solvera (używany też przez batch.py dla wariantów)."""
     ap = argparse.ArgumentParser()
-    ap.add_argument("--data_dir", default="../data", help="Katalog z horizontal_photos.json i vertical_photos.json")
+    ap.add_argument("--data_dir", default="../data", help="Plik .txt w formacie Hash Code albo katalog z horizontal_photos.json i vertical_photos.json")
     ap.add_argument("--out", default="out.txt", help="Ścieżka pliku wynikowego (submission)")
     ap.add_argument("--seed", type=int, default=42)
-    ap.add_argument("--pairing", choices=["random", "similar", "different"], default="different")
+    ap.add_argument(
+        "--pairing",
+        choices=["random", "similar", "different", "target"],
+        default="different",
+        help="Parowanie zdjęć V (target: suma tagów pary blisko 2x mediany V, kubełki wg liczby tagów)",
+    )
     ap.add_argument(
         "--order",
         choices=["random", "nn", "grouped", "mixed"],
@@ -80,31 +233,237 @@ def main() -> None:
     ap.add_argument("--k_group", type=int, default=10, help="Parametr dla łączenia grup w Mixed")
     ap.add_argument(
         "--group_key",
-        choices=["min", "first"],
+        choices=["min", "first", "lsh"],
         default="min",
-        help="Tag-reprezentant grupy w Grouped/Mixed (min = deterministyczny)",
+        help="Grupowanie w Grouped/Mixed: tag-reprezentant (min = deterministyczny, first) "
+        "albo lsh = kubełki MinHash/LSH podobnych slajdów",
+    )
+    ap.add_argument(
+        "--group_max",
+        type=int,
+        default=500,
+        help="Maksymalny rozmiar grupy dla --group_key lsh",
+    )
+    ap.add_argument(
+        "--candidates",
+        choices=["tags", "random", "knn"],
+        default="tags",
+        help="Kandydaci w krokach NN: ze wspólnym tagiem (indeks odwrócony), losowi "
+        "lub knn = najlepszy wolny sąsiad z grafu kandydatów (--knn)",
+    )
+    ap.add_argument(
+        "--knn",
+        type=int,
+        default=0,
+        help="M > 0: graf M najlepszych partnerów slajdu (cache obok danych) dla NN "
+        "i ruchów swap / 2-opt / Or-opt poprawy lokalnej (0 = wyłączony; "
+        "--candidates knn bez --knn używa M=8)",
+    )
+    ap.add_argument(
+        "--backend",
+        choices=["auto", "sets", "bitset"],
+        default="auto",
+        help="Backend scoringu dla NN / Mixed i parowania (bitset wymaga NumPy; auto = bitset, "
+        "gdy NumPy jest zainstalowany, inaczej sets)",
     )
     ap.add_argument("--local_iters", type=int, default=0, help="Ile iteracji poprawy lokalnej (0 wyłącza)")
-    ap.add_argument("--eval", action="store_true", help="Policz i wypisz score (może być wolne)")
-    args = ap.parse_args()
+    ap.add_argument(
+        "--local_workers",
+        type=int,
+        default=1,
+        help="Procesy dla poprawy lokalnej na rozłącznych segmentach (1 = jeden wątek)",
+    )
+    ap.add_argument("--local_rounds", type=int, default=4, help="Rundy (przesunięcia granic segmentów) przy --local_workers > 1")
+    ap.add_argument(
+        "--moves",
+        type=parse_moves,
+        default=None,
+        help="Miks ruchów poprawy lokalnej (adjacent, swap, two_opt, or_opt, partner), np. adjacent=0.5,swap=0.25,two_opt=0.1,or_opt=0.15",
+    )
+    ap.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Poprawa lokalna jako przegląd z don't-look bits (pierwszy lepszy swap / 2-opt); "
+        "--local_iters to limit kroków, kończy wcześniej w lokalnym optimum",
+    )
+    ap.add_argument(
+        "--islands",
+        type=int,
+        default=1,
+        help="Model wyspowy: tyle procesów poprawia własne kopie porządku (po --local_iters każda) "
+        "i wymienia najlepszy porządek (1 = wyłączony)",
+    )
+    ap.add_argument(
+        "--island_epochs",
+        type=int,
+        default=50,
+        help="Liczba wymian najlepszego porządku między wyspami (1 = niezależne przebiegi)",
+    )
+    ap.add_argument(
+        "--time_limit",
+        type=float,
+        default=0.0,
+        help="Sekundy symulowanego wyżarzania po poprawie lokalnej (0 wyłącza)",
+    )
+    ap.add_argument(
+        "--anneal_p_start",
+        type=float,
+        default=ANNEAL_P_START,
+        help="P-stwo przyjęcia średniego pogarszającego ruchu na starcie wyżarzania (domyślne "
+        "wartości: spadek z ruchami neutralnymi; większe, np. 1e-6, przyjmują straty na starcie)",
+    )
+    ap.add_argument(
+        "--anneal_p_end",
+        type=float,
+        default=ANNEAL_P_END,
+        help="P-stwo przyjęcia ruchu o -1 na końcu wyżarzania",
+    )
+    ap.add_argument(
+        "--resume",
+        default=None,
+        help="Istniejący submission do dalszej poprawy (bez parowania i budowy kolejności)",
+    )
+    ap.add_argument(
+        "--checkpoint_every",
+        type=float,
+        default=0.0,
+        help="Co ile sekund zapisywać najlepszy porządek do --out (+ .meta.json); 0 wyłącza",
+    )
+    ap.add_argument(
+        "--stream_chunk",
+        type=int,
+        default=0,
+        help="N > 0: tryb strumieniowy dla dużych wejść .txt - porcje po N zdjęć, NN(--k) w porcji "
+        "(--order ignorowane), slajdy zapisywane na bieżąco; bez poprawy lokalnej",
+    )
+    ap.add_argument("--eval", action="store_true", help="Wypisz score (po poprawie lokalnej bez dodatkowego przebiegu)")
+    ap.add_argument("--starts", type=int, default=1, help="Liczba niezależnych startów (ziarna seed, seed+1, ...)")
+    ap.add_argument("--workers", type=int, default=1, help="Liczba procesów dla --starts > 1")
+    ap.add_argument("--no_cache", action="store_true", help="Nie używaj binarnego cache dla wejścia .txt")
+    ap.add_argument(
+        "--cache_dir",
+        default=None,
+        help="Katalog cache zbudowanych slajdów (klucz: skrót wejścia, --pairing, --backend, --seed); "
+        "kolejne przebiegi pomijają wczytanie i parowanie",
+    )
+    ap.add_argument("--cache_max_mb", type=int, default=DEFAULT_MAX_MB, help="Limit rozmiaru --cache_dir (LRU)")
+    ap.add_argument("--metrics", default=None, help="Zapis czasów etapów, liczników i statystyk ruchów do pliku JSON")
+    ap.add_argument("--trace", default=None, help="CSV ze śladem zbieżności (iteracja, czas, wynik, najlepszy, odsetek przyjęć)")
+    ap.add_argument("--trace_every", type=int, default=10000, help="Co ile iteracji próbka śladu")
+    ap.add_argument(
+        "--plateau",
+        type=float,
+        default=0.0,
+        help="Przerwij poprawę, gdy najlepszy wynik nie rośnie o --plateau_gain przez tyle sekund (0 wyłącza)",
+    )
+    ap.add_argument("--plateau_gain", type=int, default=1, help="Minimalny przyrost wyniku dla --plateau")
+    return ap
 
-    slides, order, score = run_solver(
-        data_dir=args.data_dir,
-        out=args.out,
-        seed=args.seed,
+
+def solve_params(args: argparse.Namespace) -> dict:
+    """Parametry przebiegu (pipeline.solve_photos) z flag solvera."""
+    return dict(
         pairing=args.pairing,
         order_method=args.order,
         k=args.k,
         k_group=args.k_group,
         group_key=args.group_key,
+        group_max=args.group_max,
+        knn=args.knn,
         local_iters=args.local_iters,
+        candidates=args.candidates,
+        backend=args.backend,
+        local_workers=args.local_workers,
+        local_rounds=args.local_rounds,
+        moves=args.moves,
+        time_limit=args.time_limit,
+        anneal_p_start=args.anneal_p_start,
+        anneal_p_end=args.anneal_p_end,
+        islands=args.islands,
+        island_epochs=args.island_epochs,
+        use_sweep=args.sweep,
+    )
+
+
+def main() -> None:
+    ap = build_parser()
+    args = ap.parse_args()
+
+    if args.stream_chunk > 0:
+        if not os.path.isfile(args.data_dir):
+            ap.error("--stream_chunk wymaga pliku .txt jako --data_dir")
+        if args.resume or args.starts > 1 or args.local_iters > 0 or args.time_limit > 0 or args.checkpoint_every > 0:
+            ap.error("--stream_chunk nie działa z --resume / --starts / --local_iters / --time_limit / --checkpoint_every")
+        if args.candidates == "knn" or args.knn > 0:
+            ap.error("--stream_chunk nie działa z grafem kandydatów (--candidates knn / --knn)")
+        metrics = Metrics() if args.metrics else None
+        count, score = run_stream(
+            args.data_dir,
+            args.out,
+            args.stream_chunk,
+            seed=args.seed,
+            pairing=args.pairing,
+            k=args.k,
+            candidates=args.candidates,
+            backend=args.backend,
+            metrics=metrics,
+        )
+        print(f"Slajdy: {count:,}")
+        print(f"Zapisano: {args.out}")
+        if args.eval:
+            print("Wynik:", score)
+        if metrics is not None:
+            metrics.write_json(args.metrics)
+            print(metrics.summary())
+            print(f"Metryki: {args.metrics}")
+        return
+
+    if not (0 < args.anneal_p_start < 1 and 0 < args.anneal_p_end < 1):
+        ap.error("--anneal_p_start / --anneal_p_end muszą być w (0, 1)")
+    if args.resume and (args.starts > 1 or args.workers > 1 or args.cache_dir):
+        ap.error("--resume nie działa z --starts / --workers / --cache_dir")
+
+    metrics = Metrics() if args.metrics else None
+    trace = None
+    if args.trace or args.plateau > 0:
+        trace = Tracer(
+            callback=plateau_stopper(args.plateau, args.plateau_gain) if args.plateau > 0 else None,
+            every=args.trace_every,
+            csv_path=args.trace,
+        )
+
+    report: list = []
+    slides, order, score = run_solver(
+        data_dir=args.data_dir,
+        out=args.out,
+        seed=args.seed,
         eval_score=args.eval,
+        use_cache=not args.no_cache,
+        starts=args.starts,
+        workers=args.workers,
+        report=report,
+        resume=args.resume,
+        checkpoint_every=args.checkpoint_every,
+        cache_dir=args.cache_dir,
+        cache_max_mb=args.cache_max_mb,
+        metrics=metrics,
+        trace=trace,
+        **solve_params(args),
     )
+    if trace is not None:
+        trace.close()
+
+    for r in report:
+        print(f"Start {r['start']} (seed={r['seed']}): wynik={r['score']}, czas={r['time']:.2f}s")
 
     print(f"Slajdy: {len(slides):,}")
     print(f"Zapisano: {args.out}")
     if score is not None:
         print("Wynik:", score)
+    if metrics is not None:
+        metrics.write_json(args.metrics)
+        print(metrics.summary())
+        print(f"Metryki: {args.metrics}")
 
 
 if __name__ == "__main__":
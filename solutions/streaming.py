@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Strumieniowa budowa pokazu dla wejść większych niż pamięć na cały porządek.
+
+Plik .txt czytamy porcjami po chunk_size zdjęć. W każdej porcji zdjęcia V są
+parowane (nieparzyste zdjęcie V przechodzi do następnej porcji), slajdy trafiają
+do małego SlideStore i są układane NN(k), zaczynając od ostatniego slajdu
+poprzedniej porcji - przejście między porcjami też jest liczone. Ułożone slajdy
+(krotki id zdjęć) wychodzą z generatora od razu i mogą iść prosto do
+io_help.write_submission_stream, więc pamięć zależy od chunk_size, a nie od
+wielkości wejścia (poza tablicą nazw tagów, wspólną dla całego pliku).
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from io_help import check_photo_line, pairing_function, read_declared_count
+from metrics import Metrics, count_score_evals
+from ordering import order_nn
+from slide_store import SlideStore, intern_tags
+from usefull_functions import create_horizontal_slides, create_vertical_slide
+
+# Domyślna liczba zdjęć w porcji.
+DEFAULT_CHUNK = 50000
+
+
+def iter_photo_chunks(
+    path: str, chunk_size: int, table: Dict[str, int], names: List[str]
+) -> Iterator[Tuple[List[dict], List[dict]]]:
+    """Porcje (H, V) zdjęć z pliku .txt, po chunk_size zdjęć; tagi jako zbiory id
+    (table / names - wspólny interning dla całego pliku). Linie i liczba zdjęć są
+    sprawdzane jak w io_help.parse_txt (ValueError z numerem linii) - niezgodność
+    liczby zdjęć z nagłówkiem wychodzi dopiero po ostatniej porcji.
+    """
+    h: List[dict] = []
+    v: List[dict] = []
+    with open(path, "r", encoding="utf-8") as f:
+        declared = read_declared_count(f, path)
+        pid = 0
+        for lineno, line in enumerate(f, start=2):
+            parts = line.split()
+            if not parts:
+                continue
+            check_photo_line(parts, path, lineno)
+            if pid == declared:
+                raise ValueError(f"{path}:{lineno}: więcej zdjęć niż zadeklarowane {declared}")
+            p = {"id": pid, "tags": set(intern_tags(parts[2:], table, names))}
+            (v if parts[0] == "V" else h).append(p)
+            pid += 1
+            if pid % chunk_size == 0:
+                yield h, v
+                h, v = [], []
+    if h or v:
+        yield h, v
+    if pid != declared:
+        raise ValueError(f"{path}: nagłówek={declared}, zdjęcia={pid}")
+
+
+def stream_slides(
+    path: str,
+    chunk_size: int = DEFAULT_CHUNK,
+    pairing: str = "different",
+    k: int = 100,
+    candidates: str = "random",
+    backend: str = "sets",
+    totals: Optional[Dict[str, int]] = None,
+    metrics: Optional[Metrics] = None,
+) -> Iterator[Tuple[int, ...]]:
+    """Generator slajdów (krotki id zdjęć) w kolejności pokazu, porcja po porcji.
+    candidates: "tags" albo "random" jak w ordering.order_nn (graf knn wymagałby całego wejścia).
+    totals: jeśli podany, dostaje "slides", "chunks" i "score" (suma przejść, także między porcjami).
+    metrics: liczba obliczeń score (metrics.count_score_evals) we wszystkich porcjach.
+    """
+    if candidates not in ("tags", "random"):
+        raise ValueError(f"Unknown candidate mode for streaming: {candidates}")
+    pair = pairing_function(pairing, backend)
+    if totals is not None:
+        totals.update(slides=0, chunks=0, score=0)
+
+    table: Dict[str, int] = {}
+    names: List[str] = []
+    carry: Optional[dict] = None  # ostatni slajd poprzedniej porcji (już wysłany)
+    spare: List[dict] = []  # zdjęcia V bez pary z poprzedniej porcji
+    for h, v in iter_photo_chunks(path, chunk_size, table, names):
+        v = spare + v
+        pairs = pair(v)
+        paired = {p["id"] for pair_ in pairs for p in pair_}
+        spare = [p for p in v if p["id"] not in paired]
+
+        slides = create_horizontal_slides(h)
+        slides.extend(create_vertical_slide(a, b) for a, b in pairs)
+        del h, v, pairs
+        if not slides:
+            continue
+        random.shuffle(slides)
+        if carry is not None:
+            slides.insert(0, carry)
+
+        store = count_score_evals(SlideStore.from_slides(slides, tag_names=names), metrics)
+        del slides
+        order = order_nn(store, k=k, candidates=candidates, backend=backend, start=0 if carry is not None else None)
+        if totals is not None:
+            totals["score"] += store.order_score(order)
+            totals["slides"] += len(order) - (carry is not None)
+            totals["chunks"] += 1
+
+        for sid in order[1:] if carry is not None else order:
+            yield tuple(store.photos(sid))
+        last = order[-1]
+        carry = {"photos": store.photos(last), "tags": store.tag_set(last)}
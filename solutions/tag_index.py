@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Odwrócony indeks tag -> pozostałe (nieułożone) slajdy.
+
+Usuwanie slajdu kosztuje O(1) na każdy jego tag: element z końca listy
+postingów wskakuje w miejsce usuwanego (swap-with-last), a jego pozycja
+jest poprawiana przez bisect w CSR slajdu.
+"""
+
+from __future__ import annotations
+
+import random
+from bisect import bisect_left
+from typing import Dict, Iterable, List
+
+from slide_store import SlideStore
+
+
+class TagIndex:
+    """Indeks postingów tagów dla podzbioru slajdów."""
+
+    def __init__(self, store: SlideStore, sids: Iterable[int]) -> None:
+        self.store = store
+        self.items: List[int] = []
+        self._item_pos: Dict[int, int] = {}
+        self._post: Dict[int, List[int]] = {}
+        self._where: Dict[int, List[int]] = {}
+
+        post = self._post
+        for sid in sids:
+            self._item_pos[sid] = len(self.items)
+            self.items.append(sid)
+            w = []
+            for t in store.tags(sid):
+                lst = post.get(t)
+                if lst is None:
+                    lst = post[t] = []
+                w.append(len(lst))
+                lst.append(sid)
+            self._where[sid] = w
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __contains__(self, sid: int) -> bool:
+        return sid in self._item_pos
+
+    def remove(self, sid: int) -> None:
+        """Usuwa slajd z indeksu (swap-with-last w każdej liście)."""
+        store = self.store
+        offsets = store.offsets
+        tag_ids = store.tag_ids
+
+        p = self._item_pos.pop(sid)
+        last = self.items.pop()
+        if last != sid:
+            self.items[p] = last
+            self._item_pos[last] = p
+
+        w = self._where.pop(sid)
+        for j, t in enumerate(store.tags(sid)):
+            lst = self._post[t]
+            p = w[j]
+            last = lst.pop()
+            if last != sid:
+                lst[p] = last
+                lo = offsets[last]
+                self._where[last][bisect_left(tag_ids, t, lo, offsets[last + 1]) - lo] = p
+
+    def sample_candidates(self, sid: int, k: int) -> List[int]:
+        """Do k kandydatów dzielących z sid co najmniej jeden tag.
+
+        Losujemy tag slajdu (spośród niepustych list), potem slajd z jego listy.
+        Gdy żaden pozostały slajd nie dzieli tagu - zwykłe losowanie z pozostałych.
+        """
+        post = self._post
+        lists = [lst for lst in (post.get(t) for t in self.store.tags(sid)) if lst]
+        if not lists:
+            m = min(max(1, k), len(self.items))
+            return random.sample(self.items, m)
+
+        rnd = random.random
+        nl = len(lists)
+        cands = set()
+        for _ in range(max(1, k)):
+            lst = lists[int(rnd() * nl)]
+            cands.add(lst[int(rnd() * len(lst))])
+        return list(cands)
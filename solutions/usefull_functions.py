@@ -2,6 +2,8 @@ import json
 import random
 from collections import defaultdict
 
+from ordering import chain_groups, order_nn
+
 
 def load_photos_from_json(filename):
     with open(filename, "r", encoding="utf-8") as f:
@@ -13,9 +15,7 @@ def load_photos_from_json(filename):
 
 def interest_score(tags_a: set, tags_b: set) -> int:
     common = len(tags_a & tags_b)
-    only_a = len(tags_a - tags_b)
-    only_b = len(tags_b - tags_a)
-    return min(common, only_a, only_b)
+    return min(common, len(tags_a) - common, len(tags_b) - common)
 
 def slide_score(slide_a, slide_b):
     return interest_score(slide_a["tags"], slide_b["tags"])
@@ -55,65 +55,28 @@ def group_slides_by_tag(slides):
     return list(groups.values())
 
 
-def nearest_neighbor_group(slides, k=300):
+def nearest_neighbor_group(slides, k=300, candidates="random"):
+    """NN(k) na liście słowników - silnik indeksowy z ordering.order_nn."""
     if not slides:
         return []
-
-    slides_left = slides.copy()
-    random.shuffle(slides_left)
-
-    current = slides_left.pop()
-    ordered = [current]
-
-    while slides_left:
-        best_score = -1
-        best_idx = None
-
-        candidates = random.sample(
-            slides_left,
-            min(k, len(slides_left))
-        )
-
-        for candidate in candidates:
-            score = interest_score(current["tags"], candidate["tags"])
-            if score > best_score:
-                best_score = score
-                best_idx = slides_left.index(candidate)
-
-        current = slides_left.pop(best_idx)
-        ordered.append(current)
-
-    return ordered
+    order = order_nn(slides, k=k, candidates=candidates)
+    return [slides[i] for i in order]
 
 
 def order_groups_nn(groups, k=10):
-    groups_left = groups.copy()
-    random.shuffle(groups_left)
-
-    current = groups_left.pop()
-    ordered_groups = [current]
-
-    while groups_left:
-        best_score = -1
-        best_idx = None
-
-        candidates = random.sample(
-            groups_left,
-            min(k, len(groups_left))
-        )
-
-        for group in candidates:
-            score = interest_score(
-                ordered_groups[-1][-1]["tags"],
-                group[0]["tags"]
-            )
-            if score > best_score:
-                best_score = score
-                best_idx = groups_left.index(group)
+    """Kolejność grup słowników (przejście last->first) - silnik z ordering.chain_groups."""
+    if not groups:
+        return []
 
-        ordered_groups.append(groups_left.pop(best_idx))
+    ends = []
+    index_groups = []
+    for g in groups:
+        index_groups.append([len(ends), len(ends) + 1])
+        ends.append(g[0])
+        ends.append(g[-1])
 
-    return ordered_groups
+    ordered = chain_groups(ends, index_groups, k_group=k)
+    return [groups[ig[0] // 2] for ig in ordered]
 
 
 def delta_swap(slides, i, j):
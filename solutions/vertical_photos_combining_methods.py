@@ -1,4 +1,244 @@
 import random
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate, chain
+
+from bitset_kernel import encode_bitsets, np, popcount, resolve_backend
+
+
+class _UnusedWindow:
+    """
+    Compact, sorted list of the still unused positions in [idx - k, idx + k)
+    of the greedy window scan, scored with one set intersection per candidate.
+
+    As idx slides, new positions are appended on the right (they can't be
+    used yet - partners are always taken from inside the window), fallen-off
+    ones are cut from the left and a chosen partner is deleted in place, so
+    used photos are never looked at again.
+    prefer: "max" (similar) or "min" (different) intersection size; ties go
+    to the first candidate in the window.
+    """
+
+    def __init__(self, photos, k, prefer):
+        self.n = len(photos)
+        self.k = k
+        self.entered = 0
+        self.items = []
+        self.tags = [p["tags"] for p in photos]
+        self.prefer = max if prefer == "max" else min
+
+    def slide(self, idx):
+        end = min(self.n, idx + self.k)
+        if self.entered < end:
+            self.items.extend(range(self.entered, end))
+            self.entered = end
+        cut = bisect_left(self.items, idx - self.k)
+        if cut:
+            del self.items[:cut]
+
+    def remove(self, value):
+        del self.items[bisect_left(self.items, value)]
+
+    def restore(self, value):
+        self.items.insert(bisect_left(self.items, value), value)
+
+    def pop(self, pos):
+        return self.items.pop(pos)
+
+    def best(self, idx):
+        """Position (in the window) of the best partner for idx, -1 if the window is empty."""
+        if not self.items:
+            return -1
+        a = self.tags[idx]
+        tags = self.tags
+        common = [len(a & tags[j]) for j in self.items]
+        return common.index(self.prefer(common))
+
+
+class _BitsetWindow(_UnusedWindow):
+    """
+    The same window kept in preallocated NumPy buffers: positions and their
+    tag bitset rows side by side, so the whole window is scored with one
+    AND + popcount over a contiguous slice (no gather). Removal shifts the
+    shorter side of the buffers.
+    """
+
+    def __init__(self, photos, k, prefer):
+        self.n = len(photos)
+        self.k = k
+        self.entered = 0
+        self.bits = _photo_bitsets(photos)
+        self.pos = np.empty(max(1, self.n), dtype=np.int64)
+        self.rows = np.empty((max(1, self.n), self.bits.shape[1]), dtype=np.uint64)
+        self.head = 0
+        self.tail = 0
+        self.prefer = np.argmax if prefer == "max" else np.argmin
+
+    def slide(self, idx):
+        end = min(self.n, idx + self.k)
+        if self.entered < end:
+            m = end - self.entered
+            self.pos[self.tail : self.tail + m] = np.arange(self.entered, end)
+            self.rows[self.tail : self.tail + m] = self.bits[self.entered : end]
+            self.tail += m
+            self.entered = end
+        if self.head < self.tail and self.pos[self.head] < idx - self.k:
+            self.head += int(np.searchsorted(self.pos[self.head : self.tail], idx - self.k))
+
+    def remove(self, value):
+        if self.pos[self.head] == value:
+            self.head += 1
+        else:
+            self.pop(int(np.searchsorted(self.pos[self.head : self.tail], value)))
+
+    def restore(self, value):
+        # only called right after remove(value) emptied the window (head == tail)
+        at = self.head - 1 if self.head > 0 else self.tail
+        self.pos[at] = value
+        self.rows[at] = self.bits[value]
+        self.head, self.tail = at, at + 1
+
+    def pop(self, pos):
+        head, tail = self.head, self.tail
+        at = head + pos
+        value = int(self.pos[at])
+        if pos < tail - at - 1:
+            self.pos[head + 1 : at + 1] = self.pos[head:at]
+            self.rows[head + 1 : at + 1] = self.rows[head:at]
+            self.head = head + 1
+        else:
+            self.pos[at : tail - 1] = self.pos[at + 1 : tail]
+            self.rows[at : tail - 1] = self.rows[at + 1 : tail]
+            self.tail = tail - 1
+        return value
+
+    def best(self, idx):
+        if self.head == self.tail:
+            return -1
+        common = popcount(self.rows[self.head : self.tail] & self.bits[idx]).sum(axis=1)
+        return int(self.prefer(common))
+
+
+def _photo_bitsets(photos):
+    """(n, W) uint64 tag bitsets of the photos (tags interned in first-seen order)."""
+    flat = list(chain.from_iterable(p["tags"] for p in photos))
+    table = {t: i for i, t in enumerate(dict.fromkeys(flat))}
+    offsets = array("i", [0])
+    offsets.extend(accumulate(len(p["tags"]) for p in photos))
+    tag_ids = array("i", map(table.__getitem__, flat))
+    return encode_bitsets(offsets, tag_ids, len(table))
+
+
+def _pair_window(photos, k, prefer, backend="auto"):
+    """
+    Greedy +-k window scan shared by the similar/different pairings.
+    photos: already sorted (and trimmed to even length) list of photos.
+    prefer: "max" (similar) or "min" (different) intersection size.
+    Both backends return the same pairs as the original loop; "auto" picks
+    "bitset" when NumPy is installed and "sets" otherwise.
+    """
+    backend = resolve_backend(backend)
+    if backend == "bitset":
+        window = _BitsetWindow(photos, k, prefer)
+    elif backend == "sets":
+        window = _UnusedWindow(photos, k, prefer)
+    else:
+        raise ValueError(f"Unknown scoring backend: {backend}")
+    if k < 1:
+        return []
+
+    used = bytearray(len(photos))
+    pairs = []
+
+    for idx in range(len(photos)):
+        if used[idx]:
+            continue
+
+        window.slide(idx)
+        window.remove(idx)
+        pos = window.best(idx)
+        if pos < 0:
+            # no partner: idx stays available for later photos
+            window.restore(idx)
+            continue
+
+        j = window.pop(pos)
+        used[j] = 1
+        pairs.append((photos[idx], photos[j]))
+
+    return pairs
+
+
+class _CountBuckets:
+    """
+    Unused photos bucketed by (tag count, mask of the few most frequent tags).
+    Each bucket is a list with swap-with-last removal, so taking a photo out
+    is O(1) and a partner lookup only touches a bounded number of buckets.
+    """
+
+    def __init__(self, photos, frequent):
+        self.tags = [p["tags"] for p in photos]
+        self.bit = {t: 1 << i for i, t in enumerate(frequent)}
+        self.full = (1 << len(frequent)) - 1
+        self.key = []
+        self.buckets = {}
+        self.where = []
+        for idx, tags in enumerate(self.tags):
+            key = (len(tags), self.mask(tags))
+            bucket = self.buckets.setdefault(key, [])
+            self.key.append(key)
+            self.where.append(len(bucket))
+            bucket.append(idx)
+
+    def mask(self, tags):
+        m = 0
+        for t in tags:
+            m |= self.bit.get(t, 0)
+        return m
+
+    def remove(self, idx):
+        bucket = self.buckets[self.key[idx]]
+        p = self.where[idx]
+        last = bucket.pop()
+        if last != idx:
+            bucket[p] = last
+            self.where[last] = p
+
+    def partner(self, idx, target, reach, probes):
+        """
+        Unused photo whose union with idx is closest to target with little
+        overlap: cost = |union - target| + common. Looks at tag counts
+        target - count(idx) + d for |d| <= reach, frequent-tag masks disjoint
+        from idx's first, and at most probes photos per bucket. -1 if none.
+        """
+        a = self.tags[idx]
+        ca, ma = self.key[idx]
+        tags = self.tags
+        buckets = self.buckets
+        best, best_cost = -1, None
+        for pass_masks in (True, False):
+            for d in chain((0,), *((x, -x) for x in range(1, reach + 1))):
+                if best_cost is not None and best_cost <= abs(d):
+                    break  # cost >= |d| for every partner with count target - ca + d
+                cb = target - ca + d
+                for mb in range(self.full + 1):
+                    if (mb & ma) and pass_masks:
+                        continue
+                    if not pass_masks and not (mb & ma):
+                        continue  # already seen in the first pass
+                    bucket = buckets.get((cb, mb))
+                    if not bucket:
+                        continue
+                    for j in bucket[-probes:]:
+                        common = len(a & tags[j])
+                        cost = abs(ca + cb - common - target) + common
+                        if best_cost is None or cost < best_cost:
+                            best, best_cost = j, cost
+            if best >= 0:
+                return best
+        return best
+
 
 def random_pair_vertical_photos(vertical_photos):
     """
@@ -19,79 +259,72 @@ def random_pair_vertical_photos(vertical_photos):
     return pairs
 
 
-def similar_pair_vertical_photos(vertical_photos, k=50):
+def similar_pair_vertical_photos(vertical_photos, k=50, backend="auto"):
     """
     A fast greedy implementation for large datasets.
     k: number of candidates based on the number of tags for each photo
+    backend: "sets" (set intersections), "bitset" (whole window scored in one NumPy pass)
+             or "auto" (bitset when NumPy is installed, the default)
     """
     photos = sorted(vertical_photos, key=lambda x: len(x["tags"]))
     if len(photos) % 2 == 1:
         photos = photos[:-1]
+    return _pair_window(photos, k, "max", backend)
 
-    used = set()
-    pairs = []
-    n = len(photos)
 
-    for idx, photo in enumerate(photos):
-        if photo["id"] in used:
-            continue
-
-        start = max(0, idx - k)
-        end = min(n, idx + k)
-        best_score = -1
-        best_pair = None
-
-        for j in range(start, end):
-            candidate = photos[j]
-            if candidate["id"] in used or candidate["id"] == photo["id"]:
-                continue
-            score = len(photo["tags"] & candidate["tags"])
-            if score > best_score:
-                best_score = score
-                best_pair = candidate
-
-        if best_pair is not None:
-            pairs.append((photo, best_pair))
-            used.add(photo["id"])
-            used.add(best_pair["id"])
-
-    return pairs
-
-
-def different_pair_vertical_photos(vertical_photos, k=300):
+def different_pair_vertical_photos(vertical_photos, k=300, backend="auto"):
     """
     Combines photos with minimal tag intersection.
     k: Number of candidates for finding the minimal intersection
+    backend: "sets" (set intersections), "bitset" (whole window scored in one NumPy pass)
+             or "auto" (bitset when NumPy is installed, the default)
     """
     photos = sorted(vertical_photos, key=lambda x: len(x["tags"]))
     if len(photos) % 2 == 1:
         photos = photos[:-1]
+    return _pair_window(photos, k, "min", backend)
 
-    used = set()
-    pairs = []
-    n = len(photos)
 
-    for idx, photo in enumerate(photos):
-        if photo["id"] in used:
-            continue
+def target_pair_vertical_photos(vertical_photos, target=None, frequent=4, reach=3, probes=4):
+    """
+    Pairs photos so that the union of tags lands near target (by default twice
+    the median vertical tag count) with little overlap.
+    Unused photos sit in buckets by tag count and by which of the `frequent`
+    most common tags they have; a partner is looked up only in the buckets with
+    tag count target - own count +- reach (disjoint frequent tags first), at most
+    `probes` photos each, so a query costs O(1) instead of 2k intersections.
+    Photos are taken largest first; whoever finds no partner in reach searches
+    the whole tag-count range for the lowest-cost unused photo.
+    target: None -> twice the median vertical tag count (the median horizontal
+    count scored lower on d_pet: the large photos end up paired together).
+    """
+    photos = sorted(vertical_photos, key=lambda x: len(x["tags"]), reverse=True)
+    if len(photos) % 2 == 1:
+        photos = photos[:-1]
+    if not photos:
+        return []
+    if target is None:
+        target = 2 * len(photos[len(photos) // 2]["tags"])
 
-        start = max(0, idx - k)
-        end = min(n, idx + k)
-        best_score = float('inf')
-        best_pair = None
-
-        for j in range(start, end):
-            candidate = photos[j]
-            if candidate["id"] in used or candidate["id"] == photo["id"]:
-                continue
-            score = len(photo["tags"] & candidate["tags"])
-            if score < best_score:
-                best_score = score
-                best_pair = candidate
-
-        if best_pair is not None:
-            pairs.append((photo, best_pair))
-            used.add(photo["id"])
-            used.add(best_pair["id"])
+    counts = Counter(chain.from_iterable(p["tags"] for p in photos))
+    index = _CountBuckets(photos, [t for t, _ in counts.most_common(frequent)])
+    max_count = len(photos[0]["tags"])
+
+    used = bytearray(len(photos))
+    pairs = []
+    for idx in range(len(photos)):
+        if used[idx]:
+            continue
+        used[idx] = 1
+        index.remove(idx)
+        j = index.partner(idx, target, reach, probes)
+        if j < 0:
+            # fallback: widen the reach to the whole tag-count range
+            j = index.partner(idx, target, max_count + target, probes)
+        if j < 0:
+            break
+        used[j] = 1
+        index.remove(j)
+        pairs.append((photos[idx], photos[j]))
 
     return pairs
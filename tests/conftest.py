@@ -0,0 +1,24 @@
+"""Wspólne pomocnicze dla testów: ścieżka do solutions/ i losowe slajdy."""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "solutions"))
+
+from slide_store import SlideStore  # noqa: E402
+
+
+def random_tag_sets(n: int, n_tags: int = 40, max_tags: int = 12, seed: int = 0) -> List[set]:
+    """n losowych zbiorów id tagów (także puste i jednoelementowe)."""
+    rng = random.Random(seed)
+    return [set(rng.sample(range(n_tags), rng.randint(0, max_tags))) for _ in range(n)]
+
+
+def random_store(n: int, n_tags: int = 40, max_tags: int = 12, seed: int = 0) -> SlideStore:
+    """SlideStore z n slajdami H o losowych tagach (id 0..n_tags-1)."""
+    slides = [{"photos": [i], "tags": tags} for i, tags in enumerate(random_tag_sets(n, n_tags, max_tags, seed))]
+    return SlideStore.from_slides(slides, tag_names=[f"t{t}" for t in range(n_tags)])
@@ -0,0 +1,48 @@
+"""Tryb wsadowy: odrzucane warianty i kolizje plików wynikowych."""
+
+from __future__ import annotations
+
+import pytest
+
+from batch import parse_variant, run_batch
+
+
+@pytest.mark.parametrize(
+    "flags",
+    ["--metrics m.json", "--trace t.csv", "--eval", "--cache_dir c", "--stream_chunk 100", "--resume s.txt", "--starts 2"],
+)
+def test_variant_rejects_unsupported_flags(flags):
+    with pytest.raises(SystemExit):
+        parse_variant(f"v={flags}", 1)
+
+
+def test_variant_accepts_solver_parameters():
+    name, args = parse_variant("nn=--order nn --k 50", 1)
+    assert name == "nn" and args.order == "nn" and args.k == 50
+
+
+def _input(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("2\nH 2 a b\nH 2 b c\n", encoding="utf-8")
+    return str(path)
+
+
+def test_same_stem_in_two_directories_is_rejected(tmp_path):
+    inputs = [_input(tmp_path / "a" / "x.txt"), _input(tmp_path / "b" / "x.txt")]
+    with pytest.raises(ValueError, match="ten sam plik"):
+        run_batch(inputs, [parse_variant("default=", 1)], str(tmp_path / "out"), use_cache=False)
+    assert not (tmp_path / "out").exists()
+
+
+def test_output_over_input_is_rejected(tmp_path):
+    inputs = [_input(tmp_path / "x.txt")]
+    with pytest.raises(ValueError, match="nadpisałby wejście"):
+        run_batch(inputs, [parse_variant("default=", 1)], str(tmp_path), use_cache=False)
+
+
+def test_batch_writes_one_file_per_job(tmp_path):
+    inputs = [_input(tmp_path / "in" / "x.txt"), _input(tmp_path / "in" / "y.txt")]
+    variants = [parse_variant("a=--order nn", 1), parse_variant("b=--order random", 2)]
+    rows = run_batch(inputs, variants, str(tmp_path / "out"), use_cache=False, log=lambda *_: None)
+    assert [r["error"] for r in rows] == [""] * 4
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["x.a.txt", "x.b.txt", "y.a.txt", "y.b.txt"]
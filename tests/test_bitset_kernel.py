@@ -0,0 +1,38 @@
+"""BitsetScorer musi dawać te same wyniki co usefull_functions.interest_score."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from bitset_kernel import BitsetScorer  # noqa: E402
+from conftest import random_store  # noqa: E402
+from usefull_functions import interest_score  # noqa: E402
+
+
+@pytest.mark.parametrize("n_tags", [40, 64, 130])
+def test_score_matches_interest_score(n_tags):
+    store = random_store(60, n_tags=n_tags, max_tags=min(n_tags, 30), seed=n_tags)
+    scorer = BitsetScorer(store)
+    sets = store.tag_sets()
+    for a in range(len(store)):
+        for b in range(len(store)):
+            assert scorer.score(a, b) == interest_score(sets[a], sets[b])
+
+
+def test_score_many_and_best_of_match_interest_score():
+    store = random_store(200, n_tags=100, max_tags=25, seed=1)
+    scorer = BitsetScorer(store)
+    sets = store.tag_sets()
+    rng = random.Random(2)
+    for _ in range(200):
+        a = rng.randrange(len(store))
+        cands = rng.sample(range(len(store)), rng.randint(1, 50))
+        expected = [interest_score(sets[a], sets[c]) for c in cands]
+        assert scorer.score_many(a, cands).tolist() == expected
+        # pierwszy najlepszy kandydat, jak SlideStore.best_of
+        assert scorer.best_of(a, cands) == expected.index(max(expected))
+        assert scorer.best_of(a, cands) == store.best_of(a, cands)
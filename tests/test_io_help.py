@@ -0,0 +1,36 @@
+"""Parsowanie wejścia .txt: poprawny plik i kontrole deklarowanych liczb."""
+
+from __future__ import annotations
+
+import pytest
+
+from io_help import parse_txt
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "in.txt"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_parse_txt_interns_tags(tmp_path):
+    orient, offsets, tag_ids, names = parse_txt(_write(tmp_path, "3\nH 2 a b\nV 1 b\n\nV 0\n"))
+    assert orient == b"HVV"
+    assert list(offsets) == [0, 2, 3, 3]
+    assert [names[t] for t in tag_ids] == ["a", "b", "b"]
+
+
+@pytest.mark.parametrize(
+    "text, where",
+    [
+        ("x\nH 1 a\n", ":1:"),
+        ("2\nH 2 a b\nV 3 a b\n", ":3:"),
+        ("1\nH 1 a\nH 1 b\n", ":3:"),
+        ("2\nH 1 a\nX 1 b\n", ":3:"),
+        ("2\nH 1 a\nH a\n", ":3:"),
+        ("3\nH 1 a\nV 1 c\n", "nagłówek=3"),
+    ],
+)
+def test_parse_txt_rejects_malformed_input(tmp_path, text, where):
+    with pytest.raises(ValueError, match=where):
+        parse_txt(_write(tmp_path, text))
@@ -0,0 +1,60 @@
+"""Graf knn z cache: zapisany przy jednym przemieszaniu slajdów, wczytany przy innym,
+ma tych samych sąsiadów (po id zdjęć) co świeżo zbudowany.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+
+from conftest import random_tag_sets
+from knn_graph import build_knn, load_or_build_knn
+from slide_store import SlideStore
+
+
+def _slides():
+    tags = random_tag_sets(160, n_tags=25, max_tags=8, seed=9)
+    slides = [{"photos": [p], "tags": t} for p, t in enumerate(tags[:60])]
+    slides += [{"photos": [p, p + 1], "tags": tags[p] | tags[p + 1]} for p in range(60, 160, 2)]
+    return slides
+
+
+def _shuffled(slides, seed):
+    slides = slides[:]
+    random.Random(seed).shuffle(slides)
+    return SlideStore.from_slides(slides, tag_names=[f"t{t}" for t in range(25)])
+
+
+def _by_photos(store, graph):
+    """Sąsiedzi per slajd, jako krotki id zdjęć (niezależne od numeracji magazynu)."""
+    key = lambda sid: tuple(store.photos(sid))
+    return {key(sid): [key(c) for c in graph.neighbours(sid)] for sid in range(len(store))}
+
+
+def _scores(store, graph):
+    key = lambda sid: tuple(store.photos(sid))
+    return {key(sid): [store.score(sid, c) for c in graph.neighbours(sid)] for sid in range(len(store))}
+
+
+def test_cached_graph_under_another_shuffle_matches_fresh_build(tmp_path):
+    base = str(tmp_path / "input.txt")
+    slides = _slides()
+    first = _shuffled(slides, 1)
+    built = load_or_build_knn(first, m=6, probe=1000, cache_base=base)
+    assert [p for p in os.listdir(tmp_path) if ".knn6" in p]
+
+    second = _shuffled(slides, 2)
+    loaded = load_or_build_knn(second, m=6, probe=1000, cache_base=base)
+    assert _by_photos(second, loaded) == _by_photos(first, built)
+
+    # probe większe niż listy tagów - kandydaci są kompletni, więc świeży graf ma te
+    # same score sąsiadów (przy remisach kolejność może zależeć od numeracji)
+    fresh = build_knn(second, m=6, probe=1000)
+    assert _scores(second, loaded) == _scores(second, fresh)
+    untied = 0
+    for sid in range(len(second)):
+        sc = [second.score(sid, c) for c in fresh.neighbours(sid)]
+        if len(set(sc)) == len(sc):
+            assert loaded.neighbours(sid) == fresh.neighbours(sid)
+            untied += 1
+    assert untied > 0
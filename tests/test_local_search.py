@@ -0,0 +1,105 @@
+"""Ruchy poprawy lokalnej: edges / total (i postings po ruchu partner) zgodne z pełnym przeliczeniem."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from conftest import random_store, random_tag_sets
+from local_search import OrderState, _or_opt, apply_partner_swap, improve, partner_swap_delta
+from slide_store import SlideStore
+
+
+def _check(state, pos):
+    store, order = state.store, state.order
+    assert sorted(order) == list(range(len(store)))
+    assert state.edges == [store.score(order[k], order[k + 1]) for k in range(len(order) - 1)]
+    assert state.total == store.order_score(order)
+    assert all(pos[sid] == k for k, sid in enumerate(order))
+
+
+@pytest.mark.parametrize("n", [2, 3, 5, 12])
+def test_or_opt_all_moves_keep_bookkeeping(n):
+    store = random_store(n, n_tags=12, max_tags=6, seed=n)
+    rng = random.Random(n)
+    base = list(range(n))
+    rng.shuffle(base)
+    applied = 0
+    for length in range(1, n):
+        for i in range(n - length + 1):
+            for g in range(-1, n):
+                if i - 1 <= g <= i + length - 1:
+                    continue
+                state = OrderState(store, base[:])
+                pos = [0] * n
+                for k, sid in enumerate(state.order):
+                    pos[sid] = k
+                before = state.total
+                gain = _or_opt(state, pos, i, length, g)
+                assert gain >= 0
+                assert state.total == before + gain
+                if gain == 0:
+                    assert state.order == base
+                applied += gain > 0
+                _check(state, pos)
+    if n >= 5:
+        assert applied > 0
+
+
+def test_improve_with_or_opt_matches_rescore():
+    store = random_store(300, n_tags=40, max_tags=12, seed=7)
+    order = list(range(len(store)))
+    random.Random(1).shuffle(order)
+    state = OrderState(store, order)
+    start = state.total
+    improve(state, iters=20000, seed=3, moves={"or_opt": 1.0})
+    assert state.total > start
+    pos = [0] * len(store)
+    for k, sid in enumerate(state.order):
+        pos[sid] = k
+    _check(state, pos)
+
+
+def _vertical_store(n_slides, seed):
+    """SlideStore z n_slides slajdami V (zdjęcia 2s, 2s+1) i tagami zdjęć w photo_sets."""
+    tags = random_tag_sets(2 * n_slides, n_tags=30, max_tags=8, seed=seed)
+    photos = [{"id": p, "tags": t} for p, t in enumerate(tags)]
+    slides = [{"photos": [2 * s, 2 * s + 1], "tags": tags[2 * s] | tags[2 * s + 1]} for s in range(n_slides)]
+    store = SlideStore.from_slides(slides, tag_names=[f"t{t}" for t in range(30)])
+    store.set_photo_tags(photos)
+    return store
+
+
+def test_partner_swap_delta_matches_full_rescore():
+    store = _vertical_store(12, seed=5)
+    rng = random.Random(2)
+    order = list(range(len(store)))
+    rng.shuffle(order)
+    state = OrderState(store, order)
+    store.postings()
+    for _ in range(200):
+        i, j = sorted(rng.sample(range(len(order)), 2))
+        x, y = rng.randrange(2), rng.randrange(2)
+        before = state.total
+        delta, pairs, new = partner_swap_delta(state, i, j, x, y)
+        apply_partner_swap(state, i, j, pairs, new, delta)
+        assert state.total == before + delta == store.order_score(state.order)
+        assert state.edges == [store.score(order[k], order[k + 1]) for k in range(len(order) - 1)]
+    post = store.postings()
+    sets = store.tag_sets()
+    for t, lst in enumerate(post):
+        assert sorted(lst) == [sid for sid in range(len(store)) if t in sets[sid]]
+
+
+def test_improve_with_partner_and_or_opt_matches_rescore():
+    store = _vertical_store(200, seed=8)
+    order = list(range(len(store)))
+    random.Random(4).shuffle(order)
+    state = OrderState(store, order)
+    improve(state, iters=20000, seed=1, moves={"partner": 0.5, "or_opt": 0.5})
+    pos = [0] * len(store)
+    for k, sid in enumerate(state.order):
+        pos[sid] = k
+    _check(state, pos)
+    assert list(store.tag_ids) == [t for sid in range(len(store)) for t in sorted(store.tag_set(sid))]
@@ -0,0 +1,25 @@
+"""MinHash / LSH: sygnatury NumPy jak w czystym Pythonie, grupy to partycja slajdów."""
+
+from __future__ import annotations
+
+import pytest
+
+import lsh
+from conftest import random_store
+
+
+def test_numpy_signatures_match_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    store = random_store(300, n_tags=50, max_tags=10, seed=3)
+    fast = lsh.minhash_signatures(store, 24, seed=5)
+    monkeypatch.setattr(lsh, "np", None)
+    assert fast == lsh.minhash_signatures(store, 24, seed=5)
+    assert all(sig == (-1,) * 24 for sid, sig in enumerate(fast) if not store.tag_set(sid))
+
+
+@pytest.mark.parametrize("min_group", [2, 20, lsh.LSH_MIN_GROUP])
+def test_groups_partition_slides(min_group):
+    store = random_store(400, n_tags=30, max_tags=8, seed=4)
+    groups = lsh.lsh_groups(store, max_group=50, seed=1, min_group=min_group)
+    assert sorted(sid for g in groups for sid in g) == list(range(len(store)))
+    assert all(0 < len(g) <= 50 for g in groups)
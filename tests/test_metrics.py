@@ -0,0 +1,49 @@
+"""Licznik score_evals: liczy tylko opakowany magazyn, także graf knn i backend bitset."""
+
+from __future__ import annotations
+
+import pytest
+
+from bitset_kernel import make_scorer
+from conftest import random_store
+from knn_graph import build_knn
+from metrics import Metrics, count_score_evals
+from ordering import order_nn
+from slide_store import SlideStore
+
+
+def test_counts_only_the_wrapped_store():
+    metrics = Metrics()
+    plain = random_store(50, seed=1)
+    store = count_score_evals(random_store(50, seed=1), metrics)
+    assert isinstance(store, SlideStore)
+    assert count_score_evals(store, metrics) is store
+    assert count_score_evals(plain, None) is plain
+
+    order = list(range(50))
+    assert store.order_score(order) == plain.order_score(order)
+    assert metrics.counters["score_evals"] == 49
+    plain.score(0, 1)
+    plain.best_of(0, [1, 2, 3])
+    assert metrics.counters["score_evals"] == 49
+    assert type(plain).score is SlideStore.score
+
+
+@pytest.mark.parametrize("backend", ["sets", "bitset"])
+def test_counts_knn_build_and_ordering(backend):
+    if backend == "bitset":
+        pytest.importorskip("numpy")
+    metrics = Metrics()
+    store = count_score_evals(random_store(200, seed=2), metrics)
+    graph = build_knn(store, m=4, probe=16, backend=backend)
+    built = metrics.counters["score_evals"]
+    assert built > 0
+    assert graph.nbrs == build_knn(random_store(200, seed=2), m=4, probe=16, backend=backend).nbrs
+
+    order_nn(store, k=10, backend=backend)
+    assert metrics.counters["score_evals"] > built
+
+    scorer = make_scorer(store, backend)
+    before = metrics.counters["score_evals"]
+    scorer.best_of(0, [1, 2, 3, 4])
+    assert metrics.counters["score_evals"] == before + 4
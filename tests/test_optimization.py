@@ -0,0 +1,65 @@
+"""Wyżarzanie zwraca najlepszy odwiedzony porządek, z poprawnymi edges / total."""
+
+from __future__ import annotations
+
+import random
+
+import pytest
+
+import optimization
+from conftest import random_store
+from local_search import OrderState
+
+
+class _Trace:
+    """Minimalny Tracer: zapamiętuje najlepszy wynik z każdej próbki."""
+
+    every = 1
+
+    def __init__(self):
+        self.best = []
+
+    def reset_counts(self):
+        pass
+
+    def record(self, phase, it, score, best, accepted, tried):
+        self.best.append(best)
+        return False
+
+
+@pytest.mark.parametrize("journal", [optimization.ANNEAL_JOURNAL, 0.01])
+def test_anneal_returns_best_state(monkeypatch, journal):
+    monkeypatch.setattr(optimization, "ANNEAL_JOURNAL", journal)
+    store = random_store(400, n_tags=40, max_tags=12, seed=11)
+    order = list(range(len(store)))
+    random.Random(3).shuffle(order)
+    state = OrderState(store, order)
+    start = state.total
+    trace = _Trace()
+    # wysoka temperatura: stan końcowy zwykle gorszy od najlepszego, który trzeba odtworzyć
+    optimization.anneal(state, 0.3, seed=1, p_start=0.5, p_end=0.1, trace=trace)
+    assert sorted(state.order) == list(range(len(store)))
+    assert state.edges == [store.score(state.order[k], state.order[k + 1]) for k in range(len(store) - 1)]
+    assert state.total == store.order_score(state.order)
+    assert state.total == max(trace.best) >= start
+
+
+@pytest.mark.parametrize("p_start, p_end", [(0.0, 1e-12), (1e-10, 1.0), (1.5, 0.5)])
+def test_anneal_rejects_probabilities_outside_unit_interval(p_start, p_end):
+    state = OrderState(random_store(20, seed=1), list(range(20)))
+    with pytest.raises(ValueError):
+        optimization.anneal(state, 0.1, seed=1, p_start=p_start, p_end=p_end)
+
+
+def test_solve_slides_passes_acceptance_probabilities(monkeypatch):
+    import pipeline
+
+    seen = {}
+
+    def fake_anneal(state, time_limit, **kwargs):
+        seen.update(kwargs)
+        return state
+
+    monkeypatch.setattr(pipeline, "anneal", fake_anneal)
+    pipeline.solve_slides(random_store(30, seed=2), order_method="nn", time_limit=0.1, anneal_p_start=1e-6, anneal_p_end=1e-9)
+    assert seen["p_start"] == 1e-6 and seen["p_end"] == 1e-9
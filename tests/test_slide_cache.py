@@ -0,0 +1,41 @@
+"""Cache slajdów: zapis / odczyt i ucięte pliki jako brak w cache."""
+
+from __future__ import annotations
+
+import os
+import random
+
+from conftest import random_store
+from slide_cache import read_slides, write_slides
+
+
+def _store():
+    store = random_store(30, seed=4)
+    store.photo_sets = {sid: frozenset(store.tag_set(sid)) for sid in range(len(store))}
+    return store
+
+
+def test_roundtrip(tmp_path):
+    store = _store()
+    state = random.Random(1).getstate()
+    path = str(tmp_path / "x.slides")
+    write_slides(path, store, state)
+    got, got_state = read_slides(path)
+    assert got_state == state
+    assert list(got.photo_a) == list(store.photo_a)
+    assert list(got.tag_ids) == list(store.tag_ids)
+    assert got.tag_names == store.tag_names
+    assert got.photo_sets == store.photo_sets
+
+
+def test_truncated_file_is_a_miss(tmp_path):
+    path = str(tmp_path / "x.slides")
+    write_slides(path, _store(), random.Random(1).getstate())
+    with open(path, "rb") as f:
+        data = f.read()
+    for cut in (10, 100, len(data) // 2, len(data) - 5, len(data) - 1):
+        with open(path, "wb") as f:
+            f.write(data[:cut])
+        assert read_slides(path) is None, cut
+    os.remove(path)
+    assert read_slides(path) is None
@@ -0,0 +1,13 @@
+"""Walidacja argumentów solvera."""
+
+from __future__ import annotations
+
+import pytest
+
+from solver import run_solver
+
+
+@pytest.mark.parametrize("extra", [{"starts": 2}, {"workers": 2}, {"cache_dir": "cache"}])
+def test_resume_excludes_multistart_and_cache(tmp_path, extra):
+    with pytest.raises(ValueError, match="resume"):
+        run_solver(data_dir=str(tmp_path), resume=str(tmp_path / "sub.txt"), **extra)
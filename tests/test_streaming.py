@@ -0,0 +1,71 @@
+"""Tryb strumieniowy: submission przechodzi proof_score, wynik zgadza się z order_score,
+a nieparzyste zdjęcie V porcji dostaje parę w następnej.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+
+import pytest
+
+from conftest import random_tag_sets
+from io_help import load_photo_arrays, read_submission, write_submission_stream
+from streaming import stream_slides
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "reports"))
+
+from proof_score import score_submission  # noqa: E402
+
+CHUNK = 5
+
+
+def _write_input(path, chunks=8):
+    """Porcje po CHUNK zdjęć: 3 V + 2 H (nieparzyście V w każdej, parzyście łącznie)."""
+    tags = random_tag_sets(CHUNK * chunks, n_tags=20, max_tags=6, seed=11)
+    lines = [str(len(tags))]
+    for pid, t in enumerate(tags):
+        t = t or {0}
+        kind = "V" if pid % CHUNK < 3 else "H"
+        lines.append(f"{kind} {len(t)} " + " ".join(f"t{x}" for x in sorted(t)))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("pairing", ["random", "different"])
+def test_streamed_submission_is_valid_and_scored(tmp_path, pairing):
+    data = _write_input(tmp_path / "in.txt")
+    out = str(tmp_path / "out.txt")
+    random.seed(3)
+    totals = {}
+    count = write_submission_stream(stream_slides(data, CHUNK, pairing=pairing, k=10, totals=totals), out)
+
+    arrays = load_photo_arrays(data, use_cache=False)
+    orient, offsets, tag_ids, _ = arrays
+    stats = score_submission(out, orient, offsets, tag_ids)
+    assert stats["ok"]
+    assert stats["lines"] == count == totals["slides"]
+    assert stats["used"] == len(orient)
+    assert stats["score"] == totals["score"]
+
+    store = read_submission(out, arrays)
+    assert store.order_score(list(range(len(store)))) == totals["score"]
+
+    chunk_of = lambda pid: pid // CHUNK
+    pairs = [store.photos(sid) for sid in range(len(store)) if store.photo_b[sid] >= 0]
+    assert any(chunk_of(a) != chunk_of(b) for a, b in pairs)
+
+
+def test_bad_input_line_is_reported(tmp_path):
+    data = tmp_path / "in.txt"
+    data.write_text("2\nH 2 a b\nV 3 a b\n", encoding="utf-8")
+    with pytest.raises(ValueError, match=":3:"):
+        list(stream_slides(str(data), CHUNK))
+
+
+def test_declared_count_is_checked(tmp_path):
+    data = tmp_path / "in.txt"
+    data.write_text("3\nH 2 a b\nH 1 a\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="nagłówek=3"):
+        list(stream_slides(str(data), CHUNK))
@@ -0,0 +1,67 @@
+"""Okno nieużytych zdjęć (_pair_window) musi dawać te same pary co pierwotna pętla."""
+
+from __future__ import annotations
+
+import pytest
+
+from conftest import random_tag_sets
+from bitset_kernel import np, resolve_backend
+from vertical_photos_combining_methods import different_pair_vertical_photos, similar_pair_vertical_photos
+
+
+def _reference_pairs(photos, k, prefer):
+    """Pierwotna implementacja: pełny skan okna +-k z pomijaniem użytych (remisy - pierwszy)."""
+    used = set()
+    pairs = []
+    n = len(photos)
+    for idx, photo in enumerate(photos):
+        if photo["id"] in used:
+            continue
+        best_score = -1 if prefer == "max" else float("inf")
+        best_pair = None
+        for j in range(max(0, idx - k), min(n, idx + k)):
+            candidate = photos[j]
+            if candidate["id"] in used or candidate["id"] == photo["id"]:
+                continue
+            score = len(photo["tags"] & candidate["tags"])
+            if (score > best_score) if prefer == "max" else (score < best_score):
+                best_score = score
+                best_pair = candidate
+        if best_pair is not None:
+            pairs.append((photo, best_pair))
+            used.add(photo["id"])
+            used.add(best_pair["id"])
+    return pairs
+
+
+def _photos(n, seed):
+    return [{"id": i, "tags": tags} for i, tags in enumerate(random_tag_sets(n, n_tags=30, max_tags=10, seed=seed))]
+
+
+def _ids(pairs):
+    return [(a["id"], b["id"]) for a, b in pairs]
+
+
+@pytest.mark.parametrize("backend", ["sets", "bitset", "auto"])
+@pytest.mark.parametrize("n, k, seed", [(2, 1, 0), (7, 1, 1), (40, 3, 2), (101, 5, 3), (300, 20, 4), (300, 400, 5)])
+@pytest.mark.parametrize("func, prefer", [(similar_pair_vertical_photos, "max"), (different_pair_vertical_photos, "min")])
+def test_window_pairing_matches_reference(func, prefer, n, k, seed, backend):
+    if backend == "bitset":
+        pytest.importorskip("numpy")
+    photos = _photos(n, seed)
+    expected = sorted(photos, key=lambda x: len(x["tags"]))
+    if len(expected) % 2 == 1:
+        expected = expected[:-1]
+    assert _ids(func(photos, k=k, backend=backend)) == _ids(_reference_pairs(expected, k, prefer))
+
+
+def test_auto_backend_prefers_bitset_with_numpy():
+    assert resolve_backend("auto") == ("sets" if np is None else "bitset")
+    assert resolve_backend("sets") == "sets"
+
+
+@pytest.mark.parametrize("func, prefer", [(similar_pair_vertical_photos, "max"), (different_pair_vertical_photos, "min")])
+def test_default_backend_matches_reference(func, prefer):
+    photos = _photos(500, 6)
+    expected = sorted(photos, key=lambda x: len(x["tags"]))
+    assert _ids(func(photos, k=30)) == _ids(_reference_pairs(expected, 30, prefer))